@@ -1,9 +1,15 @@
 import win32com.client
 import pythoncom
-import json
 import time
 from pathlib import Path
-from math import sqrt
+
+import geometry
+from extraction_cache import CACHE
+from metrics import METRICS
+from stream_writer import JsonlWriter, compile_json, journal_path
+from transforms import TRANSFORMS
+from hole_match import match_rivet_stacks
+from part_classifier import KeywordClassifier
 
 # =====================================================
 # CONFIG
@@ -15,25 +21,19 @@ OUT_JSON      = Path(r"E:\Phase 1\extractions\final_phase1_to_5.json")
 # CONSTANTS
 # =====================================================
 kCylinderFace = 67119536
-MM_PER_CM = 10.0
-
-# =====================================================
-# HELPERS
-# =====================================================
-def vec_len(v):
-    return sqrt(v[0]**2 + v[1]**2 + v[2]**2)
+MM_PER_CM = geometry.MM_PER_CM
 
-def vec_dot(a, b):
-    return a[0]*b[0] + a[1]*b[1] + a[2]*b[2]
+CACHE_VERSION = "1"   # bump when cylinder_faces() output changes
 
-def normalize(v):
-    l = vec_len(v)
-    if l == 0:
-        return v
-    return [v[0]/l, v[1]/l, v[2]/l]
+FASTENER_KEYWORDS = ["RIVET", "FASTENER", "PIN"]
 
-def dist(a, b):
-    return sqrt((a[0]-b[0])**2 + (a[1]-b[1])**2 + (a[2]-b[2])**2)
+# field order of OUT_JSON, compiled from the streamed journal
+LAYOUT = [
+    ("occurrences", "dict"),
+    ("holes", "list"),
+    ("fastener_axes", "list"),
+    ("rivet_stacks", "list"),
+]
 
 # =====================================================
 # CONNECT INVENTOR
@@ -58,127 +58,156 @@ def force_rebuild(doc):
     except:
         pass
 
+# =====================================================
+# PART-LOCAL CYLINDER FACES
+# =====================================================
+def cylinder_faces(comp):
+    faces = []
+
+    for body in comp.SurfaceBodies:
+        for face in body.Faces:
+            if face.SurfaceType != kCylinderFace:
+                continue
+
+            cyl = face.Geometry
+            axis = cyl.Axis
+
+            faces.append({
+                "center": [
+                    axis.RootPoint.X,
+                    axis.RootPoint.Y,
+                    axis.RootPoint.Z
+                ],
+                "direction": [
+                    axis.Direction.X,
+                    axis.Direction.Y,
+                    axis.Direction.Z
+                ],
+                "diameter_mm": cyl.Radius * 2 * MM_PER_CM
+            })
+
+    return faces
+
 # =====================================================
 # MAIN
 # =====================================================
 def run():
     pythoncom.CoInitialize()
+    TRANSFORMS.clear()
+    METRICS.reset("ain1", ASSEMBLY_PATH)
 
-    inv = connect()
-    asm = inv.Documents.Open(ASSEMBLY_PATH, True)
+    with METRICS.phase("connect"):
+        inv = METRICS.com(connect())
+    with METRICS.phase("documents_open"):
+        asm = inv.Documents.Open(ASSEMBLY_PATH, True)
     asm_def = asm.ComponentDefinition
 
-    output = {
-        "occurrences": {},
-        "holes": [],
-        "fastener_axes": [],
-        "rivet_stacks": []
-    }
+    # records are streamed to the journal as they are produced;
+    # only the holes stay in memory for Phase-5 matching
+    journal = journal_path(OUT_JSON)
+    sink = JsonlWriter(journal)
 
     # =================================================
     # OCCURRENCES + TRANSFORMS
     # =================================================
-    for occ in asm_def.Occurrences:
-        m = occ.Transformation
-        output["occurrences"][occ.Name] = {
-            "definition": occ.Definition.Document.DisplayName,
-            "transform": {
-                "translation": [m.Cell(1,4), m.Cell(2,4), m.Cell(3,4)],
-                "rotation": [
-                    [m.Cell(1,1), m.Cell(1,2), m.Cell(1,3)],
-                    [m.Cell(2,1), m.Cell(2,2), m.Cell(2,3)],
-                    [m.Cell(3,1), m.Cell(3,2), m.Cell(3,3)]
-                ]
-            }
-        }
+    part_docs  = {}   # definition path → document, one per unique part
+    placements = []   # (occurrence, definition path, part name) in order
+
+    with METRICS.phase("occurrences"):
+        for occ in asm_def.Occurrences:
+            name = occ.Name
+            M = TRANSFORMS.occurrence(occ, name)
+            doc = occ.Definition.Document
+            part = doc.DisplayName
+
+            sink("occurrences", {
+                "definition": part,
+                "transform": {
+                    "translation": M[:3, 3].tolist(),
+                    "rotation": M[:3, :3].tolist()
+                }
+            }, key=name)
+
+            if part.lower().endswith(".ipt"):
+                path = doc.FullFileName
+                part_docs.setdefault(path, doc)
+                placements.append((name, path, part))
 
     # =================================================
     # PART-LEVEL HOLE EXTRACTION (REAL GEOMETRY)
     # =================================================
-    for occ in asm_def.Occurrences:
-        doc = occ.Definition.Document
-        if not doc.DisplayName.lower().endswith(".ipt"):
-            continue
-
-        force_rebuild(doc)
-        comp = doc.ComponentDefinition
-
-        for body in comp.SurfaceBodies:
-            for face in body.Faces:
-                if face.SurfaceType != kCylinderFace:
-                    continue
-
-                cyl = face.Geometry
-                axis = cyl.Axis
-
-                hole = {
-                    "part": doc.DisplayName,
-                    "occurrence": occ.Name,
-                    "center": [
-                        axis.RootPoint.X,
-                        axis.RootPoint.Y,
-                        axis.RootPoint.Z
-                    ],
-                    "direction": normalize([
-                        axis.Direction.X,
-                        axis.Direction.Y,
-                        axis.Direction.Z
-                    ]),
-                    "diameter_mm": cyl.Radius * 2 * MM_PER_CM
-                }
-
-                output["holes"].append(hole)
+    # each unique definition is rebuilt / walked once, then fanned out
+    part_faces = {}
+
+    for path, doc in part_docs.items():
+        # unchanged parts are served from the cache: no rebuild, no face walk
+        faces = CACHE.get(path, "ain1", CACHE_VERSION)
+
+        if faces is None:
+            with METRICS.part(path):
+                with METRICS.phase("force_rebuild"):
+                    force_rebuild(doc)
+                with METRICS.phase("face_iteration"):
+                    faces = cylinder_faces(doc.ComponentDefinition)
+            CACHE.put(path, "ain1", CACHE_VERSION, faces)
+
+        # normalize the definition's hole axes in one batched op
+        if faces:
+            dirs = geometry.to_rows(geometry.normalize([f["direction"] for f in faces]))
+            faces = [dict(f, direction=d) for f, d in zip(faces, dirs)]
+
+        part_faces[path] = faces
+
+    CACHE.flush()
+
+    holes = []
+
+    for occ_name, path, part in placements:
+        for face in part_faces[path]:
+            hole = {
+                "part": part,
+                "occurrence": occ_name,
+                "center": list(face["center"]),
+                "direction": list(face["direction"]),
+                "diameter_mm": face["diameter_mm"]
+            }
+            holes.append(hole)
+            sink("holes", hole)
 
     # =================================================
     # FASTENER AXIS (FROM SAME CYLINDER LOGIC)
     # =================================================
-    for h in output["holes"]:
-        if any(k in h["part"].upper() for k in ["RIVET", "FASTENER", "PIN"]):
-            output["fastener_axes"].append(h)
+    fastener_axes = []
+    is_fastener = KeywordClassifier(FASTENER_KEYWORDS)   # one test per definition
+
+    for h in holes:
+        if is_fastener(h["part"]):
+            fastener_axes.append(h)
+            sink("fastener_axes", h)
 
     # =================================================
     # PHASE-5: BLIND RIVET STACK INFERENCE
     # =================================================
-    for f in output["fastener_axes"]:
-        stack = []
+    with METRICS.phase("rivet_matching"):
+        for stack in match_rivet_stacks(fastener_axes, holes):
+            sink("rivet_stacks", stack)
 
-        for h in output["holes"]:
-            if h["occurrence"] == f["occurrence"]:
-                continue
-
-            # axis alignment
-            if abs(vec_dot(f["direction"], h["direction"])) < 0.95:
-                continue
-
-            # center proximity
-            if dist(f["center"], h["center"]) > 1.5:
-                continue
-
-            # diameter compatibility (±0.3 mm)
-            if abs(f["diameter_mm"] - h["diameter_mm"]) > 0.3:
-                continue
-
-            stack.append(h["occurrence"])
-
-        if stack:
-            output["rivet_stacks"].append({
-                "fastener": f["occurrence"],
-                "plates": sorted(set(stack)),
-                "stack_size": len(set(stack)),
-                "type": "blind_rivet",
-                "confidence": 0.98
-            })
+    sink.close()
 
     # =================================================
     # SAVE
     # =================================================
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4)
+    with METRICS.phase("json_dump"):
+        compile_json(journal, OUT_JSON, LAYOUT)
 
     print("✅ FINAL extraction complete")
     print(f"→ {OUT_JSON}")
 
-    asm.Close(True)
+    with METRICS.phase("close"):
+        asm.Close(True)
+
+    report = METRICS.write(OUT_JSON, cache={"hits": CACHE.hits, "misses": CACHE.misses})
+    print(f"📊 {METRICS.summary()} → {report}")
 
 # =====================================================
 if __name__ == "__main__":
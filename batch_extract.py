@@ -0,0 +1,259 @@
+import argparse
+import json
+import os
+import time
+import traceback
+import multiprocessing as mp
+from multiprocessing.connection import wait
+from pathlib import Path
+
+# =====================================================
+# CONFIG
+# =====================================================
+INPUT_PATH  = r"E:\Phase 1\Assemblies"                 # folder or manifest
+OUTPUT_JSON = r"E:\Phase 1\extractions\batch_extraction.json"
+
+WORKERS   = max(1, (os.cpu_count() or 2) - 1)
+TIMEOUT_S = 30 * 60      # per file
+RETRIES   = 2            # extra attempts after the first failure
+
+EXTENSIONS = (".iam", ".ipt")
+
+# =====================================================
+# INPUT DISCOVERY
+# =====================================================
+def collect_files(source, recursive=False):
+    """
+    Files from a folder (*.iam / *.ipt) or a manifest.
+
+    A manifest is either a JSON list of paths or a text file with one
+    path per line ('#' starts a comment). Relative entries resolve
+    against the manifest's folder.
+    """
+    src = Path(source)
+
+    if src.is_dir():
+        pattern = "**/*" if recursive else "*"
+        return sorted(str(p) for p in src.glob(pattern) if p.suffix.lower() in EXTENSIONS)
+
+    text = src.read_text(encoding="utf-8-sig")
+    if src.suffix.lower() == ".json":
+        entries = json.loads(text)
+    else:
+        entries = [ln.split("#", 1)[0].strip() for ln in text.splitlines()]
+
+    files = []
+    for e in entries:
+        if not e:
+            continue
+        p = Path(e)
+        if not p.is_absolute():
+            p = src.parent / p
+        files.append(str(p))
+    return files
+
+# =====================================================
+# PER-FILE EXTRACTION (RUNS IN WORKER)
+# =====================================================
+def extract_file(inv, path):
+    import extractor1
+    import holes
+    from extraction_cache import CACHE
+
+    is_part = path.lower().endswith(".ipt")
+    found = CACHE.get(path, "holes", holes.CACHE_VERSION) if is_part else None
+
+    if found is None:
+        doc = inv.Documents.Open(path, False)
+        try:
+            if not is_part:
+                return extractor1.extract_assembly(doc)
+
+            found = holes.extract_holes_from_part(doc)
+        finally:
+            doc.Close(True)
+
+        # a cache write failure must not fail a finished extraction;
+        # the index is flushed once when the worker exits
+        try:
+            CACHE.put(path, "holes", holes.CACHE_VERSION, found)
+        except OSError as e:
+            print(f"⚠️ cache write failed for {Path(path).name}: {e}")
+
+    return {
+        "part": Path(path).name,
+        "hole_count": len(found),
+        "holes": found
+    }
+
+def _worker(conn):
+    """One Inventor instance per process; tasks arrive over `conn`."""
+    import pythoncom
+    import win32com.client
+
+    pythoncom.CoInitialize()
+    inv = win32com.client.DispatchEx("Inventor.Application")
+    inv.Visible = False
+    inv.SilentOperation = True
+
+    try:
+        while True:
+            path = conn.recv()
+            if path is None:
+                break
+            try:
+                conn.send(("ok", path, extract_file(inv, path)))
+            except Exception:
+                conn.send(("error", path, traceback.format_exc(limit=5)))
+    finally:
+        try:
+            from extraction_cache import CACHE
+            CACHE.flush()
+        except Exception:
+            traceback.print_exc(limit=5)
+        try:
+            inv.Quit()
+        except Exception:
+            pass
+        pythoncom.CoUninitialize()
+
+# =====================================================
+# SUPERVISOR
+# =====================================================
+class _Slot:
+    """A worker process, its pipe and the task it is busy with."""
+
+    def __init__(self, ctx):
+        self.conn, child = ctx.Pipe()
+        self.proc = ctx.Process(target=_worker, args=(child,), daemon=True)
+        self.proc.start()
+        child.close()
+        self.task = None
+        self.started = None
+
+    def assign(self, path):
+        self.task = path
+        self.started = time.monotonic()
+        self.conn.send(path)
+
+    def release(self):
+        self.task = None
+        self.started = None
+
+    def kill(self):
+        self.proc.terminate()
+        self.proc.join(5)
+        self.conn.close()
+
+def run_batch(files, workers=WORKERS, timeout_s=TIMEOUT_S, retries=RETRIES):
+    """
+    Extract every file across a pool of Inventor worker processes.
+
+    A file that raises, times out or takes its worker down is retried
+    up to `retries` more times on a fresh worker. Returns the merged
+    {"files": {...}, "failed": {...}} result.
+    """
+    ctx = mp.get_context("spawn" if os.name == "nt" else None)
+
+    pending  = list(reversed(files))
+    attempts = {f: 0 for f in files}
+    done     = {}
+    failed   = {}
+
+    def _retry_or_fail(path, reason):
+        if attempts[path] <= retries:
+            print(f"🔁 retry {Path(path).name} ({reason.splitlines()[-1]})")
+            pending.append(path)
+        else:
+            print(f"❌ {Path(path).name}: {reason.splitlines()[-1]}")
+            failed[path] = {"attempts": attempts[path], "error": reason}
+
+    slots = [_Slot(ctx) for _ in range(min(workers, len(files)) or 1)]
+
+    try:
+        while pending or any(s.task for s in slots):
+            for s in slots:
+                if s.task is None and pending:
+                    path = pending.pop()
+                    attempts[path] += 1
+                    s.assign(path)
+
+            busy = [s for s in slots if s.task]
+            ready = wait([s.conn for s in busy] + [s.proc.sentinel for s in busy], timeout=1.0)
+
+            for i, s in enumerate(slots):
+                if s.task is None:
+                    continue
+
+                if s.conn in ready:
+                    try:
+                        status, path, payload = s.conn.recv()
+                    except (EOFError, OSError):
+                        status, path, payload = "error", s.task, "worker pipe closed"
+
+                    if status == "ok":
+                        done[path] = {"attempts": attempts[path], "result": payload}
+                        print(f"✅ {Path(path).name}")
+                        s.release()
+                        continue
+
+                    s.release()
+                    _retry_or_fail(path, payload)
+                    if not s.proc.is_alive():
+                        s.kill()
+                        slots[i] = _Slot(ctx)
+                    continue
+
+                timed_out = time.monotonic() - s.started > timeout_s
+                if timed_out or not s.proc.is_alive():
+                    path = s.task
+                    s.kill()
+                    slots[i] = _Slot(ctx)
+                    _retry_or_fail(path, "timeout" if timed_out else f"worker exited ({s.proc.exitcode})")
+    finally:
+        for s in slots:
+            if s.proc.is_alive():
+                try:
+                    s.conn.send(None)
+                except OSError:
+                    pass
+        for s in slots:
+            s.proc.join(30)
+            if s.proc.is_alive():
+                s.kill()
+
+    return {
+        "files": {f: done[f] for f in files if f in done},
+        "failed": failed
+    }
+
+# =====================================================
+# MAIN
+# =====================================================
+def run(source=INPUT_PATH, output=OUTPUT_JSON, workers=WORKERS,
+        timeout_s=TIMEOUT_S, retries=RETRIES, recursive=False):
+    files = collect_files(source, recursive)
+    print(f"📦 {len(files)} files → {workers} workers")
+
+    t0 = time.monotonic()
+    merged = run_batch(files, workers, timeout_s, retries)
+    merged["elapsed_s"] = round(time.monotonic() - t0, 2)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(merged, f, indent=2)
+
+    print(f"\n✅ Batch extraction complete: {len(merged['files'])} ok, {len(merged['failed'])} failed")
+    print(f"→ {output}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Parallel Inventor extraction over many files")
+    ap.add_argument("source", nargs="?", default=INPUT_PATH, help="folder or manifest (.txt / .json)")
+    ap.add_argument("-o", "--output", default=OUTPUT_JSON)
+    ap.add_argument("-w", "--workers", type=int, default=WORKERS)
+    ap.add_argument("--timeout", type=float, default=TIMEOUT_S, help="seconds per file")
+    ap.add_argument("--retries", type=int, default=RETRIES)
+    ap.add_argument("-r", "--recursive", action="store_true")
+    args = ap.parse_args()
+
+    run(args.source, args.output, args.workers, args.timeout, args.retries, args.recursive)
@@ -0,0 +1,302 @@
+import argparse
+import json
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# phase modules are imported here, not inside the timed phases, so a
+# measurement never includes import cost
+import geometry
+import gr_hole
+import rivet_stack
+import rule_miner
+import validate
+from hole_match import match_rivet_stacks
+from part_classifier import KeywordClassifier
+
+try:
+    from ain1 import FASTENER_KEYWORDS as HOLE_MATCH_KEYWORDS
+except ImportError:
+    # no pywin32 here: ain1 imports against the offline replay instead
+    import fake_inventor
+    fake_inventor.install()
+    from ain1 import FASTENER_KEYWORDS as HOLE_MATCH_KEYWORDS
+
+# =====================================================
+# CONFIG
+# =====================================================
+ROOT = Path(__file__).resolve().parent
+
+SIZES    = [1_000, 10_000, 100_000]   # synthetic occurrences per run
+SEED     = 0
+REPEAT   = 3                          # runs per (phase, size); the fastest counts
+WORK_DIR = Path(tempfile.gettempdir()) / "cad_bench"
+
+RESULTS_JSON  = Path("bench_results.json")
+BASELINE_JSON = Path("bench_baseline.json")
+
+# regression gates, relative to the baseline
+MAX_SLOWDOWN   = 0.25    # wall time may grow by this fraction
+MAX_RSS_GROWTH = 0.25    # peak RSS may grow by this fraction
+MIN_WALL_S     = 0.05    # timings below this are noise, never gated
+
+# =====================================================
+# PEAK MEMORY
+# =====================================================
+def peak_rss_mb():
+    """Peak resident set of this process in MB, None where unavailable."""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kB on Linux, bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+    try:
+        import psutil
+    except ImportError:
+        return None
+
+    info = psutil.Process().memory_info()
+    return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+# =====================================================
+# PHASES
+# =====================================================
+# each phase runs one offline module on a generated dataset, through the
+# same entry point a nightly run uses; `out` is a scratch folder
+def phase_hole_match(paths, out):
+    with open(paths["ain1"], "r", encoding="utf-8") as f:
+        doc = json.load(f)
+
+    # ain1's hole axes are in part space: place them by their occurrence
+    holes = doc["holes"]
+    placements = doc["occurrences"]
+    Ms = [
+        geometry.rigid_matrix(t["rotation"], t["translation"])
+        for t in (placements[h["occurrence"]]["transform"] for h in holes)
+    ]
+    centers = geometry.to_rows(geometry.transform_points_each(Ms, [h["center"] for h in holes]))
+    dirs = geometry.to_rows(geometry.transform_vectors_each(Ms, [h["direction"] for h in holes]))
+    holes = [dict(h, center=c, direction=d) for h, c, d in zip(holes, centers, dirs)]
+
+    is_fastener = KeywordClassifier(HOLE_MATCH_KEYWORDS)
+    fastener_axes = [h for h in holes if is_fastener(h["part"])]
+    stacks = match_rivet_stacks(fastener_axes, holes)
+
+    with open(out / "rivet_stacks_matched.json", "w", encoding="utf-8") as f:
+        json.dump(stacks, f, indent=4)
+
+def phase_rivet_stack(paths, out):
+    rivet_stack.run(paths["assembly_extraction"], paths["fastener_axes"],
+                    out / "rivet_stacks.json", paths["ain1"])
+
+def phase_rule_miner(paths, out):
+    rule_miner.INPUT_JSON = Path(paths["assembly_extraction"])
+    rule_miner.OUT_NORMALIZED = out / "normalized_constraints.json"
+    rule_miner.OUT_RULES = out / "rules.json"
+    rule_miner.run()
+
+def phase_gr_hole(paths, out):
+    gr_hole.INPUT_JSON = Path(paths["inferred_holes"])
+    gr_hole.OUTPUT_JSON = out / "grouped_holes.json"
+    gr_hole.run()
+
+def phase_validate(paths, out):
+    validate.GROUPED_HOLES_JSON = Path(paths["grouped_holes"])
+    validate.RULES_JSON = Path(paths["rules"])
+    validate.BOM_JSON = Path(paths["bom"])
+    validate.OUTPUT_JSON = out / "validation.json"
+    validate.run()
+
+# name → (phase, what it processes: dataset total used for throughput)
+PHASES = {
+    "hole_match":  (phase_hole_match, "cylinders"),
+    "rivet_stack": (phase_rivet_stack, "constraints"),
+    "rule_miner":  (phase_rule_miner, "constraints"),
+    "gr_hole":     (phase_gr_hole, "rivets"),
+    "validate":    (phase_validate, "joints"),
+}
+
+# =====================================================
+# DATASETS
+# =====================================================
+def dataset(size, seed=SEED, work_dir=WORK_DIR):
+    """Generated inputs for one size, reused while the generator is unchanged."""
+    import synth_assembly
+
+    folder = Path(work_dir) / f"n{size}_s{seed}"
+    meta_path = folder / "dataset.json"
+    stamp = (ROOT / "synth_assembly.py").stat().st_mtime_ns
+
+    if meta_path.exists():
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta.get("generator_mtime_ns") == stamp:
+            return meta
+
+    print(f"🏗️ generating {size} occurrences → {folder}")
+    result = synth_assembly.generate(folder, size, seed)
+
+    totals = dict(result["totals"])
+    totals["cylinders"] = totals["holes"] + totals["rivets"]
+
+    # validate reads gr_hole's output; produced here so it is not timed
+    from stream_writer import iter_records
+
+    paths = dict(result["paths"])
+    paths["grouped_holes"] = str(folder / "extractions" / "grouped_holes.json")
+    with open(paths["grouped_holes"], "w", encoding="utf-8") as f:
+        json.dump(gr_hole.group_holes(iter_records(paths["inferred_holes"])), f, indent=4)
+
+    meta = {"size": size, "seed": seed, "generator_mtime_ns": stamp, "totals": totals, "paths": paths}
+    meta_path.write_text(json.dumps(meta, indent=2), encoding="utf-8")
+    return meta
+
+# =====================================================
+# MEASUREMENT
+# =====================================================
+def _worker(phase, meta_path):
+    """Run one phase in this (fresh) process and print its measurements."""
+    meta = json.loads(Path(meta_path).read_text(encoding="utf-8"))
+    out = Path(tempfile.mkdtemp(prefix=f"bench_{phase}_"))
+
+    t0 = time.perf_counter()
+    PHASES[phase][0](meta["paths"], out)
+    wall = time.perf_counter() - t0
+
+    print(json.dumps({"wall_s": wall, "peak_rss_mb": peak_rss_mb()}))
+
+def measure(phase, meta, repeat=REPEAT):
+    """
+    Best of `repeat` runs, each in its own interpreter so peak RSS
+    belongs to the phase alone.
+    """
+    meta_path = Path(meta["paths"]["raw_export"]).parent.parent / "dataset.json"
+    runs = []
+
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, str(Path(__file__).resolve()), "--worker", phase, str(meta_path)],
+            cwd=ROOT, capture_output=True, text=True, encoding="utf-8"
+        )
+        if proc.returncode != 0:
+            raise RuntimeError(f"{phase} failed on {meta['size']}:\n{proc.stderr}")
+        runs.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+
+    best = min(runs, key=lambda r: r["wall_s"])
+    rss = [r["peak_rss_mb"] for r in runs if r["peak_rss_mb"] is not None]
+    items = meta["totals"][PHASES[phase][1]]
+
+    return {
+        "phase": phase,
+        "size": meta["size"],
+        "items": items,
+        "unit": PHASES[phase][1],
+        "wall_s": round(best["wall_s"], 4),
+        "peak_rss_mb": round(min(rss), 1) if rss else None,
+        "throughput_per_s": round(items / best["wall_s"], 1) if best["wall_s"] else None,
+        "runs": repeat
+    }
+
+# =====================================================
+# REGRESSION GATES
+# =====================================================
+def regressions(results, baseline, max_slowdown=MAX_SLOWDOWN, max_rss_growth=MAX_RSS_GROWTH):
+    """Messages for every (phase, size) worse than the baseline beyond its threshold."""
+    before = {(r["phase"], r["size"]): r for r in baseline.get("results", [])}
+    found = []
+
+    for r in results:
+        b = before.get((r["phase"], r["size"]))
+        if b is None:
+            continue
+
+        label = f"{r['phase']} @ {r['size']}"
+
+        if max(r["wall_s"], b["wall_s"]) >= MIN_WALL_S and r["wall_s"] > b["wall_s"] * (1 + max_slowdown):
+            found.append(f"{label}: wall {b['wall_s']:.3f}s → {r['wall_s']:.3f}s "
+                         f"(+{r['wall_s'] / b['wall_s'] - 1:.0%}, limit +{max_slowdown:.0%})")
+
+        if r["peak_rss_mb"] and b.get("peak_rss_mb") and r["peak_rss_mb"] > b["peak_rss_mb"] * (1 + max_rss_growth):
+            found.append(f"{label}: peak RSS {b['peak_rss_mb']:.1f} MB → {r['peak_rss_mb']:.1f} MB "
+                         f"(+{r['peak_rss_mb'] / b['peak_rss_mb'] - 1:.0%}, limit +{max_rss_growth:.0%})")
+
+    return found
+
+# =====================================================
+# MAIN
+# =====================================================
+def run(sizes=SIZES, phases=None, repeat=REPEAT, out_json=RESULTS_JSON,
+        baseline_json=BASELINE_JSON, save_baseline=False,
+        max_slowdown=MAX_SLOWDOWN, max_rss_growth=MAX_RSS_GROWTH, work_dir=WORK_DIR):
+    """Benchmark every phase at every size; returns the regression messages."""
+    phases = phases or list(PHASES)
+    results = []
+
+    for size in sizes:
+        meta = dataset(size, SEED, work_dir)
+        for phase in phases:
+            r = measure(phase, meta, repeat)
+            results.append(r)
+            print(f"⏱️ {phase:<12} {size:>9}  {r['wall_s']:>9.3f}s  "
+                  f"{r['peak_rss_mb'] or 0:>8.1f} MB  {r['throughput_per_s'] or 0:>12,.0f} {r['unit']}/s")
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "seed": SEED,
+        "results": results
+    }
+
+    Path(out_json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"\n📄 Results → {out_json}")
+
+    if save_baseline:
+        Path(baseline_json).write_text(json.dumps(report, indent=2), encoding="utf-8")
+        print(f"📌 Baseline saved → {baseline_json}")
+        return []
+
+    if not Path(baseline_json).exists():
+        print(f"⚠️ No baseline at {baseline_json}; gates skipped (use --save-baseline)")
+        return []
+
+    baseline = json.loads(Path(baseline_json).read_text(encoding="utf-8"))
+    found = regressions(results, baseline, max_slowdown, max_rss_growth)
+
+    if found:
+        print(f"\n❌ {len(found)} regression(s) against {baseline_json}:")
+        for msg in found:
+            print(f"   {msg}")
+    else:
+        print(f"✅ No regressions against {baseline_json}")
+
+    return found
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Benchmark the offline phases on synthetic assemblies")
+    ap.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    ap.add_argument("--phases", nargs="+", choices=list(PHASES), default=None)
+    ap.add_argument("--repeat", type=int, default=REPEAT)
+    ap.add_argument("-o", "--output", default=str(RESULTS_JSON))
+    ap.add_argument("--baseline", default=str(BASELINE_JSON))
+    ap.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    ap.add_argument("--max-slowdown", type=float, default=MAX_SLOWDOWN, help="allowed wall-time growth (0.25 = 25%%)")
+    ap.add_argument("--max-rss-growth", type=float, default=MAX_RSS_GROWTH, help="allowed peak-RSS growth")
+    ap.add_argument("--work-dir", default=str(WORK_DIR), help="where generated datasets are kept")
+    ap.add_argument("--worker", nargs=2, metavar=("PHASE", "DATASET"), help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        _worker(*args.worker)
+        sys.exit(0)
+
+    found = run(args.sizes, args.phases, args.repeat, args.output, args.baseline,
+                args.save_baseline, args.max_slowdown, args.max_rss_growth, args.work_dir)
+    sys.exit(1 if found else 0)
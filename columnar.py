@@ -0,0 +1,487 @@
+import argparse
+import hashlib
+import json
+import os
+import shutil
+from pathlib import Path
+from urllib.parse import quote
+
+import numpy as np
+
+# =====================================================
+# FORMAT
+# =====================================================
+# <name>.cols/
+#     meta.json                     tables, column kinds, top-level values
+#     <table>/<column>.npy          bool / int / float / number / vec / array values
+#     <table>/<column>.isint.npy    bool, which float64 cells were JSON ints
+#                                   (kind "number", or dtype "number")
+#     <table>/<column>.codes.npy    int32 string codes (-1 null, -2 absent)
+#     <table>/<column>.vocab.npy    utf-8 bytes of the distinct strings
+#     <table>/<column>.offsets.npy  int64 start of each string in vocab
+#     <table>/<column>.mask.npy     uint8 0 value / 1 null / 2 absent
+#
+# Columns are named by their dotted path in the JSON record, e.g.
+# "transform.rotation_matrix" or "entity_one.reference_key_string".
+#
+# Numbers keep their JSON type: all-int columns are int64, all-float
+# float64, and mixed ones ("number") float64 plus the isint mask. vec
+# and array columns carry the same distinction as their "dtype".
+FORMAT  = "cols/2"   # cols/1 stored ints, bools and numeric strings as floats
+SUFFIX  = ".cols"
+
+VALUE, NULL, ABSENT = 0, 1, 2
+_MISSING = object()
+
+XYZ = ("x", "y", "z")
+
+INT64_MIN, INT64_MAX = -2**63, 2**63 - 1
+FLOAT_EXACT = 2**53   # largest int range a float64 holds exactly
+
+# =====================================================
+# COLUMN INFERENCE
+# =====================================================
+def _is_num(v):
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+def _is_xyz(v):
+    return isinstance(v, dict) and tuple(v) == XYZ and all(_is_num(c) for c in v.values())
+
+def _num_kind(leaves):
+    """
+    "int", "float" or "number" (ints and floats mixed) when every leaf
+    is a non-bool int or float that its storage holds exactly, else None.
+    """
+    has_int = has_float = False
+    for v in leaves:
+        if isinstance(v, bool) or not isinstance(v, (int, float)):
+            return None
+        if isinstance(v, int):
+            has_int = True
+        else:
+            has_float = True
+
+    if has_int and not has_float:
+        return "int" if all(INT64_MIN <= v <= INT64_MAX for v in leaves) else None
+    if has_int:
+        exact = all(isinstance(v, float) or -FLOAT_EXACT <= v <= FLOAT_EXACT for v in leaves)
+        return "number" if exact else None
+    return "float"
+
+def _nested_shape(v, leaves):
+    """Shape of a rectangular nested list, collecting its leaves; None if ragged."""
+    if not isinstance(v, list):
+        leaves.append(v)
+        return ()
+    shapes = {_nested_shape(x, leaves) for x in v}
+    if len(shapes) > 1 or None in shapes:
+        return None
+    return (len(v),) + (shapes.pop() if shapes else ())
+
+def _kind(values):
+    """(kind, shape, dtype) for the present, non-null values of one column."""
+    if not values:
+        return "str", None, None
+    if all(isinstance(v, bool) for v in values):
+        return "bool", None, None
+    if all(isinstance(v, str) for v in values):
+        return "str", None, None
+
+    num = _num_kind(values)
+    if num is not None:
+        return num, None, None
+
+    if all(_is_xyz(v) for v in values):
+        num = _num_kind([c for v in values for c in v.values()])
+        if num is not None:
+            return "vec", None, num
+
+    if all(isinstance(v, list) for v in values):
+        leaves = []
+        shapes = {_nested_shape(v, leaves) for v in values}
+        if len(shapes) == 1 and None not in shapes:
+            num = _num_kind(leaves)
+            if num is not None:
+                return "array", list(shapes.pop()), num
+
+    return "json", None, None
+
+def _flatten(records, prefix=()):
+    """
+    Split records into leaf columns: [(path, kind, shape, dtype, values)].
+
+    A key whose present values are all non-empty dicts (other than
+    {x, y, z} points) becomes a struct and is split further.
+    """
+    order = {}
+    for r in records:
+        if isinstance(r, dict):
+            for k in r:
+                order.setdefault(k, None)
+
+    columns = []
+    for key in order:
+        values = [r.get(key, _MISSING) if isinstance(r, dict) else _MISSING for r in records]
+        present = [v for v in values if v is not _MISSING]
+
+        if present and all(isinstance(v, dict) and v and not _is_xyz(v) for v in present):
+            columns.extend(_flatten(values, prefix + (key,)))
+            continue
+
+        kind, shape, dtype = _kind([v for v in present if v is not None])
+        columns.append((prefix + (key,), kind, shape, dtype, values))
+
+    return columns
+
+# =====================================================
+# WRITE
+# =====================================================
+def _stem(path):
+    return quote(".".join(path), safe=".-_ ")
+
+def _state(values):
+    return np.fromiter(
+        (ABSENT if v is _MISSING else NULL if v is None else VALUE for v in values),
+        dtype=np.uint8, count=len(values)
+    )
+
+def _write_strings(base, values, encode=None):
+    vocab = {}
+    codes = np.empty(len(values), dtype=np.int32)
+    for i, v in enumerate(values):
+        if v is _MISSING:
+            codes[i] = -2
+        elif v is None:
+            codes[i] = -1
+        else:
+            s = encode(v) if encode else v
+            codes[i] = vocab.setdefault(s, len(vocab))
+
+    blobs = [s.encode("utf-8") for s in vocab]
+    offsets = np.zeros(len(blobs) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in blobs], out=offsets[1:])
+
+    np.save(f"{base}.codes.npy", codes)
+    np.save(f"{base}.vocab.npy", np.frombuffer(b"".join(blobs), dtype=np.uint8))
+    np.save(f"{base}.offsets.npy", offsets)
+    return len(vocab)
+
+_DTYPES = {"bool": np.bool_, "int": np.int64, "float": np.float64, "number": np.float64}
+_BLANK  = {"bool": False, "int": 0, "float": np.nan, "number": np.nan}
+
+def _int_cells(v):
+    """Nested bools marking which cells of `v` are JSON ints."""
+    if isinstance(v, list):
+        return [_int_cells(x) for x in v]
+    return isinstance(v, int) and not isinstance(v, bool)
+
+def _write_values(base, kind, shape, dtype, values):
+    state = _state(values)
+    cell = dtype or kind                     # element type: bool / int / float / number
+
+    if kind == "vec":
+        shape = [3]
+        values = [[v[c] for c in XYZ] if s == VALUE else v for v, s in zip(values, state)]
+    shape = shape or []
+
+    blank = np.full(shape, _BLANK[cell]).tolist() if shape else _BLANK[cell]
+    rows = [v if s == VALUE else blank for v, s in zip(values, state)]
+    arr = np.asarray(rows, dtype=_DTYPES[cell]).reshape([len(rows)] + shape)
+    np.save(f"{base}.npy", arr)
+
+    if cell == "number":
+        no_int = np.zeros(shape, dtype=bool).tolist() if shape else False
+        isint = [_int_cells(v) if s == VALUE else no_int for v, s in zip(values, state)]
+        np.save(f"{base}.isint.npy", np.asarray(isint, dtype=bool).reshape(arr.shape))
+
+    if state.any():
+        np.save(f"{base}.mask.npy", state)
+
+def write_table(folder, records):
+    """Write one list of records as columns under `folder`; returns its meta."""
+    folder.mkdir(parents=True, exist_ok=True)
+    columns = []
+
+    for path, kind, shape, dtype, values in _flatten(records):
+        base = folder / _stem(path)
+        col = {"path": list(path), "kind": kind}
+
+        if kind == "str":
+            col["distinct"] = _write_strings(base, values)
+        elif kind == "json":
+            col["distinct"] = _write_strings(base, values, lambda v: json.dumps(v, separators=(",", ":")))
+        else:
+            _write_values(base, kind, shape, dtype, values)
+        if shape:
+            col["shape"] = shape
+        if dtype:
+            col["dtype"] = dtype
+
+        columns.append(col)
+
+    return {"rows": len(records), "columns": columns}
+
+def convert(json_path, out_path=None):
+    """
+    Convert an export JSON into a column store.
+
+    Every top-level list of records (components, constraints, faces,
+    connection_points, ...) becomes a table; a top-level list is the
+    table "records". Everything else is kept as-is in meta.json.
+    """
+    json_path = Path(json_path)
+    out_path = Path(out_path) if out_path else json_path.with_suffix(SUFFIX)
+
+    raw = json_path.read_bytes()
+    doc = json.loads(raw.decode("utf-8"))
+    if isinstance(doc, list):
+        doc = {"records": doc}
+        top = "records"
+    else:
+        top = None
+
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+
+    meta = {"format": FORMAT, "source": json_path.name,
+            "source_sha256": hashlib.sha256(raw).hexdigest(), "top_level_list": top,
+            "order": list(doc), "tables": {}, "values": {}}
+
+    for key, value in doc.items():
+        if isinstance(value, list) and all(isinstance(r, dict) for r in value):
+            meta["tables"][key] = write_table(tmp / _stem((key,)), value)
+        else:
+            meta["values"][key] = value
+
+    (tmp / "meta.json").write_text(json.dumps(meta, indent=2), encoding="utf-8")
+
+    shutil.rmtree(out_path, ignore_errors=True)
+    os.replace(tmp, out_path)
+    return out_path
+
+# =====================================================
+# READ
+# =====================================================
+def _load(path):
+    try:
+        return np.load(path, mmap_mode="r")
+    except ValueError:          # zero-length arrays cannot be mapped
+        return np.load(path)
+
+def _restore_ints(arr, isint):
+    """Object array of `arr` with the cells marked in `isint` back as Python ints."""
+    out = arr.astype(object)
+    out[isint] = [int(v) for v in arr[isint].tolist()]
+    return out
+
+class StrColumn:
+    """
+    Dictionary-encoded strings: `codes` is memory-mapped, the distinct
+    values are decoded on first use. -1 is null, -2 absent.
+    """
+
+    def __init__(self, base, decode=None):
+        self.codes = _load(f"{base}.codes.npy")
+        self._base = base
+        self._decode = decode
+        self._vocab = None
+
+    @property
+    def vocab(self):
+        if self._vocab is None:
+            blob = bytes(_load(f"{self._base}.vocab.npy"))
+            offsets = _load(f"{self._base}.offsets.npy").tolist()
+            words = [blob[a:b].decode("utf-8") for a, b in zip(offsets, offsets[1:])]
+            self._vocab = [self._decode(w) for w in words] if self._decode else words
+        return self._vocab
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        c = int(self.codes[i])
+        return self.vocab[c] if c >= 0 else None
+
+    def __iter__(self):
+        return iter(self.tolist())
+
+    def tolist(self):
+        vocab = self.vocab
+        return [vocab[c] if c >= 0 else None for c in self.codes.tolist()]
+
+    def isin(self, values):
+        """Boolean row mask of rows whose value is one of `values`."""
+        wanted = set(values)
+        hits = [i for i, v in enumerate(self.vocab) if v in wanted]
+        return np.isin(self.codes, hits)
+
+class ColumnStore:
+    """Read side of a .cols directory; columns are opened lazily."""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.meta = json.loads((self.path / "meta.json").read_text(encoding="utf-8"))
+        if self.meta.get("format") != FORMAT:
+            raise ValueError(f"Unsupported column store: {self.meta.get('format')} "
+                             f"(re-convert {self.meta.get('source')} with columnar.py)")
+        self.values = self.meta["values"]
+        self._cols = {}
+
+    def tables(self):
+        return list(self.meta["tables"])
+
+    def rows(self, table):
+        return self.meta["tables"][table]["rows"]
+
+    def columns(self, table):
+        return [".".join(c["path"]) for c in self.meta["tables"][table]["columns"]]
+
+    def _spec(self, table, name):
+        for c in self.meta["tables"][table]["columns"]:
+            if ".".join(c["path"]) == name:
+                return c
+        raise KeyError(f"{table}.{name}")
+
+    def _base(self, table, spec):
+        return self.path / _stem((table,)) / _stem(spec["path"])
+
+    def column(self, table, name):
+        """
+        One column, memory-mapped. Strings (and nested JSON values) come
+        back as StrColumn, everything else as a numpy array; see mask().
+        A "number" column (or dtype) is float64 with ints as exact values.
+        """
+        key = (table, name)
+        if key not in self._cols:
+            spec = self._spec(table, name)
+            base = self._base(table, spec)
+            if spec["kind"] == "str":
+                self._cols[key] = StrColumn(base)
+            elif spec["kind"] == "json":
+                self._cols[key] = StrColumn(base, json.loads)
+            else:
+                self._cols[key] = _load(f"{base}.npy")
+        return self._cols[key]
+
+    def mask(self, table, name):
+        """uint8 per row: 0 value, 1 null, 2 key absent."""
+        spec = self._spec(table, name)
+        base = self._base(table, spec)
+        if spec["kind"] in ("str", "json"):
+            codes = np.asarray(self.column(table, name).codes)
+            return np.where(codes >= 0, VALUE, np.where(codes == -1, NULL, ABSENT)).astype(np.uint8)
+        path = Path(f"{base}.mask.npy")
+        if path.exists():
+            return _load(path)
+        return np.zeros(self.rows(table), dtype=np.uint8)
+
+    def _values(self, table, spec):
+        name = ".".join(spec["path"])
+        col = self.column(table, name)
+        kind = spec["kind"]
+
+        if kind in ("str", "json"):
+            codes = col.codes.tolist()
+            vocab = col.vocab
+            return [vocab[c] if c >= 0 else None if c == -1 else _MISSING for c in codes]
+
+        state = self.mask(table, name).tolist()
+        if (spec.get("dtype") or kind) == "number":
+            base = self._base(table, spec)
+            data = _restore_ints(np.asarray(col), _load(f"{base}.isint.npy")).tolist()
+        else:
+            data = col.tolist()
+        if kind == "vec":
+            data = [dict(zip(XYZ, v)) for v in data]
+        return [d if s == VALUE else None if s == NULL else _MISSING for d, s in zip(data, state)]
+
+    def records(self, table, columns=None, index=None):
+        """
+        Rebuild records as dicts with only `columns` (default all),
+        optionally only the rows in `index`.
+        """
+        specs = self.meta["tables"][table]["columns"]
+        if columns is not None:
+            wanted = set(columns)
+            specs = [c for c in specs if ".".join(c["path"]) in wanted]
+
+        n = self.rows(table)
+        rows = range(n) if index is None else list(index)
+        out = [{} for _ in rows]
+
+        for spec in specs:
+            values = self._values(table, spec)
+            *parents, leaf = spec["path"]
+            for rec, i in zip(out, rows):
+                v = values[i]
+                if v is _MISSING:
+                    continue
+                for p in parents:
+                    rec = rec.setdefault(p, {})
+                rec[leaf] = v
+
+        return out
+
+    def to_json(self):
+        """The whole document back as JSON-ready Python objects."""
+        doc = {}
+        for key in self.meta["order"]:
+            doc[key] = self.records(key) if key in self.meta["tables"] else self.values[key]
+        top = self.meta.get("top_level_list")
+        return doc[top] if top else doc
+
+def open_store(path):
+    return ColumnStore(path)
+
+def is_store(path):
+    return Path(path).suffix == SUFFIX or (Path(path) / "meta.json").exists()
+
+def load_tables(path, tables):
+    """
+    {table: records} from a JSON export or a column store.
+
+    `tables` maps table name → columns to read (None = all). For a
+    store only those columns are opened; a JSON file is parsed whole.
+    A top-level JSON list is the table "records".
+    """
+    if is_store(path):
+        store = open_store(path)
+        return {t: store.records(t, cols) for t, cols in tables.items()}
+
+    doc = json.loads(Path(path).read_text(encoding="utf-8"))
+    if isinstance(doc, list):
+        doc = {"records": doc}
+    return {t: doc[t] for t in tables}
+
+# =====================================================
+# CLI
+# =====================================================
+def _size(path):
+    path = Path(path)
+    if path.is_dir():
+        return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+    return path.stat().st_size
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Convert export JSON files into column stores")
+    ap.add_argument("inputs", nargs="+", help="JSON exports")
+    ap.add_argument("-o", "--out-dir", default=None, help="folder for the .cols stores (default: next to input)")
+    ap.add_argument("--check", action="store_true", help="verify the store reads back to the same JSON")
+    args = ap.parse_args(argv)
+
+    for src in args.inputs:
+        src = Path(src)
+        out = Path(args.out_dir) / src.with_suffix(SUFFIX).name if args.out_dir else None
+        out = convert(src, out)
+
+        line = f"✅ {src.name}: {_size(src) / 1024:.0f} KB → {_size(out) / 1024:.0f} KB ({out})"
+        if args.check:
+            # type-strict: 1 vs 1.0, True vs 1 and "1" vs 1 all differ
+            same = (json.dumps(open_store(out).to_json(), sort_keys=True)
+                    == json.dumps(json.loads(src.read_text(encoding="utf-8")), sort_keys=True))
+            line += "  round trip OK" if same else "  ❌ round trip differs"
+        print(line)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+import socket
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+# =====================================================
+# CONFIG
+# =====================================================
+CACHE_DIR = Path(os.environ.get(
+    "CAD_EXTRACTION_CACHE",
+    r"E:\Phase 1\extractions\.cache"
+))
+
+CHUNK = 1 << 20
+
+LOCK_TIMEOUT_S = 30     # index.lock older than this is from a dead holder
+LOCK_POLL_S    = 0.05
+
+# =====================================================
+# ATOMIC WRITES
+# =====================================================
+def _atomic_write(path, text):
+    """Write through a temp file unique to this writer, then replace."""
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=path.name + ".", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(text)
+        for attempt in range(10):
+            try:
+                os.replace(tmp, path)
+                return
+            except PermissionError:
+                # Windows: target briefly held open by a reader
+                if attempt == 9:
+                    raise
+                time.sleep(LOCK_POLL_S)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+class _IndexLock:
+    """
+    Exclusive lock file next to index.json, shared by all processes.
+
+    The lock holds an owner token (host:pid:random). A lock is only taken
+    over once its mtime is older than LOCK_TIMEOUT_S, and only if it still
+    holds the token that was judged stale: it is first renamed aside (one
+    waiter wins) and put back if another process got there in between.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.token = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex}"
+
+    def _read(self, path=None):
+        try:
+            return Path(path or self.path).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def held(self):
+        """True while the lock file is still ours."""
+        return self._read() == self.token
+
+    def _break_stale(self):
+        try:
+            age = time.time() - os.stat(self.path).st_mtime
+        except OSError:
+            return
+        if age < LOCK_TIMEOUT_S:
+            return
+        stale = self._read()
+
+        aside = self.path.with_name(f"{self.path.name}.{uuid.uuid4().hex}.stale")
+        try:
+            os.rename(self.path, aside)
+        except OSError:
+            return   # someone else moved or released it
+        if self._read(aside) == stale:
+            os.remove(aside)   # holder died without releasing it
+            return
+        # a live lock replaced the stale one before our rename: put it back
+        try:
+            os.link(aside, self.path)
+        except OSError:
+            pass
+        os.remove(aside)
+
+    def __enter__(self):
+        while True:
+            try:
+                fd = os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+            except FileExistsError:
+                self._break_stale()
+                time.sleep(LOCK_POLL_S)
+                continue
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.token)
+            return self
+
+    def __exit__(self, *exc):
+        if self.held():
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+# =====================================================
+# CONTENT-ADDRESSED CACHE
+# =====================================================
+class ExtractionCache:
+    """
+    Per-part extraction results keyed by file content hash.
+
+    Entries live at <root>/<extractor>/<version>/<sha[:2]>/<sha>.json,
+    so bumping an extractor's version string invalidates only its own
+    entries. File hashes are remembered by (size, mtime) in index.json
+    so unchanged files are not re-read on every run.
+
+    Several processes may share one root: flush() merges this process's
+    new hashes into the index on disk under a lock instead of
+    overwriting it.
+    """
+
+    def __init__(self, root=CACHE_DIR):
+        self.use(root)
+
+    def use(self, root):
+        """Point the cache at another root; counters and loaded state start over."""
+        self.root = Path(root)
+        self.hits = 0
+        self.misses = 0
+        self._index_path = self.root / "index.json"
+        self._index = None
+        self._new = {}   # hashes computed since the last flush
+
+    # -------------------------------------------------
+    # file hashing
+    # -------------------------------------------------
+    def _read_index(self):
+        try:
+            return json.loads(self._index_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {}
+
+    def _load_index(self):
+        if self._index is None:
+            self._index = self._read_index()
+        return self._index
+
+    def digest(self, path):
+        """sha256 of the file, or None if it cannot be read."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+
+        key = os.path.normcase(os.path.abspath(path))
+        stamp = [st.st_size, st.st_mtime_ns]
+        index = self._load_index()
+
+        known = index.get(key)
+        if known and known[:2] == stamp:
+            return known[2]
+
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK), b""):
+                h.update(chunk)
+
+        index[key] = self._new[key] = stamp + [h.hexdigest()]
+        return index[key][2]
+
+    # -------------------------------------------------
+    # entries
+    # -------------------------------------------------
+    def _entry(self, path, extractor, version):
+        sha = self.digest(path)
+        if sha is None:
+            return None
+        return self.root / extractor / str(version) / sha[:2] / f"{sha}.json"
+
+    def get(self, path, extractor, version):
+        """Cached payload for this exact file content, or None."""
+        entry = self._entry(path, extractor, version)
+        if entry is not None and entry.exists():
+            try:
+                payload = json.loads(entry.read_text(encoding="utf-8"))
+            except ValueError:
+                payload = None
+            if payload is not None:
+                self.hits += 1
+                return payload
+
+        self.misses += 1
+        return None
+
+    def put(self, path, extractor, version, payload):
+        """Store a payload for the file's current content (no-op if unreadable)."""
+        entry = self._entry(path, extractor, version)
+        if entry is None:
+            return
+
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        _atomic_write(entry, json.dumps(payload))
+
+    def flush(self):
+        """Merge this process's new hashes into the (size, mtime) → hash index on disk."""
+        if not self._new:
+            return
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        while True:
+            with _IndexLock(self._index_path.with_suffix(".lock")) as lock:
+                index = self._read_index()
+                index.update(self._new)
+                if lock.held():   # not broken as stale while we merged
+                    _atomic_write(self._index_path, json.dumps(index))
+                    break
+
+        self._index = index
+        self._new = {}
+
+    def summary(self):
+        return f"cache: {self.hits} hit / {self.misses} miss"
+
+CACHE = ExtractionCache()
@@ -1,151 +1,60 @@
 import win32com.client
-import json
-import os
 import time
 import math
 
+import geometry
+from metrics import METRICS
+from stream_writer import compile_json, journal_path, open_journal
+from transforms import TRANSFORMS, matrix_rows
+
 # =====================================================
 # CONFIG
 # =====================================================
 ASSEMBLY_PATH = r"E:\Phase 1\Assembly 1\1093144795-M1.iam"
 OUTPUT_JSON   = r"E:\Phase 1\extractions\assembly_dump.json"
 
+RESUME = True   # continue an interrupted run from its journal
+
+# field order of OUTPUT_JSON, compiled from the streamed journal
+LAYOUT = [
+    ("assembly", "value"),
+    ("occurrences", "list"),
+    ("constraints", "list"),
+    ("patterns", "list"),
+    ("holes", "list"),
+]
+
 # =====================================================
 # BASIC UTILITIES
 # =====================================================
 def mat4(m):
-    return [
-        [m.Cell(1,1), m.Cell(1,2), m.Cell(1,3), m.Cell(1,4)],
-        [m.Cell(2,1), m.Cell(2,2), m.Cell(2,3), m.Cell(2,4)],
-        [m.Cell(3,1), m.Cell(3,2), m.Cell(3,3), m.Cell(3,4)],
-        [m.Cell(4,1), m.Cell(4,2), m.Cell(4,3), m.Cell(4,4)],
-    ]
-
-def transform_point(M, p):
-    return [
-        round(M[0][0]*p.X + M[0][1]*p.Y + M[0][2]*p.Z + M[0][3], 6),
-        round(M[1][0]*p.X + M[1][1]*p.Y + M[1][2]*p.Z + M[1][3], 6),
-        round(M[2][0]*p.X + M[2][1]*p.Y + M[2][2]*p.Z + M[2][3], 6),
-    ]
-
-def transform_vector(M, v):
-    return [
-        round(M[0][0]*v.X + M[0][1]*v.Y + M[0][2]*v.Z, 6),
-        round(M[1][0]*v.X + M[1][1]*v.Y + M[1][2]*v.Z, 6),
-        round(M[2][0]*v.X + M[2][1]*v.Y + M[2][2]*v.Z, 6),
-    ]
+    return matrix_rows(m)
 
 # =====================================================
 # CONNECT TO INVENTOR
 # =====================================================
-try:
-    inv = win32com.client.GetActiveObject("Inventor.Application")
-except:
-    inv = win32com.client.DispatchEx("Inventor.Application")
-    inv.Visible = True
-    time.sleep(5)
-
-doc = inv.Documents.Open(ASSEMBLY_PATH, True)
-asm = doc.ComponentDefinition
-
-# =====================================================
-# DATA STRUCTURE
-# =====================================================
-data = {
-    "assembly": doc.DisplayName,
-    "occurrences": [],
-    "constraints": [],
-    "patterns": [],
-    "holes": []
-}
-
-# =====================================================
-# PASS 1 — OCCURRENCES
-# =====================================================
-for occ in asm.Occurrences:
+def connect():
     try:
-        M = mat4(occ.Transformation)
-        data["occurrences"].append({
-            "name": occ.Name,
-            "definition": occ.Definition.Document.DisplayName,
-            "full_path": occ.Definition.Document.FullFileName,
-            "suppressed": bool(occ.Suppressed),
-            "grounded": bool(occ.Grounded),
-            "transform": M,
-            "pattern_parent": occ.PatternElement.Parent.Name if occ.PatternElement else None
-        })
+        return win32com.client.GetActiveObject("Inventor.Application")
     except:
-        continue
+        inv = win32com.client.DispatchEx("Inventor.Application")
+        inv.Visible = True
+        time.sleep(5)
+        return inv
 
 # =====================================================
-# PASS 2 — CONSTRAINTS
-# =====================================================
-for c in asm.Constraints:
-    try:
-        data["constraints"].append({
-            "name": c.Name,
-            "type": c.Type,
-            "occurrence_1": c.OccurrenceOne.Name if hasattr(c, "OccurrenceOne") else None,
-            "occurrence_2": c.OccurrenceTwo.Name if hasattr(c, "OccurrenceTwo") else None,
-            "entity_1": c.EntityOne.Type if hasattr(c, "EntityOne") else None,
-            "entity_2": c.EntityTwo.Type if hasattr(c, "EntityTwo") else None,
-            "suppressed": bool(c.Suppressed)
-        })
-    except:
-        continue
-
+# PART-SPACE HOLES (ONE PASS PER DEFINITION)
 # =====================================================
-# PASS 3 — COMPONENT PATTERNS (CORRECT API)
-# =====================================================
-features = asm.Features
-
-for pat in features.RectangularPatternFeatures:
-    try:
-        data["patterns"].append({
-            "name": pat.Name,
-            "type": "Rectangular",
-            "count": pat.PatternElements.Count,
-            "elements": [
-                {
-                    "index": e.Index,
-                    "suppressed": bool(e.Suppressed),
-                    "transform": mat4(e.Transformation)
-                }
-                for e in pat.PatternElements
-            ]
-        })
-    except:
-        continue
+def local_holes(part_doc):
+    """
+    Sketch-placed hole records of one part definition, with their
+    centers and axes in part space as (N, 3) arrays.
+    """
+    recs, points, normals = [], [], []
 
-for pat in features.CircularPatternFeatures:
     try:
-        data["patterns"].append({
-            "name": pat.Name,
-            "type": "Circular",
-            "count": pat.PatternElements.Count,
-            "elements": [
-                {
-                    "index": e.Index,
-                    "suppressed": bool(e.Suppressed),
-                    "transform": mat4(e.Transformation)
-                }
-                for e in pat.PatternElements
-            ]
-        })
-    except:
-        continue
-
-# =====================================================
-# PASS 4 — HOLE GEOMETRY (ONLY SAFE METHOD)
-# =====================================================
-for occ in asm.Occurrences:
-    try:
-        part_doc = occ.Definition.Document
-        if not part_doc.DisplayName.lower().endswith(".ipt"):
-            continue
-
         cd = part_doc.ComponentDefinition
-        M = mat4(occ.Transformation)
+        part = part_doc.DisplayName
 
         for hole in cd.Features.HoleFeatures:
             if hole.Suppressed:
@@ -157,33 +66,269 @@ for occ in asm.Occurrences:
 
             sketch = pd.Sketch
             normal = sketch.PlanarEntityGeometry.Normal.AsVector()
+            n = (normal.X, normal.Y, normal.Z)
+
+            rec = {
+                "part": part,
+                "hole": hole.Name,
+                "diameter_mm": round(hole.HoleDefinition.Diameter.Value * 10, 4),
+                "threaded": bool(hole.HoleDefinition.Tapped)
+            }
 
             for pt in pd.SketchPoints:
                 p3d = pt.Geometry3d
-                data["holes"].append({
-                    "occurrence": occ.Name,
-                    "part": part_doc.DisplayName,
-                    "hole": hole.Name,
-                    "diameter_mm": round(hole.HoleDefinition.Diameter.Value * 10, 4),
-                    "center_mm": transform_point(M, p3d),
-                    "axis": transform_vector(M, normal),
-                    "threaded": bool(hole.HoleDefinition.Tapped)
-                })
+                points.append((p3d.X, p3d.Y, p3d.Z))
+                normals.append(n)
+                recs.append(rec)
     except:
-        continue
+        pass
+
+    return recs, geometry.as_points(points), geometry.as_points(normals)
 
 # =====================================================
-# SAVE JSON
+# EXTRACTION
 # =====================================================
-os.makedirs(os.path.dirname(OUTPUT_JSON), exist_ok=True)
+def extract_assembly(doc, sink=None, done=None):
+    """
+    Run all passes over an open assembly.
+
+    Records go to `sink(section, record)` as they are produced (e.g. a
+    JsonlWriter). Without a sink they are collected and returned as the
+    usual dict.
+
+    A sink with `checkpoint(key, data)` gets one checkpoint per finished
+    occurrence, pass and part definition. `done` holds the checkpoints
+    of an interrupted run; that work is skipped.
+    """
+    TRANSFORMS.clear()
+    asm = doc.ComponentDefinition
+    done = done or {}
+    checkpoint = getattr(sink, "checkpoint", lambda key, data=None: None)
+
+    # =================================================
+    # DATA STRUCTURE
+    # =================================================
+    data = None
+    if sink is None:
+        data = {
+            "assembly": doc.DisplayName,
+            "occurrences": [],
+            "constraints": [],
+            "patterns": [],
+            "holes": []
+        }
+        sink = lambda section, rec: data[section].append(rec)
+
+    # =================================================
+    # PASS 1 — OCCURRENCES
+    # =================================================
+    part_docs  = {}   # full path → definition document, one per unique part
+    placements = []   # (name, full path, transform) for PASS 4
 
-with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-    json.dump(data, f, indent=2)
+    with METRICS.phase("occurrences"):
+        for occ in asm.Occurrences:
+            try:
+                name = occ.Name
+
+                saved = done.get(f"occurrence:{name}")
+                if saved is not None:
+                    full_path = saved["full_path"]
+                    if f"part:{full_path}" not in done and full_path not in part_docs:
+                        part_docs[full_path] = occ.Definition.Document
+                    placements.append((name, full_path, saved["transform"]))
+                    continue
+
+                M = TRANSFORMS.occurrence(occ, name).tolist()
+                occ_doc = occ.Definition.Document
+                full_path = occ_doc.FullFileName
+                part_docs.setdefault(full_path, occ_doc)
+                sink("occurrences", {
+                    "name": name,
+                    "definition": occ_doc.DisplayName,
+                    "full_path": full_path,
+                    "suppressed": bool(occ.Suppressed),
+                    "grounded": bool(occ.Grounded),
+                    "transform": M,
+                    "pattern_parent": occ.PatternElement.Parent.Name if occ.PatternElement else None
+                })
+                placements.append((name, full_path, M))
+                checkpoint(f"occurrence:{name}", {"full_path": full_path, "transform": M})
+            except:
+                continue
 
-print("✅ Extraction complete")
-print("📄 Output:", OUTPUT_JSON)
+    # =================================================
+    # PASS 2 — CONSTRAINTS
+    # =================================================
+    constraints = [] if "constraints" in done else asm.Constraints
 
+    with METRICS.phase("constraints"):
+        for c in constraints:
+            try:
+                sink("constraints", {
+                    "name": c.Name,
+                    "type": c.Type,
+                    "occurrence_1": c.OccurrenceOne.Name if hasattr(c, "OccurrenceOne") else None,
+                    "occurrence_2": c.OccurrenceTwo.Name if hasattr(c, "OccurrenceTwo") else None,
+                    "entity_1": c.EntityOne.Type if hasattr(c, "EntityOne") else None,
+                    "entity_2": c.EntityTwo.Type if hasattr(c, "EntityTwo") else None,
+                    "suppressed": bool(c.Suppressed)
+                })
+            except:
+                continue
+
+    checkpoint("constraints")
+
+    # =================================================
+    # PASS 3 — COMPONENT PATTERNS (CORRECT API)
+    # =================================================
+    features = None if "patterns" in done else asm.Features
+
+    with METRICS.phase("patterns"):
+        for pat in features.RectangularPatternFeatures if features else []:
+            try:
+                sink("patterns", {
+                    "name": pat.Name,
+                    "type": "Rectangular",
+                    "count": pat.PatternElements.Count,
+                    "elements": [
+                        {
+                            "index": e.Index,
+                            "suppressed": bool(e.Suppressed),
+                            "transform": mat4(e.Transformation)
+                        }
+                        for e in pat.PatternElements
+                    ]
+                })
+            except:
+                continue
+
+        for pat in features.CircularPatternFeatures if features else []:
+            try:
+                sink("patterns", {
+                    "name": pat.Name,
+                    "type": "Circular",
+                    "count": pat.PatternElements.Count,
+                    "elements": [
+                        {
+                            "index": e.Index,
+                            "suppressed": bool(e.Suppressed),
+                            "transform": mat4(e.Transformation)
+                        }
+                        for e in pat.PatternElements
+                    ]
+                })
+            except:
+                continue
+
+    checkpoint("patterns")
+
+    # =================================================
+    # PASS 4 — HOLE GEOMETRY (ONLY SAFE METHOD)
+    # =================================================
+    # each unique part is read once in part space, then fanned out to all
+    # of its occurrences with one broadcast transform per definition
+    local = {}
+    for path in dict.fromkeys(p[1] for p in placements):
+        key = f"part:{path}"
+        if key not in done:
+            part_doc = part_docs[path]
+            found = None
+            if part_doc.DisplayName.lower().endswith(".ipt"):
+                with METRICS.part(path), METRICS.phase("hole_features"):
+                    recs, P, N = local_holes(part_doc)
+                found = {"recs": recs, "points": P.tolist(), "normals": N.tolist()}
+            checkpoint(key, found)
+            done[key] = found
+
+        found = done[key]
+        if found is not None:
+            local[path] = (found["recs"],
+                           geometry.as_points(found["points"]),
+                           geometry.as_points(found["normals"]))
+
+    placements = [p for p in placements
+                  if p[1] in local and f"holes:{p[0]}" not in done]
+
+    by_def = {}
+    for name, path, M in placements:
+        by_def.setdefault(path, []).append(M)
+
+    placed = {}   # full path → iterator over (centers, axes) per occurrence
+    for path, mats in by_def.items():
+        recs, P, N = local[path]
+        if not recs:
+            continue
+        Ms = geometry.stack_matrices(mats)
+        centers = geometry.transform_points(Ms, P)
+        axes    = geometry.transform_vectors(Ms, N)
+        placed[path] = iter(zip(centers, axes))
+
+    for name, path, M in placements:
+        if path not in placed:
+            continue
+
+        recs = local[path][0]
+        centers, axes = next(placed[path])
+
+        for r, c, a in zip(recs,
+                           geometry.to_rows(centers, 6),
+                           geometry.to_rows(axes, 6)):
+            sink("holes", {
+                "occurrence": name,
+                "part": r["part"],
+                "hole": r["hole"],
+                "diameter_mm": r["diameter_mm"],
+                "center_mm": c,
+                "axis": a,
+                "threaded": r["threaded"]
+            })
+
+        checkpoint(f"holes:{name}")
+
+    return data
+
+# =====================================================
+# MAIN
 # =====================================================
-# CLEANUP
+def run(resume=RESUME):
+    METRICS.reset("extractor1", ASSEMBLY_PATH)
+
+    with METRICS.phase("connect"):
+        inv = METRICS.com(connect())
+
+    with METRICS.phase("documents_open"):
+        doc = inv.Documents.Open(ASSEMBLY_PATH, True)
+
+    # =================================================
+    # STREAM RECORDS → JOURNAL → JSON
+    # =================================================
+    # checkpoints in the journal let a re-run after a crash or COM
+    # disconnect skip the occurrences and parts already extracted
+    journal = journal_path(OUTPUT_JSON)
+    sink, done = open_journal(journal, ASSEMBLY_PATH, resume)
+
+    if len(done) > 1:
+        print(f"⏩ resuming from {len(done) - 1} checkpoints")
+
+    extract_assembly(doc, sink, done)
+    sink.finish()
+
+    with METRICS.phase("json_dump"):
+        compile_json(journal, OUTPUT_JSON, LAYOUT, {"assembly": doc.DisplayName}, indent=2)
+
+    print("✅ Extraction complete")
+    print("📄 Output:", OUTPUT_JSON)
+    print("🧾 Journal:", journal)
+
+    # =================================================
+    # CLEANUP
+    # =================================================
+    with METRICS.phase("close"):
+        doc.Close(True)
+
+    report = METRICS.write(OUTPUT_JSON)
+    print("📊", METRICS.summary(), "→", report)
+
 # =====================================================
-doc.Close(True)
\ No newline at end of file
+if __name__ == "__main__":
+    run()
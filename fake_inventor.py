@@ -0,0 +1,903 @@
+import argparse
+import csv
+import importlib
+import json
+import sys
+import tempfile
+import time
+import types
+from collections import Counter
+from pathlib import Path, PureWindowsPath
+
+from metrics import metrics_path
+
+# =====================================================
+# CONFIG
+# =====================================================
+ROOT = Path(__file__).resolve().parent
+
+DATA_DIRS = [
+    ROOT / "assemblies_raw_export",
+    ROOT / "jsons",
+    ROOT,
+]
+
+# =====================================================
+# INVENTOR ENUMS (values the extractors compare against)
+# =====================================================
+kPartDocumentObject     = 12290
+kAssemblyDocumentObject = 12291
+kPlaneSurface           = 5890
+kCylinderSurface        = 5891
+kFaceObject             = 67119520
+kHoleFeatureObject      = 83886912
+kUpToDateHealth         = 11265
+kSketchPlacement        = 0        # what holes.py / extractor1.py test for
+
+DEFAULT_HOLE_RADIUS_CM = 0.25     # cylinders with no matching connection point
+
+# =====================================================
+# CALL ACCOUNTING
+# =====================================================
+class CallStats:
+    """
+    Counts every simulated COM round trip and optionally sleeps
+    `latency_s` per call to mimic the cross-process cost.
+    """
+
+    def __init__(self, latency_s=0.0):
+        self.latency_s = latency_s
+        self.calls = 0
+        self.by_member = Counter()
+        self.started = time.perf_counter()
+
+    def tick(self, member):
+        self.calls += 1
+        self.by_member[member] += 1
+        if self.latency_s:
+            time.sleep(self.latency_s)
+
+    def reset(self):
+        self.calls = 0
+        self.by_member.clear()
+        self.started = time.perf_counter()
+
+    def report(self, top=15):
+        elapsed = time.perf_counter() - self.started
+        return {
+            "com_calls": self.calls,
+            "elapsed_s": round(elapsed, 4),
+            "calls_per_s": round(self.calls / elapsed, 1) if elapsed else None,
+            "latency_s": self.latency_s,
+            "top_members": dict(self.by_member.most_common(top))
+        }
+
+# =====================================================
+# COM OBJECT BASE
+# =====================================================
+class ComObject:
+    """
+    Property bag standing in for a late-bound COM object.
+
+    Every public attribute read or write is one counted round trip;
+    values wrapped with lazy() are resolved on first read.
+    """
+
+    _com_type = "Object"
+
+    def __init__(self, stats, com_type=None, **props):
+        object.__setattr__(self, "_stats", stats)
+        object.__setattr__(self, "_props", props)
+        if com_type:
+            object.__setattr__(self, "_com_type", com_type)
+
+    def _call(self, member):
+        self._stats.tick(f"{self._com_type}.{member}")
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        props = object.__getattribute__(self, "_props")
+        if name not in props:
+            raise AttributeError(f"{self._com_type} has no member '{name}'")
+        self._call(name)
+        val = props[name]
+        if isinstance(val, _Lazy):
+            val = props[name] = val.fn()
+        return val
+
+    def __setattr__(self, name, value):
+        if name.startswith("_"):
+            object.__setattr__(self, name, value)
+            return
+        self._call(name)
+        self._props[name] = value
+
+    def __dir__(self):
+        return sorted(self._props)
+
+class _Lazy:
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+def lazy(fn):
+    return _Lazy(fn)
+
+class Collection(ComObject):
+    """1-based COM collection: Count, Item(i) and enumeration."""
+
+    _com_type = "Collection"
+
+    def __init__(self, stats, items=(), com_type="Collection"):
+        super().__init__(stats)
+        object.__setattr__(self, "_items", list(items))
+        object.__setattr__(self, "_com_type", com_type)
+
+    @property
+    def Count(self):
+        self._call("Count")
+        return len(self._items)
+
+    def Item(self, i):
+        self._call("Item")
+        if isinstance(i, str):
+            for it in self._items:
+                if it._props.get("Name") == i:
+                    return it
+            raise KeyError(i)
+        return self._items[i - 1]
+
+    def __iter__(self):
+        for it in self._items:
+            self._call("Next")
+            yield it
+
+    def __len__(self):
+        return len(self._items)
+
+    def _append(self, item):
+        self._items.append(item)
+
+# =====================================================
+# TRANSIENT GEOMETRY
+# =====================================================
+class Point(ComObject):
+    _com_type = "Point"
+
+    def __init__(self, stats, x=0.0, y=0.0, z=0.0):
+        super().__init__(stats, X=float(x), Y=float(y), Z=float(z))
+
+    def Copy(self):
+        self._call("Copy")
+        p = self._props
+        return Point(self._stats, p["X"], p["Y"], p["Z"])
+
+    def TransformBy(self, matrix):
+        self._call("TransformBy")
+        p = self._props
+        m = matrix._m
+        x, y, z = p["X"], p["Y"], p["Z"]
+        p["X"] = m[0][0]*x + m[0][1]*y + m[0][2]*z + m[0][3]
+        p["Y"] = m[1][0]*x + m[1][1]*y + m[1][2]*z + m[1][3]
+        p["Z"] = m[2][0]*x + m[2][1]*y + m[2][2]*z + m[2][3]
+
+class Vector(ComObject):
+    _com_type = "Vector"
+
+    def __init__(self, stats, x=0.0, y=0.0, z=0.0):
+        super().__init__(stats, X=float(x), Y=float(y), Z=float(z))
+
+    def AsVector(self):
+        self._call("AsVector")
+        p = self._props
+        return Vector(self._stats, p["X"], p["Y"], p["Z"])
+
+class Matrix(ComObject):
+    _com_type = "Matrix"
+
+    def __init__(self, stats, rows=None):
+        super().__init__(stats)
+        if rows is None:
+            rows = [[1.0 if r == c else 0.0 for c in range(4)] for r in range(4)]
+        object.__setattr__(self, "_m", [[float(v) for v in r] for r in rows])
+
+    def Cell(self, r, c):
+        self._call("Cell")
+        return self._m[r - 1][c - 1]
+
+    def SetCell(self, r, c, value):
+        self._call("SetCell")
+        self._m[r - 1][c - 1] = float(value)
+
+    def GetMatrixData(self, data=None):
+        self._call("GetMatrixData")
+        return tuple(v for row in self._m for v in row)
+
+    def PutMatrixData(self, data):
+        self._call("PutMatrixData")
+        vals = [float(v) for v in data]
+        object.__setattr__(self, "_m", [vals[i:i + 4] for i in range(0, 16, 4)])
+
+    def Copy(self):
+        self._call("Copy")
+        return Matrix(self._stats, self._m)
+
+class TransientGeometry(ComObject):
+    _com_type = "TransientGeometry"
+
+    def CreateMatrix(self):
+        self._call("CreateMatrix")
+        return Matrix(self._stats)
+
+    def CreatePoint(self, x=0.0, y=0.0, z=0.0):
+        self._call("CreatePoint")
+        return Point(self._stats, x, y, z)
+
+    def CreateVector(self, x=0.0, y=0.0, z=0.0):
+        self._call("CreateVector")
+        return Vector(self._stats, x, y, z)
+
+# =====================================================
+# JSON → OBJECT MODEL HELPERS
+# =====================================================
+def _xyz(v, scale=1.0):
+    """Accept {"x","y","z"} dicts or [x, y, z] lists."""
+    if v is None:
+        return (0.0, 0.0, 0.0)
+    if isinstance(v, dict):
+        return (v.get("x", 0.0) * scale, v.get("y", 0.0) * scale, v.get("z", 0.0) * scale)
+    return (v[0] * scale, v[1] * scale, v[2] * scale)
+
+def _transform_rows(t):
+    """4x4 rows (cm) from any of the exported transform layouts."""
+    if t is None:
+        return None
+    r = t.get("rotation_matrix") or [[1, 0, 0], [0, 1, 0], [0, 0, 1]]
+    if "translation_cm" in t:
+        tx = _xyz(t["translation_cm"])
+    else:
+        tx = _xyz(t.get("translation_mm"), 0.1)
+    return [
+        [r[0][0], r[0][1], r[0][2], tx[0]],
+        [r[1][0], r[1][1], r[1][2], tx[1]],
+        [r[2][0], r[2][1], r[2][2], tx[2]],
+        [0.0, 0.0, 0.0, 1.0],
+    ]
+
+def _stem(path):
+    return PureWindowsPath(str(path)).stem
+
+def _display_name(path):
+    return PureWindowsPath(str(path)).name
+
+# =====================================================
+# DOCUMENTS
+# =====================================================
+class Document(ComObject):
+    _com_type = "Document"
+
+    def Close(self, skip_save=False):
+        self._call("Close")
+
+    def Update(self):
+        self._call("Update")
+
+    def Update2(self, accept_errors=True):
+        self._call("Update2")
+
+    def Save(self):
+        self._call("Save")
+
+    def SaveAs(self, path, save_copy_as=False):
+        self._call("SaveAs")
+        self._props["FullFileName"] = str(path)
+        self._props["DisplayName"] = _display_name(path)
+
+class ReferenceKeyManager(ComObject):
+    """
+    Binds exported ReferenceKey strings back to entities. The same key
+    always binds to the same object; an empty key fails like Inventor.
+    """
+
+    _com_type = "ReferenceKeyManager"
+
+    def __init__(self, stats):
+        super().__init__(stats)
+        object.__setattr__(self, "_bound", {})
+        object.__setattr__(self, "_contexts", 0)
+
+    def StringToKey(self, key_string):
+        self._call("StringToKey")
+        if not key_string:
+            raise ValueError("invalid reference key string")
+        return tuple(key_string.encode("ascii"))
+
+    def LoadContextFromString(self, context_string):
+        self._call("LoadContextFromString")
+        object.__setattr__(self, "_contexts", self._contexts + 1)
+        return self._contexts
+
+    def BindKeyToObject(self, key, context=None):
+        self._call("BindKeyToObject")
+        key = tuple(key)
+        if key not in self._bound:
+            self._bound[key] = ComObject(self._stats, "Face", Type=kFaceObject)
+        return self._bound[key]
+
+class ComponentDefinition(ComObject):
+    _com_type = "ComponentDefinition"
+
+    def Rebuild(self):
+        self._call("Rebuild")
+
+class Occurrence(ComObject):
+    _com_type = "ComponentOccurrence"
+
+    def CreateGeometryProxy(self, entity):
+        self._call("CreateGeometryProxy")
+        return ComObject(self._stats, "FaceProxy", Type=entity._props.get("Type"), NativeObject=entity, ContainingOccurrence=self)
+
+class AssemblyConstraints(Collection):
+    """Assembly constraints; the Add*Constraint methods append a new one."""
+
+    def __init__(self, stats, items=()):
+        super().__init__(stats, items, "AssemblyConstraints")
+
+    def _add(self, kind, entity_one, entity_two):
+        self._call(f"Add{kind}Constraint")
+        c = ComObject(
+            self._stats, "AssemblyConstraint",
+            Name=f"{kind}:{len(self._items) + 1}",
+            Type=f"k{kind}ConstraintObject",
+            Suppressed=False,
+            HealthStatus=kUpToDateHealth,
+            EntityOne=entity_one,
+            EntityTwo=entity_two,
+        )
+        self._append(c)
+        return c
+
+    def AddMateConstraint(self, entity_one, entity_two, offset, *args):
+        return self._add("Mate", entity_one, entity_two)
+
+    def AddFlushConstraint(self, entity_one, entity_two, offset, *args):
+        return self._add("Flush", entity_one, entity_two)
+
+    def AddAngleConstraint(self, entity_one, entity_two, angle, *args):
+        return self._add("Angle", entity_one, entity_two)
+
+    def AddInsertConstraint(self, entity_one, entity_two, axes_opposed=True, distance=0.0, *args):
+        return self._add("Insert", entity_one, entity_two)
+
+    def AddTangentConstraint(self, entity_one, entity_two, inside_tangency=False, *args):
+        return self._add("Tangent", entity_one, entity_two)
+
+class Occurrences(Collection):
+    """Assembly occurrences; Add() places a new one (reassembly)."""
+
+    def __init__(self, app, doc, items=()):
+        super().__init__(app.stats, items, "ComponentOccurrences")
+        object.__setattr__(self, "_app", app)
+        object.__setattr__(self, "_doc", doc)
+
+    def _place(self, part_doc, matrix):
+        n = sum(1 for o in self._items if o._props["Definition"]._props["Document"] is part_doc) + 1
+        occ = self._app._occurrence(
+            f"{_stem(part_doc._props['FullFileName'])}:{n}",
+            part_doc,
+            Matrix(self._stats, matrix._m),
+        )
+        self._append(occ)
+        return occ
+
+    def Add(self, path, matrix):
+        self._call("Add")
+        return self._place(self._app._open(path), matrix)
+
+    def AddByComponentDefinition(self, comp_def, matrix):
+        self._call("AddByComponentDefinition")
+        return self._place(comp_def._props["Document"], matrix)
+
+class Transaction(ComObject):
+    _com_type = "Transaction"
+
+    def End(self):
+        self._call("End")
+
+    def Abort(self):
+        self._call("Abort")
+
+class TransactionManager(ComObject):
+    _com_type = "TransactionManager"
+
+    def StartTransaction(self, doc, name):
+        self._call("StartTransaction")
+        return Transaction(self._stats, DisplayName=name)
+
+class FakeInventor(ComObject):
+    """
+    Offline Inventor.Application replaying exported JSON.
+
+    Assemblies resolve to the `assemblies_raw_export` schema, parts
+    to the `jsons` part schema, both looked up by file stem in
+    DATA_DIRS. Unknown files open as empty documents.
+    """
+
+    _com_type = "Application"
+
+    def __init__(self, latency_s=0.0, data_dirs=None):
+        stats = CallStats(latency_s)
+        super().__init__(stats, Visible=False, ScreenUpdating=True, SilentOperation=False)
+        object.__setattr__(self, "stats", stats)
+        object.__setattr__(self, "_dirs", [Path(d) for d in (data_dirs or DATA_DIRS)])
+        object.__setattr__(self, "_docs", {})
+
+        self._props["Documents"] = _Documents(self)
+        self._props["TransientGeometry"] = TransientGeometry(stats)
+        self._props["AssemblyOptions"] = ComObject(stats, "AssemblyOptions", DeferUpdate=False)
+        self._props["TransactionManager"] = TransactionManager(stats)
+
+    def Quit(self):
+        self._call("Quit")
+
+    # -------------------------------------------------
+    # document loading
+    # -------------------------------------------------
+    def _find_json(self, path, schema_key):
+        """First export named <stem>.json whose top level has `schema_key`."""
+        stem = _stem(path)
+        for d in self._dirs:
+            cand = d / f"{stem}.json"
+            if not cand.exists():
+                continue
+            raw = json.loads(cand.read_text(encoding="utf-8"))
+            if isinstance(raw, dict) and schema_key in raw:
+                return raw
+        return {}
+
+    def _open(self, path):
+        key = str(path).lower()
+        if key in self._docs:
+            return self._docs[key]
+
+        if key.endswith(".iam"):
+            doc = self._assembly(path, self._find_json(path, "components"))
+        else:
+            doc = self._part(path, self._find_json(path, "part_metadata"))
+
+        self._docs[key] = doc
+        return doc
+
+    def _new_document(self, path, doc_type, part_number):
+        s = self.stats
+        props = Collection(s, [
+            ComObject(s, "Property", Name="Part Number", Value=part_number),
+        ], "PropertySet")
+        prop_sets = Collection(s, [], "PropertySets")
+        prop_sets._append(props)
+        props._props["Name"] = "Design Tracking Properties"
+
+        return Document(
+            s,
+            DisplayName=_display_name(path),
+            FullFileName=str(path),
+            DocumentType=doc_type,
+            PropertySets=prop_sets,
+            ReferenceKeyManager=lazy(lambda: ReferenceKeyManager(s)),
+        )
+
+    # -------------------------------------------------
+    # assemblies
+    # -------------------------------------------------
+    def _occurrence(self, name, part_doc, matrix, grounded=False, suppressed=False):
+        s = self.stats
+        return Occurrence(
+            s,
+            Name=name,
+            Definition=part_doc._props["ComponentDefinition"],
+            Transformation=matrix,
+            Grounded=bool(grounded),
+            Suppressed=bool(suppressed),
+            Visible=True,
+            PatternElement=None,
+        )
+
+    def _assembly(self, path, raw):
+        s = self.stats
+        doc = self._new_document(path, kAssemblyDocumentObject, _stem(path))
+        occs = Occurrences(self, doc)
+        cons = AssemblyConstraints(s)
+
+        cdef = ComponentDefinition(
+            s,
+            Document=doc,
+            Occurrences=occs,
+            Constraints=cons,
+            Features=ComObject(
+                s, "AssemblyFeatures",
+                RectangularPatternFeatures=Collection(s, [], "RectangularPatternFeatures"),
+                CircularPatternFeatures=Collection(s, [], "CircularPatternFeatures"),
+            ),
+        )
+        doc._props["ComponentDefinition"] = cdef
+
+        by_name = {}
+        for comp in raw.get("components", []):
+            part_path = comp.get("full_file_path") or comp.get("file_name") or ""
+            part_doc = self._open(part_path)
+            occ = self._occurrence(
+                comp["occurrence_name"],
+                part_doc,
+                Matrix(s, _transform_rows(comp.get("transform"))),
+                comp.get("grounded"),
+                comp.get("suppressed"),
+            )
+            occs._append(occ)
+            by_name[comp["occurrence_name"]] = occ
+
+        for c in raw.get("constraints", []):
+            cons._append(self._constraint(c, by_name))
+
+        return doc
+
+    def _constraint(self, c, by_name):
+        s = self.stats
+        pair = c.get("component_pair") or {}
+        types = c.get("entity_types") or {}
+
+        occ1 = c.get("occurrence_one") or pair.get("occurrence_one_name")
+        occ2 = c.get("occurrence_two") or pair.get("occurrence_two_name")
+
+        def entity_type(side):
+            e = c.get(f"entity_{side}")
+            if isinstance(e, dict) and e.get("entity_type"):
+                return int(e["entity_type"])
+            t = c.get(f"entity_{side}_type") or types.get(f"entity_{side}_type")
+            return int(t) if t else kFaceObject
+
+        props = dict(
+            Name=c.get("constraint_name") or c.get("constraint_id"),
+            Type=c.get("constraint_type") or c.get("type"),
+            Suppressed=bool(c.get("suppressed", False)),
+            EntityOne=ComObject(s, "Entity", Type=entity_type("one")),
+            EntityTwo=ComObject(s, "Entity", Type=entity_type("two")),
+        )
+        if occ1 in by_name:
+            props["OccurrenceOne"] = by_name[occ1]
+        if occ2 in by_name:
+            props["OccurrenceTwo"] = by_name[occ2]
+
+        return ComObject(s, "AssemblyConstraint", **props)
+
+    # -------------------------------------------------
+    # parts
+    # -------------------------------------------------
+    def _part(self, path, raw):
+        s = self.stats
+        meta = raw.get("part_metadata", {})
+        doc = self._new_document(path, kPartDocumentObject, meta.get("part_number") or _stem(path))
+
+        holes = [
+            cp for cp in raw.get("connection_points", [])
+            if cp.get("feature_type") == "Hole"
+        ]
+
+        cdef = ComponentDefinition(
+            s,
+            Document=doc,
+            SurfaceBodies=lazy(lambda: Collection(s, [
+                ComObject(s, "SurfaceBody", Faces=Collection(s, self._faces(raw.get("faces", []), holes), "Faces"))
+            ], "SurfaceBodies")),
+            Features=lazy(lambda: ComObject(
+                s, "PartFeatures",
+                HoleFeatures=Collection(s, self._hole_features(holes), "HoleFeatures"),
+                RectangularPatternFeatures=Collection(s, [], "RectangularPatternFeatures"),
+                CircularPatternFeatures=Collection(s, [], "CircularPatternFeatures"),
+            )),
+            Sketches=Collection(s, [], "PlanarSketches"),
+            WorkAxes=Collection(s, [], "WorkAxes"),
+            WorkPoints=Collection(s, [], "WorkPoints"),
+        )
+        doc._props["ComponentDefinition"] = cdef
+        return doc
+
+    def _faces(self, faces, holes):
+        s = self.stats
+        out = []
+
+        for f in faces:
+            center = _xyz(f.get("center_mm"), 0.1)
+            normal = _xyz(f.get("normal"))
+
+            if f.get("face_type") == "Cylindrical":
+                radius, axis = self._cylinder_from_holes(center, holes)
+                geom = ComObject(
+                    s, "Cylinder",
+                    SurfaceType=kCylinderSurface,
+                    Radius=radius,
+                    BasePoint=Point(s, *center),
+                    Axis=ComObject(
+                        s, "Line",
+                        RootPoint=Point(s, *center),
+                        Direction=Vector(s, *(axis or normal)),
+                    ),
+                )
+                stype = kCylinderSurface
+            else:
+                geom = ComObject(
+                    s, "Plane",
+                    SurfaceType=kPlaneSurface,
+                    RootPoint=Point(s, *center),
+                    Normal=Vector(s, *normal),
+                )
+                stype = kPlaneSurface
+
+            out.append(ComObject(
+                s, "Face",
+                SurfaceType=stype,
+                Geometry=geom,
+                IsParamReversed=False,
+                TransientKey=int(f.get("face_id") or len(out) + 1),
+                Type=kFaceObject,
+            ))
+
+        return out
+
+    @staticmethod
+    def _cylinder_from_holes(center_cm, holes):
+        """
+        Part exports carry no cylinder radius / axis, so borrow them from
+        the connection point whose axis line passes closest to the face.
+        """
+        best = None
+        for h in holes:
+            g = h.get("geometry", {})
+            c = _xyz(g.get("center_mm"), 0.1)
+            a = _xyz(g.get("axis"))
+            d = [center_cm[i] - c[i] for i in range(3)]
+            t = d[0]*a[0] + d[1]*a[1] + d[2]*a[2]
+            off = sum((d[i] - t*a[i])**2 for i in range(3))
+            if best is None or off < best[0]:
+                best = (off, h, a)
+
+        if best is None:
+            return DEFAULT_HOLE_RADIUS_CM, None
+
+        dia = (best[1].get("hole_properties") or {}).get("diameter_mm")
+        radius = dia / 20.0 if dia else DEFAULT_HOLE_RADIUS_CM
+        return radius, best[2]
+
+    def _hole_features(self, holes):
+        s = self.stats
+        by_feature = {}
+        for h in holes:
+            by_feature.setdefault(h.get("feature_name") or "Hole", []).append(h)
+
+        out = []
+        for name, pts in by_feature.items():
+            first = pts[0]
+            props = first.get("hole_properties") or {}
+            axis = _xyz(first.get("geometry", {}).get("axis"))
+            dia = props.get("diameter_mm") or 0.0
+
+            sketch_points = Collection(s, [
+                ComObject(s, "SketchPoint", Geometry3d=Point(s, *_xyz(p.get("geometry", {}).get("center_mm"), 0.1)))
+                for p in pts
+            ], "SketchPoints")
+
+            hdef = ComObject(
+                s, "HoleDefinition",
+                Diameter=ComObject(s, "Parameter", Value=dia / 10.0),
+                Tapped=bool(props.get("is_threaded")),
+                TapInfo=ComObject(s, "TapInfo", MajorDiameter=dia / 10.0),
+            )
+
+            out.append(ComObject(
+                s, "HoleFeature",
+                Name=name,
+                Type=kHoleFeatureObject,
+                Suppressed=False,
+                HoleType=0,
+                Definition=hdef,
+                HoleDefinition=hdef,
+                PlacementDefinition=ComObject(
+                    s, "HolePlacementDefinition",
+                    Type=kSketchPlacement,
+                    Sketch=ComObject(s, "PlanarSketch", PlanarEntityGeometry=ComObject(s, "Plane", Normal=Vector(s, *axis))),
+                    SketchPoints=sketch_points,
+                ),
+            ))
+
+        return out
+
+class _Documents(Collection):
+    def __init__(self, app):
+        super().__init__(app.stats, [], "Documents")
+        object.__setattr__(self, "_app", app)
+
+    def Open(self, path, visible=True):
+        self._call("Open")
+        doc = self._app._open(path)
+        if doc not in self._items:
+            self._append(doc)
+        return doc
+
+    def Add(self, doc_type, template="", visible=True):
+        self._call("Add")
+        ext = ".iam" if doc_type == kAssemblyDocumentObject else ".ipt"
+        path = f"Untitled{len(self._items) + 1}{ext}"
+        doc = self._app._assembly(path, {}) if ext == ".iam" else self._app._part(path, {})
+        self._append(doc)
+        return doc
+
+# =====================================================
+# win32com / pythoncom STAND-INS
+# =====================================================
+def install(app=None, latency_s=0.0):
+    """
+    Register fake `win32com.client` and `pythoncom` modules so the
+    extractors import them unchanged. Returns the FakeInventor.
+    """
+    if app is None:
+        app = FakeInventor(latency_s)
+
+    def _get(prog_id):
+        return app
+
+    client = types.ModuleType("win32com.client")
+    client.Dispatch = _get
+    client.DispatchEx = _get
+    client.GetActiveObject = _get
+
+    win32com = types.ModuleType("win32com")
+    win32com.client = client
+
+    pythoncom = types.ModuleType("pythoncom")
+    pythoncom.CoInitialize = lambda: None
+    pythoncom.CoUninitialize = lambda: None
+
+    sys.modules["win32com"] = win32com
+    sys.modules["win32com.client"] = client
+    sys.modules["pythoncom"] = pythoncom
+
+    return app
+
+# =====================================================
+# OFFLINE EXTRACTOR RUNNER
+# =====================================================
+def _placeholder(path):
+    """
+    Stand-in file for a document the replay opens by name. Its content
+    is the name, so the extraction cache (keyed by content hash) keeps
+    one entry per part instead of serving the first part for all.
+    """
+    path = Path(path)
+    path.write_text(path.name, encoding="utf-8")
+
+def _stage_parts(folder):
+    """*.ipt placeholders for every part export (holes.py globs a folder)."""
+    for d in DATA_DIRS:
+        for j in d.glob("*.json"):
+            try:
+                raw = json.loads(j.read_text(encoding="utf-8"))
+            except ValueError:
+                continue
+            if isinstance(raw, dict) and "part_metadata" in raw:
+                _placeholder(folder / f"{j.stem}.ipt")
+
+def _stage_bom(app, assembly, path):
+    """BOM marking every part as a fastener so geofastax walks all occurrences."""
+    doc = app._open(assembly)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        w = csv.DictWriter(f, fieldnames=["Title", "Part Title"])
+        w.writeheader()
+        for occ in doc._props["ComponentDefinition"]._props["Occurrences"]._items:
+            part_doc = occ._props["Definition"]._props["Document"]
+            pn = part_doc._props["PropertySets"]._items[0]._items[0]._props["Value"]
+            w.writerow({"Title": pn, "Part Title": "RIVET"})
+
+def _stage_reassembly(assembly, folder):
+    """Copy of an assembly export with *.ipt placeholders beside it."""
+    for d in DATA_DIRS:
+        src = d / f"{assembly}.json"
+        if not src.exists():
+            continue
+        raw = json.loads(src.read_text(encoding="utf-8"))
+        if isinstance(raw, dict) and "components" in raw:
+            break
+    else:
+        raise FileNotFoundError(f"No assembly export for {assembly}")
+
+    dst = folder / src.name
+    dst.write_text(json.dumps(raw), encoding="utf-8")
+    for comp in raw["components"]:
+        _placeholder(folder / PureWindowsPath(comp["file_name"]).name)
+    return dst
+
+def run_extractor(script, assembly, part, out_dir, latency_s=0.0):
+    """Run one extractor's run() against the replay and return call stats."""
+    app = install(latency_s=latency_s)
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    # a private cache per run: nothing lands in the real cache root and
+    # no result of an earlier replay is served back
+    from extraction_cache import CACHE
+    CACHE.use(out_dir / ".cache")
+
+    mod = importlib.import_module(script)
+    out = out_dir / f"{script}.json"
+
+    if script in ("ain1", "geov1"):
+        mod.ASSEMBLY_PATH = f"{assembly}.iam"
+        mod.OUT_JSON = out
+    elif script == "extractor1":
+        mod.ASSEMBLY_PATH = f"{assembly}.iam"
+        mod.OUTPUT_JSON = str(out)
+    elif script == "geofastax":
+        mod.ASSEMBLY_PATH = out_dir / f"{assembly}.iam"
+        _placeholder(mod.ASSEMBLY_PATH)
+        mod.BOM_CSV_PATH = out_dir / f"BOM_{assembly}.csv"
+        _stage_bom(app, mod.ASSEMBLY_PATH, mod.BOM_CSV_PATH)
+        mod.OUTPUT_JSON = out
+    elif script == "holes":
+        parts = out_dir / "parts"
+        parts.mkdir(exist_ok=True)
+        _stage_parts(parts)
+        mod.PART_PATH = str(parts)
+        mod.OUTPUT_JSON = str(out)
+    elif script in ("phe", "test"):
+        mod.PART_PATH = f"{part}.ipt"
+        mod.OUT_JSON = out if script == "test" else str(out)
+    elif script == "reassemble2":
+        # transform-only rebuild, placements read back against the export
+        export = _stage_reassembly(assembly, out_dir)
+        app.stats.reset()
+        summary = mod.build_exact_assembly(
+            str(export), str(out_dir / f"{assembly}_reassembled.iam"),
+            transform_only=True, verify=True,
+        )
+        report = app.stats.report()
+        report["placements"] = summary
+        return report
+    else:
+        raise ValueError(f"Unknown extractor: {script}")
+
+    app.stats.reset()
+    mod.run()
+    report = app.stats.report()
+
+    # what the extractor's own instrumentation (metrics.py) counted
+    metrics_file = Path(metrics_path(out))
+    if metrics_file.exists():
+        m = json.loads(metrics_file.read_text(encoding="utf-8"))
+        report["metrics"] = {"com_calls": m["com_calls"], "part_count": m["part_count"], "file": str(metrics_file)}
+    return report
+
+# =====================================================
+# CLI
+# =====================================================
+EXTRACTORS = ["ain1", "extractor1", "geofastax", "geov1", "holes", "phe", "reassemble2", "test"]
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(description="Run an extractor against the offline Inventor replay")
+    ap.add_argument("script", choices=EXTRACTORS)
+    ap.add_argument("--assembly", default="1650612700-M1", help="assembly export stem")
+    ap.add_argument("--part", default="1625891052-P1", help="part export stem")
+    ap.add_argument("--latency-ms", type=float, default=0.0, help="simulated cost per COM call")
+    ap.add_argument("--out-dir", default=None)
+    args = ap.parse_args(argv)
+
+    sys.path.insert(0, str(ROOT))
+    out_dir = args.out_dir or tempfile.mkdtemp(prefix="fake_inventor_")
+
+    report = run_extractor(args.script, args.assembly, args.part, out_dir, args.latency_ms / 1000.0)
+    report["script"] = args.script
+    report["out_dir"] = str(out_dir)
+
+    print(json.dumps(report, indent=4))
+
+if __name__ == "__main__":
+    main()
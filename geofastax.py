@@ -5,6 +5,9 @@ import win32com.client
 import pythoncom
 from pathlib import Path
 
+from part_classifier import KeywordClassifier
+from transforms import TRANSFORMS
+
 # =====================================================
 # CONFIG
 # =====================================================
@@ -30,15 +33,16 @@ def connect_inventor():
 # BOM FASTENER PARSING
 # =====================================================
 def read_fastener_part_numbers(csv_path):
+    is_fastener = KeywordClassifier(FASTENER_KEYWORDS)
     fasteners = set()
 
     with open(csv_path, newline="", encoding="utf-8-sig") as f:
         reader = csv.DictReader(f)
         for row in reader:
-            desc = (row.get("Part Title") or row.get("Description") or "").upper()
+            desc = row.get("Part Title") or row.get("Description") or ""
             title = (row.get("Title") or "").strip()
 
-            if any(k in desc for k in FASTENER_KEYWORDS):
+            if is_fastener(desc):
                 fasteners.add(title)
 
     return fasteners
@@ -46,23 +50,15 @@ def read_fastener_part_numbers(csv_path):
 # =====================================================
 # TRANSFORM → AXIS EXTRACTION (CORE)
 # =====================================================
-def extract_axis_from_transform(occ):
+def extract_axis_from_transform(occ, name=None):
     """
     Fastener axis = local Z axis of transform
     """
-    m = occ.Transformation
+    M = TRANSFORMS.occurrence(occ, name)
 
-    direction = [
-        m.Cell(1, 3),
-        m.Cell(2, 3),
-        m.Cell(3, 3)
-    ]
+    direction = M[:3, 2].tolist()
 
-    origin = [
-        m.Cell(1, 4),
-        m.Cell(2, 4),
-        m.Cell(3, 4)
-    ]
+    origin = M[:3, 3].tolist()
 
     return origin, direction
 
@@ -71,6 +67,7 @@ def extract_axis_from_transform(occ):
 # =====================================================
 def run():
     pythoncom.CoInitialize()
+    TRANSFORMS.clear()
 
     if not ASSEMBLY_PATH.exists():
         raise FileNotFoundError("Assembly not found")
@@ -102,10 +99,11 @@ def run():
             if part_number not in fastener_part_numbers:
                 continue
 
-            origin, direction = extract_axis_from_transform(occ)
+            name = occ.Name
+            origin, direction = extract_axis_from_transform(occ, name)
 
             output.append({
-                "occurrence": occ.Name,
+                "occurrence": name,
                 "part_number": part_number,
                 "origin": origin,
                 "direction": direction,
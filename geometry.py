@@ -0,0 +1,171 @@
+import numpy as np
+
+# =====================================================
+# CONSTANTS
+# =====================================================
+MM_PER_CM = 10.0
+
+# =====================================================
+# ARRAY CONSTRUCTION
+# =====================================================
+def as_points(rows):
+    """(N, 3) contiguous float64 array from lists / tuples / arrays."""
+    arr = np.ascontiguousarray(rows, dtype=np.float64)
+    if arr.size == 0:
+        return np.zeros((0, 3), dtype=np.float64)
+    return arr.reshape(-1, 3)
+
+def com_points(objs):
+    """(N, 3) array from Inventor Point / Vector / UnitVector objects."""
+    return as_points([(o.X, o.Y, o.Z) for o in objs])
+
+def as_matrix(cells):
+    """(4, 4) float64 matrix from a nested list or 16 row-major values."""
+    return np.ascontiguousarray(cells, dtype=np.float64).reshape(4, 4)
+
+def stack_matrices(mats):
+    """(K, 4, 4) array from a sequence of 4x4 matrices."""
+    if len(mats) == 0:
+        return np.zeros((0, 4, 4), dtype=np.float64)
+    return np.ascontiguousarray(mats, dtype=np.float64).reshape(-1, 4, 4)
+
+def rigid_matrix(rotation, translation):
+    """4x4 homogeneous matrix from a 3x3 rotation and a translation."""
+    M = np.eye(4)
+    M[:3, :3] = rotation
+    M[:3, 3] = translation
+    return M
+
+# =====================================================
+# BATCHED TRANSFORMS
+# =====================================================
+def transform_points(M, P):
+    """
+    Apply one 4x4 matrix to N points, or K matrices to the same N points.
+
+    M: (4, 4) -> (N, 3)
+    M: (K, 4, 4) -> (K, N, 3)
+    """
+    M = np.asarray(M, dtype=np.float64)
+    P = as_points(P)
+    return P @ np.swapaxes(M[..., :3, :3], -1, -2) + M[..., None, :3, 3]
+
+def transform_vectors(M, V):
+    """Rotation-only counterpart of transform_points."""
+    M = np.asarray(M, dtype=np.float64)
+    V = as_points(V)
+    return V @ np.swapaxes(M[..., :3, :3], -1, -2)
+
+def transform_points_each(Ms, P):
+    """Row-wise transform: point i by matrix i. Ms (N, 4, 4), P (N, 3)."""
+    Ms = stack_matrices(Ms)
+    P = as_points(P)
+    return np.einsum("nij,nj->ni", Ms[:, :3, :3], P) + Ms[:, :3, 3]
+
+def transform_vectors_each(Ms, V):
+    """Row-wise rotation: vector i by matrix i. Ms (N, 4, 4), V (N, 3)."""
+    Ms = stack_matrices(Ms)
+    V = as_points(V)
+    return np.einsum("nij,nj->ni", Ms[:, :3, :3], V)
+
+# =====================================================
+# BATCHED VECTOR MATH
+# =====================================================
+def lengths(V):
+    V = as_points(V)
+    return np.sqrt(V[:, 0]**2 + V[:, 1]**2 + V[:, 2]**2)
+
+def normalize(V):
+    """Unit rows; zero-length rows are returned unchanged."""
+    V = as_points(V)
+    l = lengths(V)
+    out = V.copy()
+    nz = l != 0
+    out[nz] = V[nz] / l[nz, None]
+    return out
+
+def row_dot(A, B):
+    """Row-wise dot product of two (N, 3) arrays (or broadcastable)."""
+    A = np.asarray(A, dtype=np.float64)
+    B = np.asarray(B, dtype=np.float64)
+    return A[..., 0]*B[..., 0] + A[..., 1]*B[..., 1] + A[..., 2]*B[..., 2]
+
+def distances(A, B):
+    """Row-wise Euclidean distance of two (N, 3) arrays (or broadcastable)."""
+    D = np.asarray(A, dtype=np.float64) - np.asarray(B, dtype=np.float64)
+    return np.sqrt(D[..., 0]**2 + D[..., 1]**2 + D[..., 2]**2)
+
+# =====================================================
+# CLUSTERING
+# =====================================================
+# fixed, "generic" direction: an axis and its reverse are told apart by
+# the sign of their dot product with it (no principal or 45° axis is
+# perpendicular to it)
+_SIGN_REF = np.array([0.8532, 0.4539, 0.2571]) / np.linalg.norm([0.8532, 0.4539, 0.2571])
+
+def canonical_axes(origins, directions):
+    """
+    (D, F): unit directions flipped to one orientation, and each axis
+    line's point closest to the coordinate origin. Two cylinders on the
+    same line get the same (D, F) whichever base point or sense they had.
+    """
+    P = as_points(origins)
+    D = normalize(directions)
+    flip = row_dot(D, _SIGN_REF) < 0
+    D[flip] *= -1.0
+    F = P - row_dot(P, D)[:, None] * D
+    return D, F
+
+def _split_gaps(labels, values, tol):
+    """Refine `labels`: within each group, sorted values further apart than `tol` start a new group."""
+    order = np.lexsort((values, labels))
+    l, v = labels[order], values[order]
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (l[1:] != l[:-1]) | (np.diff(v) > tol)
+    out = np.empty_like(labels)
+    out[order] = np.cumsum(new) - 1
+    return out
+
+def coaxial_groups(origins, directions, radii, line_tol=1e-3, dir_tol=1e-4, radius_tol=1e-3):
+    """
+    Group cylinders sharing an axis line and radius.
+
+    Each cylinder is described by (direction, closest point of its axis
+    line, radius). Groups are refined one coordinate at a time: sorted
+    within the current groups, a gap larger than that coordinate's
+    tolerance starts a new group. Values within tolerance therefore
+    never split on a rounding boundary, and the cost is one sort per
+    coordinate, not a pairwise comparison. Returns (labels, first):
+    labels[i] is the group of cylinder i, first[g] the index of group
+    g's first member, groups numbered in order of first appearance.
+    """
+    R = np.asarray(radii, dtype=np.float64).reshape(-1)
+    if len(R) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+    D, F = canonical_axes(origins, directions)
+    labels = np.zeros(len(R), dtype=np.intp)
+
+    for values, tol in (
+        (D[:, 0], dir_tol), (D[:, 1], dir_tol), (D[:, 2], dir_tol),
+        (F[:, 0], line_tol), (F[:, 1], line_tol), (F[:, 2], line_tol),
+        (R, radius_tol),
+    ):
+        labels = _split_gaps(labels, values, tol)
+
+    _, first, labels = np.unique(labels, return_index=True, return_inverse=True)
+
+    order = np.argsort(first, kind="stable")
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    return rank[labels.reshape(-1)], first[order]
+
+# =====================================================
+# OUTPUT
+# =====================================================
+def to_rows(arr, ndigits=None):
+    """Nested Python lists for JSON output, optionally rounded per value."""
+    rows = np.asarray(arr).tolist()
+    if ndigits is None:
+        return rows
+    return [[round(x, ndigits) for x in r] for r in rows]
@@ -4,6 +4,8 @@ import json
 import time
 from pathlib import Path
 
+from transforms import TRANSFORMS
+
 # =====================================================
 # CONFIG
 # =====================================================
@@ -25,21 +27,13 @@ def connect_inventor():
 # =====================================================
 # TRANSFORM EXTRACTION (SAFE)
 # =====================================================
-def extract_transform(occ):
-    m = occ.Transformation
+def extract_transform(occ, name=None):
+    M = TRANSFORMS.occurrence(occ, name)
 
-    origin = [
-        float(m.Cell(1, 4)),
-        float(m.Cell(2, 4)),
-        float(m.Cell(3, 4))
-    ]
+    origin = M[:3, 3].tolist()
 
     # Z-axis of occurrence (direction)
-    z_axis = [
-        float(m.Cell(1, 3)),
-        float(m.Cell(2, 3)),
-        float(m.Cell(3, 3))
-    ]
+    z_axis = M[:3, 2].tolist()
 
     return {
         "origin": origin,
@@ -51,6 +45,7 @@ def extract_transform(occ):
 # =====================================================
 def run():
     pythoncom.CoInitialize()
+    TRANSFORMS.clear()
 
     inv = connect_inventor()
     doc = inv.Documents.Open(ASSEMBLY_PATH, True)
@@ -62,7 +57,8 @@ def run():
 
     for occ in asm.Occurrences:
         try:
-            geometry["occurrences"][occ.Name] = extract_transform(occ)
+            name = occ.Name
+            geometry["occurrences"][name] = extract_transform(occ, name)
         except Exception as e:
             print(f"⚠️ Skipped {occ.Name}: {e}")
 
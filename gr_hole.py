@@ -1,34 +1,58 @@
 import json
-from collections import defaultdict
+from collections import Counter, defaultdict
 from pathlib import Path
 
+from stream_writer import iter_records
+
+# .json (one top-level array) or .jsonl (one hole per line); both are streamed
 INPUT_JSON  = Path(r"E:\Phase 1\extractions\inferred_holes.json")
 OUTPUT_JSON = Path(r"E:\Phase 1\extractions\grouped_holes.json")
 
-with open(INPUT_JSON, "r", encoding="utf-8") as f:
-    holes = json.load(f)
+KEEP_INSTANCES = True   # False: only counts per group, memory bounded by groups
+
+def group_holes(holes, keep_instances=True):
+    """
+    Grouped-hole entries by (plate, fastener part number) from any
+    iterable of holes. Without `keep_instances` only a count is kept
+    per group and entries carry no "instances" list.
+    """
+    grouped = defaultdict(list) if keep_instances else Counter()
+
+    for h in holes:
+        plate = h["hole_stack"][0]
+        fastener_type = h["fastener"].split(":")[0]  # part number only
+
+        key = (plate, fastener_type)
+        if keep_instances:
+            grouped[key].append(h["fastener"])
+        else:
+            grouped[key] += 1
+
+    result = []
+
+    for (plate, fastener), instances in grouped.items():
+        count = len(instances) if keep_instances else instances
 
-grouped = defaultdict(list)
+        entry = {
+            "plate": plate,
+            "fastener_type": fastener,
+            "hole_count": count
+        }
+        if keep_instances:
+            entry["instances"] = instances
+        entry["confidence"] = round(0.8 + 0.01 * count, 2)
 
-for h in holes:
-    plate = h["hole_stack"][0]
-    fastener_type = h["fastener"].split(":")[0]  # part number only
+        result.append(entry)
 
-    key = (plate, fastener_type)
-    grouped[key].append(h["fastener"])
+    return result
 
-result = []
+def run():
+    result = group_holes(iter_records(INPUT_JSON), KEEP_INSTANCES)
 
-for (plate, fastener), instances in grouped.items():
-    result.append({
-        "plate": plate,
-        "fastener_type": fastener,
-        "hole_count": len(instances),
-        "instances": instances,
-        "confidence": round(0.8 + 0.01 * len(instances), 2)
-    })
+    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
+        json.dump(result, f, indent=4)
 
-with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-    json.dump(result, f, indent=4)
+    print(f"✅ Grouped holes written → {OUTPUT_JSON}")
 
-print(f"✅ Grouped holes written → {OUTPUT_JSON}")
\ No newline at end of file
+if __name__ == "__main__":
+    run()
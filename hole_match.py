@@ -0,0 +1,122 @@
+from collections import defaultdict
+from math import floor
+
+import numpy as np
+
+import geometry
+
+# =====================================================
+# DEFAULT MATCH TOLERANCES (PHASE-5)
+# =====================================================
+MIN_AXIS_DOT    = 0.95   # |cos| between fastener and hole axes
+MAX_CENTER_DIST = 1.5    # center proximity (model units)
+MAX_DIA_DELTA   = 0.3    # diameter compatibility (mm)
+
+# grid cells are padded slightly so float rounding in floor()
+# can never push a true neighbour two cells away
+_CELL_PAD = 1.0 + 1e-9
+
+# =====================================================
+# SPATIAL HOLE INDEX
+# =====================================================
+class HoleIndex:
+    """
+    Uniform grid over hole centers, bucketed by diameter.
+
+    A query only visits the 3x3x3 neighbouring cells of its own
+    center, in the neighbouring diameter buckets, so matching N
+    fasteners against M holes costs O(N + M) instead of O(N * M).
+    """
+
+    def __init__(self, holes,
+                 max_dist=MAX_CENTER_DIST,
+                 max_dia_delta=MAX_DIA_DELTA):
+        self.holes = list(holes)
+        self.max_dist = max_dist
+        self.max_dia_delta = max_dia_delta
+
+        self._cell = max_dist * _CELL_PAD
+        self._dia_bucket = max_dia_delta * _CELL_PAD
+        self._grid = defaultdict(list)
+
+        self.centers = geometry.as_points([h["center"] for h in self.holes])
+        self.directions = geometry.as_points([h["direction"] for h in self.holes])
+        self.diameters = np.array([h["diameter_mm"] for h in self.holes], dtype=np.float64)
+
+        for i, h in enumerate(self.holes):
+            self._grid[self._key(h["center"], h["diameter_mm"])].append(i)
+
+    def _key(self, center, diameter):
+        c = self._cell
+        return (
+            floor(center[0] / c),
+            floor(center[1] / c),
+            floor(center[2] / c),
+            floor(diameter / self._dia_bucket)
+        )
+
+    def candidates(self, center, diameter):
+        """Indices of holes in the neighbouring cells, in insertion order."""
+        cx, cy, cz, cd = self._key(center, diameter)
+        found = []
+
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for dd in (-1, 0, 1):
+                        found.extend(self._grid.get((cx+dx, cy+dy, cz+dz, cd+dd), ()))
+
+        found.sort()
+        return found
+
+    def query(self, fastener, min_axis_dot=MIN_AXIS_DOT):
+        """
+        Holes compatible with a fastener axis record.
+
+        Applies exactly the Phase-5 checks: different occurrence,
+        axis alignment, center proximity and diameter compatibility.
+        """
+        idx = np.array(self.candidates(fastener["center"], fastener["diameter_mm"]), dtype=np.intp)
+        if idx.size == 0:
+            return []
+
+        ok = (
+            (np.abs(geometry.row_dot(self.directions[idx], fastener["direction"])) >= min_axis_dot)
+            & (geometry.distances(self.centers[idx], fastener["center"]) <= self.max_dist)
+            & (np.abs(fastener["diameter_mm"] - self.diameters[idx]) <= self.max_dia_delta)
+        )
+
+        occ = fastener["occurrence"]
+        return [
+            self.holes[i] for i in idx[ok]
+            if self.holes[i]["occurrence"] != occ
+        ]
+
+# =====================================================
+# RIVET STACK MATCHING
+# =====================================================
+def match_rivet_stacks(fastener_axes, holes, index=None):
+    """
+    Phase-5 blind rivet stack inference over a spatial index.
+
+    Returns the same `rivet_stacks` list as the original
+    all-pairs loop in ain1.run().
+    """
+    if index is None:
+        index = HoleIndex(holes)
+
+    stacks = []
+
+    for f in fastener_axes:
+        plates = sorted({h["occurrence"] for h in index.query(f)})
+
+        if plates:
+            stacks.append({
+                "fastener": f["occurrence"],
+                "plates": plates,
+                "stack_size": len(plates),
+                "type": "blind_rivet",
+                "confidence": 0.98
+            })
+
+    return stacks
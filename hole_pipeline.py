@@ -0,0 +1,57 @@
+import argparse
+import json
+from pathlib import Path
+
+import gr_hole
+import validate
+from stream_writer import iter_records
+
+# =====================================================
+# CONFIG
+# =====================================================
+INPUT_JSON  = gr_hole.INPUT_JSON
+BOM_JSON    = validate.BOM_JSON
+OUTPUT_JSON = validate.OUTPUT_JSON
+
+# =====================================================
+# PIPELINE
+# =====================================================
+def _dump(records, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(records, f, indent=4)
+
+def validate_holes(holes, bom, dump_grouped=None):
+    """
+    Holes → grouped entries → validation records, all in memory.
+
+    `holes` is any iterable of inferred-hole records. With
+    `dump_grouped` the grouped entries are also written there, in the
+    same form as gr_hole.py's output; only then are per-group instance
+    lists kept.
+    """
+    grouped = gr_hole.group_holes(holes, keep_instances=bool(dump_grouped))
+
+    if dump_grouped:
+        _dump(grouped, dump_grouped)
+
+    return list(validate.validate_groups(grouped, bom))
+
+def run(input_json=INPUT_JSON, bom_json=BOM_JSON, output_json=OUTPUT_JSON, dump_grouped=None):
+    holes = iter_records(input_json)   # .json array or .jsonl, streamed
+    results = validate_holes(holes, validate.load_bom(Path(bom_json)), dump_grouped)
+    _dump(results, output_json)
+
+    print("✅ Hole grouping + validation complete")
+    print(f"   Output → {output_json}")
+    if dump_grouped:
+        print(f"   Grouped → {dump_grouped}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Group inferred holes and validate them in one pass")
+    ap.add_argument("input", nargs="?", default=str(INPUT_JSON), help="inferred_holes.json or .jsonl")
+    ap.add_argument("--bom", default=str(BOM_JSON))
+    ap.add_argument("-o", "--output", default=str(OUTPUT_JSON))
+    ap.add_argument("--dump-grouped", default=None, help="also write grouped_holes.json here")
+    args = ap.parse_args()
+
+    run(args.input, args.bom, args.output, args.dump_grouped)
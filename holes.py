@@ -1,33 +1,112 @@
 import win32com.client
-import json
 import math
 from pathlib import Path
 
+import geometry
+from extraction_cache import CACHE
+from metrics import METRICS
+from transforms import TRANSFORMS
+from stream_writer import compile_json_list, journal_path, open_journal
+
 # ==============================
 # CONFIG
 # ==============================
 PART_PATH = r"E:\Phase 1\Assembly 1"      # folder with IPTs
 OUTPUT_JSON = r"E:\Phase 1\extractions\part_holes.json"
 
+CACHE_VERSION = "2"   # bump when extract_holes_from_part output changes
+
+RESUME = True         # continue an interrupted run from its journal
+
 # ==============================
 # HELPERS
 # ==============================
-def mm(val_cm):
-    return round(val_cm * 10, 4)
-
-def pt_mm(pt):
-    return [mm(pt.X), mm(pt.Y), mm(pt.Z)]
+def pts_mm(pts):
+    """COM points (cm) → rounded mm rows, converted in one batch."""
+    return geometry.to_rows(geometry.com_points(pts) * geometry.MM_PER_CM, 4)
 
 def vec(v):
-    return [round(v.X, 4), round(v.Y, 4), round(v.Z, 4)]
+    return geometry.to_rows(geometry.com_points([v]), 4)[0]
 
 # ==============================
-# CONNECT INVENTOR
+# PATTERN EXPANSION
 # ==============================
-inv = win32com.client.Dispatch("Inventor.Application")
-inv.Visible = True
+def pattern_parent_hole(pat):
+    for i in range(1, pat.ParentFeatures.Count + 1):
+        pf = pat.ParentFeatures.Item(i)
+        if pf.Type == 83886912:  # kHoleFeatureObject
+            return pf
+    return None
+
+def expand_pattern(pat, kind):
+    """
+    Hole records for every unsuppressed element of a hole pattern.
+
+    Each element's Transformation is read once (one GetMatrixData);
+    all seed points of the parent hole's sketch and its axis are then
+    moved by every element transform in one NumPy broadcast, instead
+    of a Copy() + TransformBy() round trip per element.
+    """
+    parent = pattern_parent_hole(pat)
+    if not parent:
+        return []
+
+    hdef = parent.Definition
+    pdef = parent.PlacementDefinition
+    if pdef.Type != 0:
+        return []
+
+    plane = pdef.Sketch.PlanarEntityGeometry
+    axis = geometry.com_points([plane.Normal.AsVector()])
+
+    try:
+        dia = hdef.Diameter.Value * 10
+    except:
+        dia = None
+
+    seeds = geometry.com_points([pt.Geometry3d for pt in pdef.SketchPoints])
+
+    elem_idx = []
+    elem_mats = []
+
+    for occ in pat.PatternElements:
+        if occ.Suppressed:
+            continue
+
+        elem_idx.append(occ.Index)
+        elem_mats.append(TRANSFORMS.read(occ.Transformation))
 
-results = []
+    if not elem_idx or len(seeds) == 0:
+        return []
+
+    name = pat.Name
+    Ms = geometry.stack_matrices(elem_mats)
+    centers = geometry.transform_points(Ms, seeds) * geometry.MM_PER_CM   # (K, N, 3)
+    axes = geometry.transform_vectors(Ms, axis)[:, 0]                      # (K, 3)
+
+    out = []
+    for idx, pts, ax in zip(elem_idx, centers, axes):
+        axis_vec = geometry.to_rows([ax], 4)[0]
+        for center in geometry.to_rows(pts, 4):
+            out.append({
+                "feature": f"{name}:{idx}",
+                "diameter_mm": dia,
+                "axis": axis_vec,
+                "center_mm": center,
+                "patterned": True,
+                "pattern_parent": name,
+                "pattern_type": kind
+            })
+
+    return out
+
+# ==============================
+# CONNECT INVENTOR
+# ==============================
+def connect():
+    inv = win32com.client.Dispatch("Inventor.Application")
+    inv.Visible = True
+    return inv
 
 # ==============================
 # CORE EXTRACTION
@@ -37,108 +116,121 @@ def extract_holes_from_part(part_doc):
     holes_out = []
 
     # ---------- 1. Direct Hole Features ----------
-    for hole in cd.Features.HoleFeatures:
-        if hole.Suppressed:
-            continue
+    with METRICS.phase("hole_features"):
+        for hole in cd.Features.HoleFeatures:
+            if hole.Suppressed:
+                continue
 
-        hdef = hole.Definition
-        pdef = hole.PlacementDefinition
+            hdef = hole.Definition
+            pdef = hole.PlacementDefinition
 
-        # --- Diameter ---
-        dia = None
-        try:
-            dia = hdef.Diameter.Value * 10
-        except:
+            # --- Diameter ---
+            dia = None
             try:
-                dia = hdef.TapInfo.MajorDiameter * 10
+                dia = hdef.Diameter.Value * 10
             except:
-                dia = None
-
-        # --- Axis + Center ---
-        if pdef.Type == 0:  # kSketchPlacementDefinition
-            plane = pdef.Sketch.PlanarEntityGeometry
-            axis_vec = vec(plane.Normal.AsVector())
-
-            for pt in pdef.SketchPoints:
-                center = pt_mm(pt.Geometry3d)
-                holes_out.append({
-                    "feature": hole.Name,
-                    "diameter_mm": dia,
-                    "axis": axis_vec,
-                    "center_mm": center,
-                    "patterned": False
-                })
-
-    # ---------- 2. Rectangular Patterns ----------
-    for pat in cd.Features.RectangularPatternFeatures:
-        if pat.Suppressed:
-            continue
-
-        parent = None
-        for i in range(1, pat.ParentFeatures.Count + 1):
-            pf = pat.ParentFeatures.Item(i)
-            if pf.Type == 83886912:  # kHoleFeatureObject
-                parent = pf
-                break
+                try:
+                    dia = hdef.TapInfo.MajorDiameter * 10
+                except:
+                    dia = None
+
+            # --- Axis + Center ---
+            if pdef.Type == 0:  # kSketchPlacementDefinition
+                plane = pdef.Sketch.PlanarEntityGeometry
+                axis_vec = vec(plane.Normal.AsVector())
+
+                centers = pts_mm([pt.Geometry3d for pt in pdef.SketchPoints])
+
+                for center in centers:
+                    holes_out.append({
+                        "feature": hole.Name,
+                        "diameter_mm": dia,
+                        "axis": axis_vec,
+                        "center_mm": center,
+                        "patterned": False
+                    })
+
+    # ---------- 2. Rectangular + Circular Patterns ----------
+    with METRICS.phase("pattern_expansion"):
+        features = cd.Features
+
+        for kind, patterns in (
+            ("rectangular", features.RectangularPatternFeatures),
+            ("circular", features.CircularPatternFeatures),
+        ):
+            for pat in patterns:
+                if pat.Suppressed:
+                    continue
+                holes_out.extend(expand_pattern(pat, kind))
 
-        if not parent:
-            continue
+    return holes_out
 
-        hdef = parent.Definition
-        pdef = parent.PlacementDefinition
-        if pdef.Type != 0:
+# ==============================
+# MAIN
+# ==============================
+def run(resume=RESUME):
+    METRICS.reset("holes", PART_PATH)
+    inv = None
+
+    # one record per part, streamed as soon as it is extracted and
+    # checkpointed so a re-run after a crash skips finished parts
+    journal = journal_path(OUTPUT_JSON)
+    sink, done = open_journal(journal, PART_PATH, resume)
+
+    if len(done) > 1:
+        print(f"⏩ resuming: {len(done) - 1} parts already extracted")
+
+    # ----------------------------
+    # RUN FOR ALL PARTS
+    # ----------------------------
+    for ipt in Path(PART_PATH).glob("*.ipt"):
+        if ipt.name in done:
             continue
 
-        plane = pdef.Sketch.PlanarEntityGeometry
-        axis_vec = vec(plane.Normal.AsVector())
-
-        try:
-            dia = hdef.Diameter.Value * 10
-        except:
-            dia = None
+        holes = CACHE.get(ipt, "holes", CACHE_VERSION)
 
-        base_pt = pdef.SketchPoints.Item(1).Geometry3d
+        if holes is None:
+            if inv is None:
+                with METRICS.phase("connect"):
+                    inv = METRICS.com(connect())
 
-        for occ in pat.PatternElements:
-            if occ.Suppressed:
-                continue
+            print(f"🔍 {ipt.name}")
+            with METRICS.part(ipt.name):
+                with METRICS.phase("documents_open"):
+                    doc = inv.Documents.Open(str(ipt), True)
 
-            pt = base_pt.Copy()
-            pt.TransformBy(occ.Transformation)
+                holes = extract_holes_from_part(doc)
 
-            holes_out.append({
-                "feature": f"{pat.Name}:{occ.Index}",
-                "diameter_mm": dia,
-                "axis": axis_vec,
-                "center_mm": pt_mm(pt),
-                "patterned": True,
-                "pattern_parent": pat.Name
-            })
+                with METRICS.phase("close"):
+                    doc.Close(True)
+            CACHE.put(ipt, "holes", CACHE_VERSION, holes)
+        else:
+            print(f"♻️ {ipt.name} (cached)")
 
-    return holes_out
+        sink("parts", {
+            "part": ipt.name,
+            "hole_count": len(holes),
+            "holes": holes
+        })
+        sink.checkpoint(ipt.name)
 
-# ==============================
-# RUN FOR ALL PARTS
-# ==============================
-for ipt in Path(PART_PATH).glob("*.ipt"):
-    print(f"🔍 {ipt.name}")
-    doc = inv.Documents.Open(str(ipt), True)
+    sink.finish()
+    CACHE.flush()
 
-    holes = extract_holes_from_part(doc)
+    # ----------------------------
+    # SAVE
+    # ----------------------------
+    with METRICS.phase("json_dump"):
+        compile_json_list(journal, OUTPUT_JSON, "parts")
 
-    results.append({
-        "part": ipt.name,
-        "hole_count": len(holes),
-        "holes": holes
-    })
+    print(f"\n✅ Hole extraction complete → {OUTPUT_JSON}")
+    print(f"   {CACHE.summary()}")
 
-    doc.Close(True)
+    if inv is not None:
+        inv.Quit()
 
-# ==============================
-# SAVE
-# ==============================
-with open(OUTPUT_JSON, "w") as f:
-    json.dump(results, f, indent=4)
+    report = METRICS.write(OUTPUT_JSON, cache={"hits": CACHE.hits, "misses": CACHE.misses})
+    print(f"   📊 {METRICS.summary()} → {report}")
 
-print(f"\n✅ Hole extraction complete → {OUTPUT_JSON}")
-inv.Quit()
\ No newline at end of file
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,195 @@
+import json
+import os
+import time
+import types
+from contextlib import contextmanager
+
+# =====================================================
+# CONFIG
+# =====================================================
+# counting wraps every COM object in a small proxy; CAD_COUNT_COM=0
+# turns it off (phase and part timings are still recorded)
+COUNT_COM_CALLS = os.environ.get("CAD_COUNT_COM", "1") != "0"
+
+SLOWEST_PARTS = 10   # parts listed by wall time in the report
+
+# values COM hands back by value: never wrapped
+_PLAIN = (type(None), bool, int, float, complex, str, bytes, tuple, list, dict)
+_METHODS = (types.MethodType, types.FunctionType, types.BuiltinFunctionType)
+
+# =====================================================
+# COM ACCESS COUNTING
+# =====================================================
+def _unwrap(value):
+    return value._obj if isinstance(value, ComCounter) else value
+
+class _CountedMethod:
+    __slots__ = ("_fn", "_metrics")
+
+    def __init__(self, fn, metrics):
+        self._fn = fn
+        self._metrics = metrics
+
+    def __call__(self, *args, **kwargs):
+        m = self._metrics
+        m.com_calls += 1
+        result = self._fn(*[_unwrap(a) for a in args],
+                          **{k: _unwrap(v) for k, v in kwargs.items()})
+        return m.com(result)
+
+class ComCounter:
+    """
+    Proxy around a COM object that counts its round trips.
+
+    Every property read or write, method call and enumeration step is
+    one count on the owning RunMetrics; objects it returns are wrapped
+    in turn, so wrapping the Application counts a whole run. Proxies
+    passed back into COM calls are unwrapped first.
+    """
+
+    __slots__ = ("_obj", "_metrics")
+
+    def __init__(self, obj, metrics):
+        object.__setattr__(self, "_obj", obj)
+        object.__setattr__(self, "_metrics", metrics)
+
+    def __getattr__(self, name):
+        m = self._metrics
+        try:
+            value = getattr(self._obj, name)
+        except AttributeError:
+            m.com_calls += 1
+            raise
+        if isinstance(value, _METHODS):
+            return _CountedMethod(value, m)   # counted when called
+        m.com_calls += 1
+        return m.com(value)
+
+    def __setattr__(self, name, value):
+        self._metrics.com_calls += 1
+        setattr(self._obj, name, _unwrap(value))
+
+    def __call__(self, *args, **kwargs):
+        return _CountedMethod(self._obj, self._metrics)(*args, **kwargs)
+
+    def __iter__(self):
+        m = self._metrics
+        for item in self._obj:
+            m.com_calls += 1
+            yield m.com(item)
+
+    def __getitem__(self, key):
+        self._metrics.com_calls += 1
+        return self._metrics.com(self._obj[_unwrap(key)])
+
+    def __len__(self):
+        self._metrics.com_calls += 1
+        return len(self._obj)
+
+    def __bool__(self):
+        return bool(self._obj)
+
+    def __eq__(self, other):
+        return self._obj == _unwrap(other)
+
+    def __hash__(self):
+        return hash(self._obj)
+
+    def __repr__(self):
+        return f"ComCounter({self._obj!r})"
+
+# =====================================================
+# RUN METRICS
+# =====================================================
+class RunMetrics:
+    """
+    Wall time and COM round trips of one extractor run.
+
+    Phases are named stages ("documents_open", "face_iteration", ...);
+    entering a phase again adds to its totals and phases may nest, each
+    reporting its own inclusive time. Parts get one record each with
+    their own time and COM count.
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self, script=None, source=None):
+        self.script = script
+        self.source = str(source) if source is not None else None
+        self.created = time.strftime("%Y-%m-%dT%H:%M:%S")
+        self.started = time.perf_counter()
+        self.com_calls = 0
+        self.phases = {}
+        self.parts = []
+
+    def com(self, obj):
+        """`obj` wrapped for counting (plain values are returned as is)."""
+        if not COUNT_COM_CALLS or isinstance(obj, _PLAIN) or isinstance(obj, ComCounter):
+            return obj
+        return ComCounter(obj, self)
+
+    @contextmanager
+    def phase(self, name):
+        t0, c0 = time.perf_counter(), self.com_calls
+        try:
+            yield
+        finally:
+            p = self.phases.setdefault(name, {"wall_s": 0.0, "com_calls": 0, "count": 0})
+            p["wall_s"] += time.perf_counter() - t0
+            p["com_calls"] += self.com_calls - c0
+            p["count"] += 1
+
+    @contextmanager
+    def part(self, name, **fields):
+        """Time one part; yields its record so callers can add fields."""
+        rec = {"part": name, **fields}
+        t0, c0 = time.perf_counter(), self.com_calls
+        try:
+            yield rec
+        finally:
+            rec["wall_s"] = round(time.perf_counter() - t0, 4)
+            rec["com_calls"] = self.com_calls - c0
+            self.parts.append(rec)
+
+    # -------------------------------------------------
+    # reporting
+    # -------------------------------------------------
+    def report(self, **extra):
+        wall = time.perf_counter() - self.started
+        slowest = sorted(self.parts, key=lambda r: r["wall_s"], reverse=True)[:SLOWEST_PARTS]
+
+        return {
+            "script": self.script,
+            "source": self.source,
+            "created": self.created,
+            "wall_s": round(wall, 4),
+            "com_calls": self.com_calls if COUNT_COM_CALLS else None,
+            "phases": {
+                name: dict(p, wall_s=round(p["wall_s"], 4))
+                for name, p in self.phases.items()
+            },
+            "part_count": len(self.parts),
+            "slowest_parts": [r["part"] for r in slowest],
+            "parts": self.parts,
+            **extra
+        }
+
+    def write(self, out_path, **extra):
+        """Write the report next to `out_path`; returns the metrics file path."""
+        path = metrics_path(out_path)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.report(**extra), f, indent=2)
+        os.replace(tmp, path)
+        return path
+
+    def summary(self):
+        wall = time.perf_counter() - self.started
+        calls = f"{self.com_calls:,} COM calls" if COUNT_COM_CALLS else "COM calls not counted"
+        return f"metrics: {wall:.2f}s, {calls}, {len(self.parts)} parts timed"
+
+def metrics_path(out_path):
+    return os.path.splitext(str(out_path))[0] + ".metrics.json"
+
+METRICS = RunMetrics()
@@ -0,0 +1,47 @@
+import re
+
+# =====================================================
+# KEYWORD CLASSIFIER
+# =====================================================
+class KeywordClassifier:
+    """
+    Case-insensitive "does any keyword occur in this text" test.
+
+    All keywords are compiled into one regex alternation, so a text is
+    scanned once instead of once per keyword, and results are memoized
+    per key (part number, definition name or the text itself), so each
+    unique part is classified only once however many occurrences it has.
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(k.upper() for k in keywords))
+        # longest first so the reported match is the most specific one
+        alternation = "|".join(re.escape(k) for k in sorted(self.keywords, key=len, reverse=True))
+        self._pattern = re.compile(alternation) if self.keywords else None
+        self._memo = {}
+
+    def match(self, text, key=None):
+        """First keyword found in `text`, or None. Memoized by `key` (default: text)."""
+        memo_key = text if key is None else key
+        try:
+            return self._memo[memo_key]
+        except KeyError:
+            pass
+
+        found = None
+        if self._pattern is not None and text:
+            m = self._pattern.search(text.upper())
+            found = m.group(0) if m else None
+
+        self._memo[memo_key] = found
+        return found
+
+    def __call__(self, text, key=None):
+        """True if any keyword occurs in `text`."""
+        return self.match(text, key) is not None
+
+    def __len__(self):
+        return len(self._memo)
+
+    def clear(self):
+        self._memo.clear()
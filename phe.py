@@ -1,7 +1,13 @@
 import win32com.client
 import pythoncom
 import json
-from pathlib import Path
+from pathlib import PureWindowsPath
+
+import numpy as np
+
+import geometry
+from extraction_cache import CACHE
+from metrics import METRICS
 
 # ==============================
 # CONFIG
@@ -9,6 +15,14 @@ from pathlib import Path
 PART_PATH = r"E:\Phase 1\Assembly 1\1093144795-A.ipt"
 OUT_JSON  = r"E:\Phase 1\extractions\true_holes.json"
 
+CACHE_VERSION = "4"   # bump when extract_part_holes() output changes
+
+# cylinder faces on the same axis line with the same radius are one hole
+# (a drilled hole is often split into two half-cylinder faces); cm
+LINE_TOL_CM   = 1e-3
+RADIUS_TOL_CM = 1e-3
+DIR_TOL       = 1e-4
+
 # ==============================
 # INVENTOR CONNECT
 # ==============================
@@ -30,65 +44,161 @@ def f(v):
         return None
 
 # ==============================
-# MAIN
+# FACE ID
 # ==============================
-def run():
-    pythoncom.CoInitialize()
-    inv = connect_inventor()
+def face_id(face, index):
+    """
+    TransientKey of the face; without one, "idx:<index>" (a string, so
+    it can never collide with another face's integer key).
+    """
+    try:
+        return int(face.TransientKey)
+    except:
+        return f"idx:{index}"
 
-    doc = inv.Documents.Open(PART_PATH, True)
-    comp = doc.ComponentDefinition
+# ==============================
+# COAXIAL FACE CLUSTERING
+# ==============================
+def group_coaxial_faces(faces):
+    """
+    One hole per group of cylinder faces sharing axis line and radius.
+
+    `faces` holds (face_id, radius_cm, center, axis) rows. Grouping is
+    a single geometry.coaxial_groups() pass; each hole keeps its first
+    face's center and axis plus the ids of all its faces. Faces with
+    unreadable geometry stay holes of their own.
+    """
+    if not faces:
+        return []
+
+    ids = [fc[0] for fc in faces]
+    R = np.array([fc[1] for fc in faces], dtype=np.float64)
+    C = np.array([fc[2] for fc in faces], dtype=np.float64)
+    A = np.array([fc[3] for fc in faces], dtype=np.float64)
+
+    valid = np.isfinite(R) & np.isfinite(C).all(axis=1) & np.isfinite(A).all(axis=1)
+    labels = np.full(len(faces), -1, dtype=np.intp)
+    n_groups = 0
+
+    if valid.any():
+        labels[valid], first = geometry.coaxial_groups(
+            C[valid], A[valid], R[valid], LINE_TOL_CM, DIR_TOL, RADIUS_TOL_CM
+        )
+        n_groups = len(first)
+
+    # unreadable faces: one group each, after the clustered ones
+    lone = np.flatnonzero(~valid)
+    labels[lone] = n_groups + np.arange(len(lone))
+
+    members = [[] for _ in range(n_groups + len(lone))]
+    for i, g in enumerate(labels.tolist()):
+        members[g].append(i)
+
+    members.sort(key=lambda m: m[0])
 
     holes = []
+    for m in members:
+        _, radius, center, axis = faces[m[0]]
+        holes.append({
+            "diameter_mm": round(radius * 2 * 10, 3) if radius is not None else None,
+            "center": center,
+            "axis": axis,
+            "face_ids": [ids[i] for i in m],
+            "face_count": len(m),
+        })
+
+    return holes
 
-    for body in comp.SurfaceBodies:
-        for face in body.Faces:
-            try:
-                geom = face.Geometry
-                # 5891 = kCylinderSurface
-                if geom.SurfaceType != 5891:
+# ==============================
+# CYLINDRICAL FACE EXTRACTION
+# ==============================
+def extract_part_holes(doc):
+    comp = doc.ComponentDefinition
+
+    faces = []
+
+    with METRICS.phase("face_iteration"):
+        for body in comp.SurfaceBodies:
+            for face in body.Faces:
+                try:
+                    geom = face.Geometry
+                    # 5891 = kCylinderSurface
+                    if geom.SurfaceType != 5891:
+                        continue
+
+                    # Ignore external cylinders (shafts, bosses)
+                    if face.IsParamReversed is False:
+                        pass
+
+                    axis = geom.Axis
+                    base = geom.BasePoint
+
+                    faces.append((
+                        face_id(face, len(faces) + 1),
+                        f(geom.Radius),
+                        [
+                            f(base.X),
+                            f(base.Y),
+                            f(base.Z)
+                        ],
+                        [
+                            f(axis.Direction.X),
+                            f(axis.Direction.Y),
+                            f(axis.Direction.Z)
+                        ]
+                    ))
+
+                except:
                     continue
 
-                # Ignore external cylinders (shafts, bosses)
-                if face.IsParamReversed is False:
-                    pass
-
-                axis = geom.Axis
-                base = geom.BasePoint
-
-                hole = {
-                    "diameter_mm": round(geom.Radius * 2 * 10, 3),
-                    "center": [
-                        f(base.X),
-                        f(base.Y),
-                        f(base.Z)
-                    ],
-                    "axis": [
-                        f(axis.Direction.X),
-                        f(axis.Direction.Y),
-                        f(axis.Direction.Z)
-                    ]
-                }
-
-                holes.append(hole)
-
-            except:
-                continue
-
-    output = {
+    with METRICS.phase("coaxial_grouping"):
+        holes = group_coaxial_faces(faces)
+
+    return {
         "part": doc.DisplayName,
         "hole_count": len(holes),
+        "face_count": len(faces),
         "holes": holes
     }
 
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(output, f, indent=4)
+# ==============================
+# MAIN
+# ==============================
+def run():
+    METRICS.reset("phe", PART_PATH)
+    output = CACHE.get(PART_PATH, "phe", CACHE_VERSION)
+    doc = None
+
+    if output is None:
+        pythoncom.CoInitialize()
+        with METRICS.phase("connect"):
+            inv = METRICS.com(connect_inventor())
+
+        with METRICS.part(PureWindowsPath(PART_PATH).name):
+            with METRICS.phase("documents_open"):
+                doc = inv.Documents.Open(PART_PATH, True)
+            output = extract_part_holes(doc)
+        CACHE.put(PART_PATH, "phe", CACHE_VERSION, output)
+        CACHE.flush()
+    else:
+        print(f"♻️ {PureWindowsPath(PART_PATH).name} (cached)")
+
+    holes = output["holes"]
+
+    with METRICS.phase("json_dump"):
+        with open(OUT_JSON, "w", encoding="utf-8") as f:
+            json.dump(output, f, indent=4)
 
     print("✅ TRUE hole geometry extracted")
     print(f"   Holes found: {len(holes)}")
     print(f"   → {OUT_JSON}")
 
-    doc.Close(True)
+    if doc is not None:
+        with METRICS.phase("close"):
+            doc.Close(True)
+
+    report = METRICS.write(OUT_JSON, cache={"hits": CACHE.hits, "misses": CACHE.misses})
+    print(f"   📊 {METRICS.summary()} → {report}")
 
 if __name__ == "__main__":
     run()
\ No newline at end of file
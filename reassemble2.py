@@ -1,9 +1,32 @@
 import os
 import json
+import argparse
 import math
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import PureWindowsPath
+
+import numpy as np
 import pythoncom
 import win32com.client
 
+import geometry
+from transforms import MATRICES, TRANSFORMS
+
+# ------------------------------------------------------------
+# Config
+# ------------------------------------------------------------
+# suspend the solver while constraints are added, solve once at the end
+DEFER_UPDATE = True
+
+# place every occurrence grounded at its exported transform, no constraints
+TRANSFORM_ONLY = False
+
+# max abs difference per matrix cell (cm) when verifying placements
+VERIFY_TOL = 1e-6
+
+kUpToDateHealth = 11265   # HealthStatusEnum
+
 
 # ------------------------------------------------------------
 # Load JSON
@@ -24,133 +47,485 @@ def find_occurrence(asm_def, name):
 
 
 # ------------------------------------------------------------
-# Bind ReferenceKey → actual geometry
+# Bind ReferenceKey → actual geometry (cached)
 # ------------------------------------------------------------
-def bind_refkey(asm_doc, refkey_string):
-    ref_mgr = asm_doc.ReferenceKeyManager
-    key_bytes = ref_mgr.StringToKey(refkey_string)
-    return ref_mgr.BindKeyToObject(key_bytes)
+def _file_key(path):
+    return PureWindowsPath(path).name.lower()
+
+
+class RefKeyBinder:
+    """
+    Resolves exported ReferenceKeys to entities, each lookup done once.
+
+    Constraints share faces, so a key string is converted and bound
+    once per owning document and the result reused; a context string
+    is loaded once per document, and only when a key first needs it.
+    Entities owned by a part are wrapped in a proxy of the placed
+    occurrence, again once per (occurrence, key).
+    """
+
+    def __init__(self, asm_doc, occurrences=None, part_occurrences=None):
+        self.asm_doc = asm_doc
+        self.occurrences = occurrences or {}            # exported name → placed occurrence
+        self.part_occurrences = part_occurrences or {}  # file key → any occurrence of that part
+        self._documents = {}
+        self._managers = {}
+        self._contexts = {}
+        self._objects = {}
+        self._proxies = {}
+        self.bound = 0
+        self.reused = 0
+        self.contexts = 0
+
+    def _manager(self, doc_key):
+        if doc_key not in self._managers:
+            if doc_key is None:
+                doc = self.asm_doc
+            else:
+                occ = self.part_occurrences.get(doc_key)
+                if occ is None:
+                    raise ValueError(f"part not placed: {doc_key}")
+                doc = occ.Definition.Document
+            self._managers[doc_key] = doc.ReferenceKeyManager
+        return self._managers[doc_key]
+
+    def _context(self, doc_key, context):
+        ctx_key = (doc_key, context)
+        if ctx_key not in self._contexts:
+            self._contexts[ctx_key] = self._manager(doc_key).LoadContextFromString(context)
+            self.contexts += 1
+        return self._contexts[ctx_key]
+
+    def bind(self, refkey, context=None, owner=None, occurrence=None):
+        if not refkey:
+            raise ValueError("no reference key")
+
+        doc_key = _file_key(owner) if owner else None
+        obj = self._objects.get((doc_key, refkey))
+
+        if obj is None:
+            ref_mgr = self._manager(doc_key)
+            key_bytes = ref_mgr.StringToKey(refkey)
+            if context:
+                obj = ref_mgr.BindKeyToObject(key_bytes, self._context(doc_key, context))
+            else:
+                obj = ref_mgr.BindKeyToObject(key_bytes)
+            if isinstance(obj, tuple):
+                obj = obj[0]
+            self._objects[(doc_key, refkey)] = obj
+            self.bound += 1
+        else:
+            self.reused += 1
+
+        if doc_key is None or not occurrence:
+            return obj
+
+        proxy_key = (occurrence, doc_key, refkey)
+        if proxy_key not in self._proxies:
+            occ = self.occurrences.get(occurrence)
+            if occ is None:
+                raise ValueError(f"occurrence not placed: {occurrence}")
+            proxy = occ.CreateGeometryProxy(obj)
+            self._proxies[proxy_key] = proxy[0] if isinstance(proxy, tuple) else proxy
+        return self._proxies[proxy_key]
+
+
+def constraint_entities(c):
+    """
+    Both endpoints as RefKeyBinder.bind() arguments. Handles the raw
+    export (entity_one / entity_two dicts owned by a part and seen
+    through an occurrence) and the flat entity_*_refkey schema.
+    """
+    ends = []
+    for side in ("one", "two"):
+        e = c.get(f"entity_{side}")
+        if isinstance(e, dict):
+            ends.append(dict(
+                refkey=e.get("reference_key_string"),
+                context=e.get("context_key_string"),
+                owner=e.get("owner_document"),
+                occurrence=e.get("proxy_context_occurrence"),
+            ))
+        else:
+            ends.append(dict(refkey=c.get(f"entity_{side}_refkey")))
+    return ends
+
+
+def constraint_values(c):
+    """(type, id, offset_cm, angle_rad) for either export schema."""
+    ctype = c.get("constraint_type") or c.get("type") or ""
+    if not ctype.endswith("Object"):
+        ctype += "Object"   # raw export: kMateConstraint
+
+    cid = c.get("constraint_id") or c.get("constraint_name")
+
+    if "parameters" in c:
+        params = c["parameters"] or {}
+        offset_cm = (params.get("offset_mm") or 0) / 10.0
+        angle_rad = (params.get("angle_deg") or 0) * math.pi / 180.0
+    else:
+        offset_cm = c.get("offset_cm") or 0.0
+        angle_rad = c.get("angle_rad") or 0.0
+
+    return ctype, cid, offset_cm, angle_rad
 
 
 # ------------------------------------------------------------
-# Build Exact Assembly
+# Exported transform → 4x4 placement (cm)
 # ------------------------------------------------------------
-def build_exact_assembly(json_path, output_path):
+def component_matrix(comp):
+    t = comp["transform"]
 
-    pythoncom.CoInitialize()
+    if "translation_cm" in t:
+        tr, scale = t["translation_cm"], 1.0
+    else:
+        tr, scale = t["translation_mm"], geometry.MM_PER_CM
 
-    data = load_json(json_path)
-    components = data["components"]
-    constraints = data.get("constraints", [])
+    if isinstance(tr, dict):
+        tr = [tr["x"], tr["y"], tr["z"]]
 
-    base_dir = os.path.dirname(json_path)
+    return geometry.rigid_matrix(t["rotation_matrix"], np.asarray(tr, dtype=np.float64) / scale)
 
-    inventor = win32com.client.Dispatch("Inventor.Application")
-    inventor.Visible = True
 
-    tg = inventor.TransientGeometry
+# ------------------------------------------------------------
+# Place components (one definition load per file)
+# ------------------------------------------------------------
+def resolve_part_path(base_dir, file_name):
+    """
+    The part file for an exported file_name: the path as exported
+    (relative to the export's folder), else a file of the same name in
+    that folder (exports taken on another machine keep absolute paths).
+    """
+    part_path = os.path.join(base_dir, file_name)
+    if os.path.exists(part_path):
+        return part_path
+
+    local = os.path.join(base_dir, PureWindowsPath(file_name).name)
+    if os.path.exists(local):
+        return local
 
-    # Create new assembly
-    asm_doc = inventor.Documents.Add(12291)  # Assembly doc
-    asm_def = asm_doc.ComponentDefinition
+    return None
 
-    print(f"\nCreating assembly with {len(components)} components...\n")
 
-    # ------------------------------------------------------------
-    # ADD COMPONENTS
-    # ------------------------------------------------------------
+def place_components(asm_def, tg, components, base_dir, ground_all=False):
+    """
+    Place every component at its exported transform, in export order.
+
+    Components are grouped by file_name: each file is checked on disk
+    once and loaded by its first placement; the others reuse that
+    ComponentDefinition. Matrices are written with one PutMatrixData
+    call each. Returns the occurrences (None where the IPT is missing).
+    With `ground_all` every occurrence is grounded, whatever the export says.
+    """
+    occurrences = asm_def.Occurrences
+    definitions = {}   # file_name → part path (not loaded yet), definition, or None
+    placed = []
+
     for comp in components:
+        file_name = comp["file_name"]
 
-        part_path = os.path.join(base_dir, comp["file_name"])
+        if file_name not in definitions:
+            definitions[file_name] = resolve_part_path(base_dir, file_name)
+            if definitions[file_name] is None:
+                print(f"❌ Missing IPT: {os.path.join(base_dir, file_name)}")
 
-        if not os.path.exists(part_path):
-            print(f"❌ Missing IPT: {part_path}")
+        target = definitions[file_name]
+        if target is None:
+            placed.append(None)
             continue
 
-        m = tg.CreateMatrix()
+        m = MATRICES.create(tg, component_matrix(comp))
 
-        r = comp["transform"]["rotation_matrix"]
-        t = comp["transform"]["translation_mm"]
+        if isinstance(target, str):
+            occ = occurrences.Add(target, m)
+            definitions[file_name] = occ.Definition
+        else:
+            occ = occurrences.AddByComponentDefinition(target, m)
 
-        # Rotation
-        for i in range(3):
-            for j in range(3):
-                m.SetCell(i + 1, j + 1, r[i][j])
+        occ.Grounded = ground_all or bool(comp.get("grounded", False))
+        placed.append(occ)
 
-        # Translation (mm → cm)
-        m.SetCell(1, 4, t["x"] / 10.0)
-        m.SetCell(2, 4, t["y"] / 10.0)
-        m.SetCell(3, 4, t["z"] / 10.0)
+    added = Counter(c["file_name"] for c, occ in zip(components, placed) if occ is not None)
+    for file_name, n in added.items():
+        print(f"✅ Added: {file_name} × {n}")
 
-        occ = asm_def.Occurrences.Add(part_path, m)
+    return placed
 
-        occ.Grounded = bool(comp.get("grounded", False))
 
-        print(f"✅ Added: {occ.Name}")
+# ------------------------------------------------------------
+# Transform-only placements (pure data + verification)
+# ------------------------------------------------------------
+def placement_records(components):
+    """
+    What a transform-only reassembly places: every occurrence grounded
+    at its exported transform, as a 4x4 matrix in cm. No Inventor needed.
+    """
+    return [
+        {
+            "occurrence_name": c["occurrence_name"],
+            "file_name": c["file_name"],
+            "grounded": True,
+            "matrix_cm": component_matrix(c).tolist(),
+        }
+        for c in components
+    ]
+
+
+def write_placements(json_path, out_path):
+    records = placement_records(load_json(json_path)["components"])
+
+    with open(out_path, "w", encoding="utf-8") as f:
+        json.dump({"source": json_path, "units": "cm", "placements": records}, f, indent=2)
+
+    print(f"📐 {len(records)} placements → {out_path}")
+    return records
+
+
+def verify_placements(placed, components, tol=VERIFY_TOL):
+    """
+    Read back each placed occurrence's Transformation and compare it
+    with the exported one. Returns the mismatches (empty when all match).
+    """
+    mismatches = []
+
+    for comp, occ in zip(components, placed):
+        if occ is None:
+            continue
+        error = float(np.abs(TRANSFORMS.read(occ.Transformation) - component_matrix(comp)).max())
+        if error > tol:
+            mismatches.append({"occurrence_name": comp["occurrence_name"], "max_error_cm": error})
+
+    return mismatches
+
+
+# ------------------------------------------------------------
+# Apply constraints using ReferenceKeys
+# ------------------------------------------------------------
+def apply_constraints(asm_doc, asm_def, constraints, binder=None):
+    """
+    Add every exported constraint. Returns (created, failed): created
+    is a list of (id, type, constraint object), failed a list of report
+    rows for constraints that could not be bound or added.
+    """
 
-    # ------------------------------------------------------------
-    # APPLY CONSTRAINTS USING REFERENCEKEYS
-    # ------------------------------------------------------------
     print(f"\nApplying {len(constraints)} constraints...\n")
 
-    for c in constraints:
+    if binder is None:
+        binder = RefKeyBinder(asm_doc)
 
-        try:
-            ctype = c["constraint_type"]
+    assembly_constraints = asm_def.Constraints
+    created = []
+    failed = []
+
+    for c in constraints:
 
-            entity1 = bind_refkey(asm_doc, c["entity_one_refkey"])
-            entity2 = bind_refkey(asm_doc, c["entity_two_refkey"])
+        ctype, cid, offset_cm, angle_rad = constraint_values(c)
 
-            params = c.get("parameters", {})
+        try:
+            end1, end2 = constraint_entities(c)
 
-            offset_cm = (params.get("offset_mm") or 0) / 10.0
-            angle_rad = (params.get("angle_deg") or 0) * math.pi / 180.0
+            entity1 = binder.bind(**end1)
+            entity2 = binder.bind(**end2)
 
             # -----------------------------
             # Apply correct constraint
             # -----------------------------
             if ctype == "kMateConstraintObject":
-                asm_def.Constraints.AddMateConstraint(
+                added = assembly_constraints.AddMateConstraint(
                     entity1, entity2, offset_cm
                 )
 
             elif ctype == "kFlushConstraintObject":
-                asm_def.Constraints.AddFlushConstraint(
+                added = assembly_constraints.AddFlushConstraint(
                     entity1, entity2, offset_cm
                 )
 
             elif ctype == "kAngleConstraintObject":
-                asm_def.Constraints.AddAngleConstraint(
+                added = assembly_constraints.AddAngleConstraint(
                     entity1, entity2, angle_rad
                 )
 
             elif ctype == "kInsertConstraintObject":
-                asm_def.Constraints.AddInsertConstraint(
+                added = assembly_constraints.AddInsertConstraint(
                     entity1, entity2, offset_cm
                 )
 
             elif ctype == "kTangentConstraintObject":
-                asm_def.Constraints.AddTangentConstraint(
+                added = assembly_constraints.AddTangentConstraint(
                     entity1, entity2
                 )
 
             else:
                 print(f"⚠️ Unsupported constraint type: {ctype}")
+                failed.append({"constraint": cid, "type": ctype, "error": "unsupported type"})
                 continue
 
-            print(f"🔗 Applied {ctype}: {c['constraint_id']}")
+            created.append((cid, ctype, added))
+            print(f"🔗 Applied {ctype}: {cid}")
+
+        except Exception as e:
+            print(f"❌ Failed {cid}: {e}")
+            failed.append({"constraint": cid, "type": ctype, "error": str(e)})
+
+    print(f"\n🔑 ReferenceKeys: {binder.bound} bound, {binder.reused} reused, "
+          f"{binder.contexts} contexts loaded")
 
+    return created, failed
+
+
+# ------------------------------------------------------------
+# Deferred solve
+# ------------------------------------------------------------
+@contextmanager
+def deferred_update(inventor, asm_doc, enabled=True):
+    """
+    Hold the assembly solver while the block adds constraints, then
+    solve once.
+
+    DeferUpdate stops Inventor re-solving after every Add*Constraint
+    and the transaction bundles the additions into one undo step. On
+    exit the option is restored and the assembly updated with
+    Update2(True), which keeps going past constraints that fail so
+    each one's HealthStatus can be read afterwards.
+    """
+    if not enabled:
+        yield
+        return
+
+    options = inventor.AssemblyOptions
+    previous = options.DeferUpdate
+    options.DeferUpdate = True
+    txn = inventor.TransactionManager.StartTransaction(asm_doc, "Apply constraints")
+
+    try:
+        yield
+    except BaseException:
+        txn.Abort()
+        raise
+    else:
+        txn.End()
+    finally:
+        options.DeferUpdate = previous
+
+    asm_doc.Update2(True)
+
+
+def constraint_health(created, failed=()):
+    """
+    Per-constraint result of the solve: every constraint that was not
+    added, plus every added one whose HealthStatus is not up to date.
+    """
+    report = list(failed)
+
+    for cid, ctype, constraint in created:
+        try:
+            health = constraint.HealthStatus
         except Exception as e:
-            print(f"❌ Failed {c['constraint_id']}: {e}")
+            report.append({"constraint": cid, "type": ctype, "error": str(e)})
+            continue
+        if health != kUpToDateHealth:
+            report.append({"constraint": cid, "type": ctype, "health": health})
+
+    return {
+        "applied": len(created),
+        "healthy": len(created) + len(failed) - len(report),
+        "failures": report,
+    }
+
+
+def constraint_report_path(output_path):
+    return os.path.splitext(output_path)[0] + ".constraints.json"
+
 
-    # ------------------------------------------------------------
-    # SAVE
-    # ------------------------------------------------------------
-    asm_doc.SaveAs(output_path, False)
+# ------------------------------------------------------------
+# Build Exact Assembly
+# ------------------------------------------------------------
+def build_exact_assembly(json_path, output_path, defer_update=DEFER_UPDATE,
+                         transform_only=TRANSFORM_ONLY, verify=False):
+
+    pythoncom.CoInitialize()
+
+    data = load_json(json_path)
+    components = data["components"]
+    constraints = data.get("constraints", [])
+
+    base_dir = os.path.dirname(json_path)
+
+    inventor = win32com.client.Dispatch("Inventor.Application")
+    inventor.Visible = True
+
+    tg = inventor.TransientGeometry
+
+    # Create new assembly
+    asm_doc = inventor.Documents.Add(12291)  # Assembly doc
+    asm_def = asm_doc.ComponentDefinition
+
+    print(f"\nCreating assembly with {len(components)} components...\n")
+
+    # no redraw per placement / constraint; restored even on failure
+    inventor.ScreenUpdating = False
+
+    try:
+        # ------------------------------------------------------------
+        # ADD COMPONENTS
+        # ------------------------------------------------------------
+        placed = place_components(asm_def, tg, components, base_dir, ground_all=transform_only)
+
+        summary = {
+            "placed": sum(occ is not None for occ in placed),
+            "missing": sum(occ is None for occ in placed),
+        }
+
+        if verify:
+            summary["mismatches"] = verify_placements(placed, components)
+            print(f"📐 Verified {summary['placed']} placements: "
+                  f"{len(summary['mismatches'])} differ from the export")
+
+        # ------------------------------------------------------------
+        # SAVE (transform-only: poses are final, nothing to bind)
+        # ------------------------------------------------------------
+        if transform_only:
+            asm_doc.SaveAs(output_path, False)
+            print("\n🎉 Transform-only Assembly Reconstruction Complete")
+            print(f"📁 Saved at: {output_path}")
+            return summary
+
+        occurrences = {}
+        part_occurrences = {}
+        for comp, occ in zip(components, placed):
+            if occ is not None:
+                occurrences[comp["occurrence_name"]] = occ
+                part_occurrences.setdefault(_file_key(comp["file_name"]), occ)
+
+        binder = RefKeyBinder(asm_doc, occurrences, part_occurrences)
+
+        # ------------------------------------------------------------
+        # APPLY CONSTRAINTS USING REFERENCEKEYS
+        # ------------------------------------------------------------
+        with deferred_update(inventor, asm_doc, defer_update):
+            created, failed = apply_constraints(asm_doc, asm_def, constraints, binder)
+
+        report = constraint_health(created, failed)
+        with open(constraint_report_path(output_path), "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+        print(f"🩺 Solve: {report['healthy']} healthy, {len(report['failures'])} failed "
+              f"→ {constraint_report_path(output_path)}")
+        summary["constraints"] = report
+
+        # ------------------------------------------------------------
+        # SAVE
+        # ------------------------------------------------------------
+        asm_doc.SaveAs(output_path, False)
+
+    finally:
+        inventor.ScreenUpdating = True
 
     print("\n🎉 EXACT Assembly Reconstruction Complete")
     print(f"📁 Saved at: {output_path}")
 
+    return summary
+
 
 # ------------------------------------------------------------
 # Entry Point
@@ -160,4 +535,20 @@ if __name__ == "__main__":
     json_path = r"G:/Shubhangi college/Assembly 1 new/1093144795-M1.json"
     output_path = r"G:/Shubhangi college/Assembly 1 new/Exact_Reconstructed_Assembly.iam"
 
-    build_exact_assembly(json_path, output_path)
\ No newline at end of file
+    ap = argparse.ArgumentParser(description="Rebuild an assembly from its JSON export")
+    ap.add_argument("json_path", nargs="?", default=json_path)
+    ap.add_argument("output_path", nargs="?", default=output_path)
+    ap.add_argument("--transform-only", action="store_true", default=TRANSFORM_ONLY,
+                    help="ground every occurrence at its exported transform, skip constraints")
+    ap.add_argument("--verify", action="store_true", help="read placed transforms back and compare")
+    ap.add_argument("--no-defer", action="store_true", help="let Inventor solve after every constraint")
+    ap.add_argument("--placements", help="write transform-only placements as JSON")
+    ap.add_argument("--placements-only", action="store_true", help="with --placements: skip Inventor")
+    args = ap.parse_args()
+
+    if args.placements:
+        write_placements(args.json_path, args.placements)
+
+    if not args.placements_only:
+        build_exact_assembly(args.json_path, args.output_path, not args.no_defer,
+                             args.transform_only, args.verify)
\ No newline at end of file
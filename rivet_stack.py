@@ -2,6 +2,12 @@ import json
 from pathlib import Path
 from collections import defaultdict
 
+import numpy as np
+
+import geometry
+from columnar import is_store, load_tables, open_store
+from part_classifier import KeywordClassifier
+
 # =====================================================
 # CONFIG
 # =====================================================
@@ -9,70 +15,268 @@ ASM_JSON   = Path(r"E:\Phase 1\extractions\assembly_extraction.json")
 AXIS_JSON  = Path(r"E:\Phase 1\extractions\geometry_fastener_axes.json")
 OUT_JSON   = Path(r"E:\Phase 1\extractions\rivet_stacks.json")
 
+# ain1 output: part-space cylinder axes ("holes") and each occurrence's
+# transform ("occurrences"); used to check plates reached over plate
+# hops. Optional.
+HOLES_JSON = Path(r"E:\Phase 1\extractions\final_phase1_to_5.json")
+
+FASTENER_KEYWORDS = ["RIVET"]
+
+# plate hops followed beyond the plates a fastener is inserted into
+# (plates Insert-constrained to each other share the fastener's hole);
+# 0 = direct plates only
+MAX_PLATE_HOPS = 3
+
+# a hopped plate joins the stack only with a hole on the fastener's
+# axis line (cm, same units as the fastener axes)
+AXIS_TOL_CM = 0.05
+DIR_TOL     = 1e-3     # 1 - |cos| between hole and fastener axis
+
+CONFIDENCE_DIRECT        = 0.95   # fastener Insert-constrained to every plate
+CONFIDENCE_HOP_CHECKED   = 0.9    # hopped plates confirmed on the axis
+CONFIDENCE_HOP_UNCHECKED = 0.6    # a hopped plate without hole geometry
+
 # =====================================================
 # LOAD DATA
 # =====================================================
-assembly = json.loads(ASM_JSON.read_text(encoding="utf-8"))
-axes_raw = json.loads(AXIS_JSON.read_text(encoding="utf-8"))
+def load_inputs(asm_json=ASM_JSON, axis_json=AXIS_JSON):
+    # either file may also be a .cols store (columnar.py); then only
+    # the columns listed here are memory-mapped
+    assembly = load_tables(asm_json, {
+        "occurrences": ["name", "description", "document_type"],
+        "constraints": ["constraint_type", "occurrence_1", "occurrence_2"]
+    })
+    axes_raw = load_tables(axis_json, {"records": ["occurrence", "origin", "direction"]})["records"]
+    return assembly, axes_raw
 
-# =====================================================
-# INDEX FASTENER AXES
-# =====================================================
-axes = {a["occurrence"]: a for a in axes_raw}
+def load_plate_holes(holes_json=HOLES_JSON):
+    """
+    PlateHoles from ain1's output, in assembly space.
+
+    ain1 reads hole axes from each part's own definition, so centers
+    and directions are part-space; they are moved by their occurrence's
+    "transform" here. Holes of occurrences without a transform are
+    dropped (those plates stay unchecked). None without a file.
+    """
+    if holes_json is None or not Path(holes_json).exists():
+        return None
+
+    if is_store(holes_json):
+        store = open_store(holes_json)
+        recs = store.records("holes", ["occurrence", "center", "direction"])
+        placements = store.values.get("occurrences", {})
+    else:
+        doc = json.loads(Path(holes_json).read_text(encoding="utf-8"))
+        recs = doc["holes"]
+        placements = doc.get("occurrences", {})
+
+    recs = [h for h in recs if h["occurrence"] in placements]
+    Ms = [
+        geometry.rigid_matrix(t["rotation"], t["translation"])
+        for t in (placements[h["occurrence"]]["transform"] for h in recs)
+    ]
+    centers = geometry.transform_points_each(Ms, [h["center"] for h in recs])
+    dirs = geometry.transform_vectors_each(Ms, [h["direction"] for h in recs])
+
+    return PlateHoles([h["occurrence"] for h in recs], centers, dirs)
 
 # =====================================================
-# CLASSIFY PARTS
+# CLASSIFY PARTS (ONCE PER OCCURRENCE)
 # =====================================================
-occ_by_name = {o["name"]: o for o in assembly["occurrences"]}
+fastener_matcher = KeywordClassifier(FASTENER_KEYWORDS)
 
 def is_fastener(o):
-    return "RIVET" in (o.get("description") or "").upper()
+    return fastener_matcher(o.get("description") or "")
 
 def is_plate(o):
     return o["document_type"] == "Part" and not is_fastener(o)
 
-fasteners = {o["name"] for o in assembly["occurrences"] if is_fastener(o)}
+FASTENER, PLATE, OTHER = 0, 1, 2
+
+def classify_roles(occurrences):
+    return {
+        o["name"]: FASTENER if is_fastener(o) else PLATE if is_plate(o) else OTHER
+        for o in occurrences
+    }
 
 # =====================================================
-# BUILD FASTENER → PLATE MAP FROM INSERT CONSTRAINTS
+# INSERT ADJACENCY INDEX
 # =====================================================
-stack_map = defaultdict(set)
+def build_insert_index(constraints, role):
+    """(fastener → plates it is inserted into, plate ↔ plate Insert partners)."""
+    fastener_plates = defaultdict(set)
+    plate_links     = defaultdict(set)
 
-for c in assembly["constraints"]:
-    if c["constraint_type"] != "Insert":
-        continue
+    for c in constraints:
+        if c["constraint_type"] != "Insert":
+            continue
 
-    a = c["occurrence_1"]
-    b = c["occurrence_2"]
+        a = c["occurrence_1"]
+        b = c["occurrence_2"]
+        ra = role.get(a)
+        rb = role.get(b)
 
-    if a in fasteners and b in occ_by_name and is_plate(occ_by_name[b]):
-        stack_map[a].add(b)
+        if ra == FASTENER and rb == PLATE:
+            fastener_plates[a].add(b)
+        elif rb == FASTENER and ra == PLATE:
+            fastener_plates[b].add(a)
+        elif ra == PLATE and rb == PLATE and a != b:
+            plate_links[a].add(b)
+            plate_links[b].add(a)
 
-    elif b in fasteners and a in occ_by_name and is_plate(occ_by_name[a]):
-        stack_map[b].add(a)
+    return fastener_plates, plate_links
 
 # =====================================================
-# BUILD STACK OUTPUT
+# STACK TRAVERSAL
 # =====================================================
-stacks = []
-
-for fastener, plates in stack_map.items():
-    if fastener not in axes:
-        continue  # geometry missing → skip
-
-    stacks.append({
-        "fastener": fastener,
-        "plates": sorted(plates),
-        "stack_size": len(plates),
-        "stack_type": "blind_rivet",
-        "confidence": 0.95 if len(plates) >= 1 else 0.7
-    })
+class PlateHoles:
+    """
+    Assembly-space cylinder axes of every occurrence in one pair of
+    (N, 3) arrays, sorted by occurrence, so axis checks run in batches.
+    """
+
+    def __init__(self, occurrences, centers, directions):
+        occs, inverse, counts = np.unique(np.asarray(occurrences, dtype=object).astype(str),
+                                          return_inverse=True, return_counts=True)
+        order = np.argsort(inverse, kind="stable")
+
+        self.centers = geometry.as_points(centers)[order]
+        self.dirs = geometry.normalize(directions)[order]
+
+        ends = np.cumsum(counts)
+        self.span = {o: (int(e - n), int(e)) for o, n, e in zip(occs.tolist(), counts, ends)}
+
+    def known(self, plates):
+        """Bool per plate: it has hole records to check against."""
+        return np.fromiter((q in self.span for q in plates), dtype=bool, count=len(plates))
+
+    def on_axis(self, plates, origins, unit_dirs, tol=AXIS_TOL_CM, dir_tol=DIR_TOL):
+        """
+        Bool per candidate i: `plates[i]` has a cylinder parallel to
+        unit_dirs[i] whose center lies within `tol` of the line through
+        origins[i]. Plates without records are False (see known()).
+        """
+        spans = np.array([self.span.get(q, (0, 0)) for q in plates], dtype=np.intp).reshape(-1, 2)
+        counts = spans[:, 1] - spans[:, 0]
+        owner = np.repeat(np.arange(len(plates)), counts)
+        rows = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts - spans[:, 0], counts)
+
+        d = unit_dirs[owner]
+        V = self.centers[rows] - origins[owner]
+        t = geometry.row_dot(V, d)
+        off2 = geometry.row_dot(V, V) - t * t           # squared distance to the line
+        parallel = np.abs(geometry.row_dot(self.dirs[rows], d)) >= 1.0 - dir_tol
+
+        hit = parallel & (off2 <= tol * tol)
+        return np.bincount(owner[hit], minlength=len(plates)) > 0
+
+def collect_stacks(fastener_plates, plate_links, max_hops=MAX_PLATE_HOPS, check=None):
+    """
+    fastener → its direct plates plus plates reachable over plate ↔
+    plate Inserts, expanded one hop level at a time for all fasteners.
+
+    `check(fasteners, plates)` → True / False / None per pair decides
+    which hopped plates a hop reaches (and continues from), e.g. plates
+    with a hole on the fastener axis; None means it cannot tell and the
+    plate is kept unchecked. All pairs of one level go in a single call;
+    without `check` every hopped plate is unchecked.
+
+    Returns (fastener → plates, fasteners with an unchecked plate).
+    """
+    stacks = {f: set(direct) for f, direct in fastener_plates.items()}
+    unchecked = set()
+    rejected = defaultdict(set)
+    frontier = {f: list(direct) for f, direct in fastener_plates.items()}
+
+    for _ in range(max_hops):
+        pairs = []
+        for f, front in frontier.items():
+            seen, skip = stacks[f], rejected[f]
+            new = {q for p in front for q in plate_links.get(p, ()) if q not in seen and q not in skip}
+            pairs.extend((f, q) for q in new)
+        if not pairs:
+            break
+
+        ok = check([f for f, _ in pairs], [q for _, q in pairs]) if check else [None] * len(pairs)
+
+        frontier = defaultdict(list)
+        for (f, q), good in zip(pairs, ok):
+            if good is False:
+                rejected[f].add(q)
+                continue
+            if good is None:
+                unchecked.add(f)
+            stacks[f].add(q)
+            frontier[f].append(q)
+
+    return stacks, unchecked
+
+def infer_stacks(assembly, axes_raw, max_hops=MAX_PLATE_HOPS, plate_holes=None):
+    """
+    One stack per fastener with axis geometry. Hopped plates that
+    `plate_holes` (see load_plate_holes) has no holes for, or all of
+    them without it, cannot be checked against the fastener axis; their
+    stacks are kept at CONFIDENCE_HOP_UNCHECKED.
+    """
+    axes = {a["occurrence"]: a for a in axes_raw}
+    role = classify_roles(assembly["occurrences"])
+    fastener_plates, plate_links = build_insert_index(assembly["constraints"], role)
+    fastener_plates = {f: d for f, d in fastener_plates.items() if f in axes}   # geometry missing → skip
+
+    check = None
+    if plate_holes is not None:
+        names = list(fastener_plates)
+        row = {f: i for i, f in enumerate(names)}
+        origins = geometry.as_points([axes[f]["origin"] for f in names])
+        unit_dirs = geometry.normalize([axes[f]["direction"] for f in names])
+
+        def check(fasteners, plates):
+            idx = np.fromiter((row[f] for f in fasteners), dtype=np.intp, count=len(fasteners))
+            hit = plate_holes.on_axis(plates, origins[idx], unit_dirs[idx])
+            known = plate_holes.known(plates)
+            return [bool(h) if k else None for h, k in zip(hit, known)]
+
+    all_plates, unchecked = collect_stacks(fastener_plates, plate_links, max_hops, check)
+
+    stacks = []
+
+    for fastener, direct in fastener_plates.items():
+        plates = all_plates[fastener]
+
+        if len(plates) == len(direct):
+            confidence = CONFIDENCE_DIRECT
+        elif fastener in unchecked:
+            confidence = CONFIDENCE_HOP_UNCHECKED
+        else:
+            confidence = CONFIDENCE_HOP_CHECKED
+
+        stacks.append({
+            "fastener": fastener,
+            "plates": sorted(plates),
+            "stack_size": len(plates),
+            "stack_type": "blind_rivet",
+            "confidence": confidence
+        })
+
+    return stacks
 
 # =====================================================
-# SAVE
+# MAIN
 # =====================================================
-OUT_JSON.write_text(json.dumps(stacks, indent=4), encoding="utf-8")
+def run(asm_json=ASM_JSON, axis_json=AXIS_JSON, out_json=OUT_JSON, holes_json=HOLES_JSON):
+    plate_holes = load_plate_holes(holes_json)
+    if plate_holes is None:
+        print(f"⚠️ no hole geometry at {holes_json}: hopped plates are unchecked")
+
+    stacks = infer_stacks(*load_inputs(asm_json, axis_json), plate_holes=plate_holes)
+
+    Path(out_json).write_text(json.dumps(stacks, indent=4), encoding="utf-8")
+
+    print("✅ Phase-5 rivet stack inference complete")
+    print(f"   → {out_json}")
+    print(f"   → stacks inferred: {len(stacks)}")
+
+    return stacks
 
-print("✅ Phase-5 rivet stack inference complete")
-print(f"   → {OUT_JSON}")
-print(f"   → stacks inferred: {len(stacks)}")
\ No newline at end of file
+if __name__ == "__main__":
+    run()
@@ -1,7 +1,14 @@
+import argparse
 import json
-from collections import defaultdict
+import os
+import multiprocessing as mp
+from collections import Counter
 from pathlib import Path
 
+from columnar import SUFFIX, is_store, load_tables, open_store
+from extraction_cache import CACHE
+from part_classifier import KeywordClassifier
+
 # =====================================================
 # CONFIG
 # =====================================================
@@ -9,30 +16,107 @@ INPUT_JSON = Path(r"E:\Phase 1\extractions\assembly_extraction.json")
 OUT_NORMALIZED = Path(r"E:\Phase 1\extractions\normalized_constraints.json")
 OUT_RULES = Path(r"E:\Phase 1\extractions\rules.json")
 
+# corpus mode: every export in CORPUS_DIR, counts kept in RULE_STORE
+CORPUS_DIR = Path(r"E:\Phase 1\assemblies_raw_export")
+RULE_STORE = Path(r"E:\Phase 1\extractions\rule_store")
+
+STORE_VERSION = 1   # bump when the rule key or classification changes
+
+WORKERS = os.cpu_count() or 1   # corpus mode process pool
+
+FASTENER_KEYWORDS = ["RIVET", "NUT", "SCREW"]
+
 # =====================================================
 # LOAD DATA
 # =====================================================
-with open(INPUT_JSON, "r", encoding="utf-8") as f:
-    data = json.load(f)
+OCC_COLUMNS = ["name", "description", "hole_count"]
 
-occurrences = data["occurrences"]
-constraints = data["constraints"]
+# columns of the Inventor export schemas (raw export, reassembly
+# export, ML-ready export) that map onto the miner's constraint fields
+EXPORT_CONSTRAINT_COLUMNS = [
+    "constraint_type", "type",
+    "occurrence_one", "occurrence_two",
+    "component_pair.occurrence_one_name", "component_pair.occurrence_two_name",
+    "entity_one.entity_type", "entity_two.entity_type",
+    "entity_one_type", "entity_two_type",
+    "entity_types.entity_one_type", "entity_types.entity_two_type"
+]
+
+def _pick(rec, *paths):
+    """First non-null value among dotted paths of a nested record."""
+    for path in paths:
+        v = rec
+        for k in path.split("."):
+            v = v.get(k) if isinstance(v, dict) else None
+        if v is not None:
+            return v
+    return None
+
+def load_assembly(path):
+    """
+    (occurrences, constraints) in the miner's schema from one export.
+
+    assembly_extraction.json is used as-is. The Inventor export schemas
+    are mapped: file stems stand in for missing descriptions and entity
+    types are taken from whichever field the schema uses. JSON files and
+    .cols stores are both accepted.
+    """
+    path = Path(path)
+
+    if is_store(path):
+        store = open_store(path)
+        tables = store.tables()
+        read = lambda t, cols: store.records(t, cols and [c for c in cols if c in store.columns(t)])
+    else:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        tables = list(doc)
+        read = lambda t, cols: doc[t]
+
+    if "occurrences" in tables:
+        return read("occurrences", OCC_COLUMNS), read("constraints", None)
+
+    occurrences = [
+        {
+            "name": c.get("occurrence_name"),
+            "description": c.get("description") or Path(str(c.get("file_name") or "").replace("\\", "/")).stem,
+            "hole_count": c.get("hole_count", 0)
+        }
+        for c in read("components", ["occurrence_name", "file_name", "description", "hole_count"])
+    ]
+
+    constraints = [
+        {
+            "constraint_type": _pick(c, "constraint_type", "type") or "",
+            "occurrence_1": _pick(c, "occurrence_one", "component_pair.occurrence_one_name"),
+            "occurrence_2": _pick(c, "occurrence_two", "component_pair.occurrence_two_name"),
+            "entity_1_type": _pick(c, "entity_one.entity_type", "entity_one_type", "entity_types.entity_one_type") or "",
+            "entity_2_type": _pick(c, "entity_two.entity_type", "entity_two_type", "entity_types.entity_two_type") or ""
+        }
+        for c in read("constraints", EXPORT_CONSTRAINT_COLUMNS)
+    ]
+
+    return occurrences, constraints
 
 # =====================================================
 # PART CLASSIFICATION (DETERMINISTIC)
 # =====================================================
-part_type = {}
+is_fastener = KeywordClassifier(FASTENER_KEYWORDS)
 
-for occ in occurrences:
-    desc = (occ.get("description") or "").upper()
-    hole_count = occ.get("hole_count", 0)
+def classify_parts(occurrences):
+    part_type = {}
 
-    if "RIVET" in desc or "NUT" in desc or "SCREW" in desc:
-        part_type[occ["name"]] = "Fastener"
-    elif hole_count > 0:
-        part_type[occ["name"]] = "Plate"
-    else:
-        part_type[occ["name"]] = "Structural"
+    for occ in occurrences:
+        desc = occ.get("description") or ""
+        hole_count = occ.get("hole_count", 0)
+
+        if is_fastener(desc):
+            part_type[occ["name"]] = "Fastener"
+        elif hole_count > 0:
+            part_type[occ["name"]] = "Plate"
+        else:
+            part_type[occ["name"]] = "Structural"
+
+    return part_type
 
 # =====================================================
 # CONSTRAINT NORMALIZATION
@@ -40,77 +124,289 @@ for occ in occurrences:
 def constraint_signature(c):
     return (
         c["constraint_type"],
-        tuple(sorted([c["occurrence_1"], c["occurrence_2"]])),
+        tuple(sorted([c["occurrence_1"] or "", c["occurrence_2"] or ""])),
         tuple(sorted([c["entity_1_type"], c["entity_2_type"]]))
     )
 
-normalized = {}
-for c in constraints:
-    sig = constraint_signature(c)
-    if sig not in normalized:
-        normalized[sig] = c
+def normalize_constraints(constraints):
+    normalized = {}
+    for c in constraints:
+        sig = constraint_signature(c)
+        if sig not in normalized:
+            normalized[sig] = c
 
-normalized_constraints = list(normalized.values())
-
-# =====================================================
-# SAVE NORMALIZED CONSTRAINTS
-# =====================================================
-with open(OUT_NORMALIZED, "w", encoding="utf-8") as f:
-    json.dump(normalized_constraints, f, indent=4)
+    return list(normalized.values())
 
 # =====================================================
 # RULE MINING
 # =====================================================
-rule_counter = defaultdict(int)
-rule_examples = {}
+def count_rules(normalized_constraints, part_type):
+    """Counter of rule keys (type, entity pair, source type, target type)."""
+    rule_counter = Counter()
 
-for c in normalized_constraints:
-    src = c["occurrence_1"]
-    tgt = c["occurrence_2"]
+    for c in normalized_constraints:
+        src = c["occurrence_1"]
+        tgt = c["occurrence_2"]
 
-    src_type = part_type.get(src, "Unknown")
-    tgt_type = part_type.get(tgt, "Unknown")
+        src_type = part_type.get(src, "Unknown")
+        tgt_type = part_type.get(tgt, "Unknown")
 
-    rule_key = (
-        c["constraint_type"],
-        tuple(sorted([c["entity_1_type"], c["entity_2_type"]])),
-        src_type,
-        tgt_type
-    )
+        rule_key = (
+            c["constraint_type"],
+            tuple(sorted([c["entity_1_type"], c["entity_2_type"]])),
+            src_type,
+            tgt_type
+        )
+
+        rule_counter[rule_key] += 1
+
+    return rule_counter
+
+def mine_assembly(path):
+    """Rule counts of one export: load, classify, normalize, count."""
+    occurrences, constraints = load_assembly(path)
+    return count_rules(normalize_constraints(constraints), classify_parts(occurrences))
+
+def mine_many(paths, workers=WORKERS):
+    """
+    Yield (path, Counter) for every path, in order.
 
-    rule_counter[rule_key] += 1
-    rule_examples.setdefault(rule_key, c)
+    mine_assembly is a pure per-assembly map step, so with more than one
+    worker the paths are spread over a process pool; the caller does
+    the reduce.
+    """
+    paths = [str(p) for p in paths]
+    workers = min(workers, len(paths))
+
+    if workers <= 1:
+        for p in paths:
+            yield p, mine_assembly(p)
+        return
+
+    ctx = mp.get_context("spawn" if os.name == "nt" else None)
+    chunk = max(1, len(paths) // (workers * 8))
+
+    with ctx.Pool(workers) as pool:
+        yield from zip(paths, pool.imap(mine_assembly, paths, chunksize=chunk))
 
 # =====================================================
 # BUILD RULES
 # =====================================================
-rules = []
-max_occurrence = max(rule_counter.values()) if rule_counter else 1
+def build_rules(rule_counter):
+    """Rules with confidence relative to the most frequent rule."""
+    rules = []
+    max_occurrence = max(rule_counter.values()) if rule_counter else 1
+
+    for i, (key, count) in enumerate(rule_counter.items(), start=1):
+        constraint_type, entity_pair, src_type, tgt_type = key
+
+        confidence = round(count / max_occurrence, 3)
+
+        rule = {
+            "rule_id": f"RULE_{i:03d}",
+            "constraint_type": constraint_type,
+            "entity_pair": list(entity_pair),
+            "source_part_type": src_type,
+            "target_part_type": tgt_type,
+            "occurrences_seen": count,
+            "confidence": confidence,
+            "mandatory": confidence >= 0.9
+        }
+
+        rules.append(rule)
+
+    return rules
 
-for i, (key, count) in enumerate(rule_counter.items(), start=1):
+# =====================================================
+# PERSISTENT RULE-COUNT STORE (CORPUS MODE)
+# =====================================================
+def _key_str(key):
     constraint_type, entity_pair, src_type, tgt_type = key
+    return json.dumps([constraint_type, list(entity_pair), src_type, tgt_type])
+
+def _key_tuple(s):
+    constraint_type, entity_pair, src_type, tgt_type = json.loads(s)
+    return (constraint_type, tuple(entity_pair), src_type, tgt_type)
+
+class RuleStore:
+    """
+    Corpus-wide rule counts plus the counts each assembly contributed.
+
+    <root>/totals.json holds the summed counts and, per assembly, the
+    content hash it was mined at. <root>/assemblies/<hash>.json holds
+    that assembly's own counts so a changed or removed assembly can be
+    subtracted without re-mining the rest.
+    """
+
+    def __init__(self, root=RULE_STORE):
+        self.root = Path(root)
+        self._totals_path = self.root / "totals.json"
+        try:
+            state = json.loads(self._totals_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            state = {}
+        if state.get("version") != STORE_VERSION:
+            state = {}
+
+        self.assemblies = state.get("assemblies", {})     # path → content hash
+        self.totals = Counter({_key_tuple(k): n for k, n in state.get("totals", [])})
+
+    def _counts_path(self, sha):
+        return self.root / "assemblies" / f"{sha}.json"
+
+    def _load_counts(self, sha):
+        try:
+            rows = json.loads(self._counts_path(sha).read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return Counter({_key_tuple(k): n for k, n in rows})
+
+    def _save_counts(self, sha, counts):
+        path = self._counts_path(sha)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps([[_key_str(k), n] for k, n in counts.items()]), encoding="utf-8")
+        os.replace(tmp, path)
+
+    def _subtract(self, path):
+        sha = self.assemblies.pop(path)
+        old = self._load_counts(sha)
+        if old is None:
+            return False
+        self.totals.subtract(old)
+        for k in [k for k, n in self.totals.items() if n <= 0]:
+            del self.totals[k]
+        return True
+
+    def stale(self, paths):
+        """Paths whose content is new or changed since they were folded in."""
+        return [p for p in paths if self.assemblies.get(p) != export_digest(p)]
+
+    def fold(self, paths, workers=WORKERS):
+        """
+        Bring the totals in line with exactly `paths`: removed and
+        changed assemblies are subtracted, new and changed ones mined
+        (across `workers` processes) and added.
+        Returns (added, removed) counts.
+        """
+        paths = [str(p) for p in paths]
+        keep = set(paths)
+
+        removed = [p for p in self.assemblies if p not in keep]
+        changed = self.stale(paths)
+
+        for p in removed + [p for p in changed if p in self.assemblies]:
+            if not self._subtract(p):
+                return self.rebuild(paths, workers)
+
+        for p, counts in mine_many(changed, workers):
+            self.add(p, counts)
+
+        return len(changed), len(removed)
 
-    confidence = round(count / max_occurrence, 3)
+    def add(self, path, counts):
+        sha = export_digest(path)
+        self._save_counts(sha, counts)
+        self.assemblies[path] = sha
+        self.totals.update(counts)
 
-    rule = {
-        "rule_id": f"RULE_{i:03d}",
-        "constraint_type": constraint_type,
-        "entity_pair": list(entity_pair),
-        "source_part_type": src_type,
-        "target_part_type": tgt_type,
-        "occurrences_seen": count,
-        "confidence": confidence,
-        "mandatory": confidence >= 0.9
-    }
+    def rebuild(self, paths, workers=WORKERS):
+        """Drop all stored counts and mine every path again."""
+        self.assemblies = {}
+        self.totals = Counter()
+        for p, counts in mine_many(paths, workers):
+            self.add(p, counts)
+        return len(paths), 0
 
-    rules.append(rule)
+    def save(self):
+        self.root.mkdir(parents=True, exist_ok=True)
+        tmp = self._totals_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps({
+            "version": STORE_VERSION,
+            "assemblies": self.assemblies,
+            "totals": [[_key_str(k), n] for k, n in self.totals.items()]
+        }), encoding="utf-8")
+        os.replace(tmp, self._totals_path)
+        CACHE.flush()
+
+def export_digest(path):
+    """Content hash of an export; a .cols store changes with its meta.json."""
+    if is_store(path):
+        return CACHE.digest(Path(path) / "meta.json")
+    return CACHE.digest(path)
+
+def corpus_files(folder):
+    """Assembly exports in a folder: *.json files and *.cols stores."""
+    folder = Path(folder)
+    return sorted(
+        str(p) for p in folder.iterdir()
+        if p.suffix.lower() == ".json" or (p.suffix == SUFFIX and p.is_dir())
+    )
 
 # =====================================================
-# SAVE RULES
+# MAIN
 # =====================================================
-with open(OUT_RULES, "w", encoding="utf-8") as f:
-    json.dump(rules, f, indent=4)
+def run():
+    # INPUT_JSON may also be a .cols store (columnar.py); occurrences are
+    # read from just the columns the classifier needs
+    data = load_tables(INPUT_JSON, {
+        "occurrences": OCC_COLUMNS,
+        "constraints": None
+    })
+
+    part_type = classify_parts(data["occurrences"])
+    normalized_constraints = normalize_constraints(data["constraints"])
+
+    # =====================================================
+    # SAVE NORMALIZED CONSTRAINTS
+    # =====================================================
+    with open(OUT_NORMALIZED, "w", encoding="utf-8") as f:
+        json.dump(normalized_constraints, f, indent=4)
+
+    rules = build_rules(count_rules(normalized_constraints, part_type))
+
+    # =====================================================
+    # SAVE RULES
+    # =====================================================
+    with open(OUT_RULES, "w", encoding="utf-8") as f:
+        json.dump(rules, f, indent=4)
+
+    print("✅ Phase-2 complete")
+    print(f"   → {OUT_NORMALIZED}")
+    print(f"   → {OUT_RULES}")
 
-print("✅ Phase-2 complete")
-print(f"   → {OUT_NORMALIZED}")
-print(f"   → {OUT_RULES}")
\ No newline at end of file
+def run_corpus(corpus=CORPUS_DIR, store_dir=RULE_STORE, out_rules=OUT_RULES,
+               rebuild=False, workers=WORKERS):
+    """Fold new / changed exports into the rule store and rewrite the rules."""
+    files = corpus_files(corpus)
+    store = RuleStore(store_dir)
+
+    if rebuild:
+        added, removed = store.rebuild(files, workers)
+    else:
+        added, removed = store.fold(files, workers)
+
+    store.save()
+
+    rules = build_rules(store.totals)
+    with open(out_rules, "w", encoding="utf-8") as f:
+        json.dump(rules, f, indent=4)
+
+    print("✅ Corpus rule mining complete")
+    print(f"   → assemblies: {len(store.assemblies)} ({added} mined, {removed} removed)")
+    print(f"   → rules: {len(rules)} → {out_rules}")
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Mine assembly constraint rules")
+    ap.add_argument("--corpus", nargs="?", const=str(CORPUS_DIR), default=None,
+                    help="incremental mode over a folder of exports")
+    ap.add_argument("--store", default=str(RULE_STORE), help="rule-count store folder")
+    ap.add_argument("-o", "--output", default=str(OUT_RULES))
+    ap.add_argument("--rebuild", action="store_true", help="re-mine every assembly")
+    ap.add_argument("-w", "--workers", type=int, default=WORKERS, help="processes for corpus mining")
+    args = ap.parse_args()
+
+    if args.corpus:
+        run_corpus(args.corpus, args.store, args.output, args.rebuild, args.workers)
+    else:
+        run()
@@ -0,0 +1,305 @@
+import json
+import os
+from pathlib import Path
+
+# journal section holding checkpoints: key = finished unit of work,
+# data = whatever the producer needs to pick up after it
+CHECKPOINT = "_checkpoint"
+SOURCE     = "source"
+COMPLETE   = "complete"
+
+# =====================================================
+# JSON LINES JOURNAL
+# =====================================================
+class JsonlWriter:
+    """
+    Append-only JSON Lines output, one record per line.
+
+    Each line is {"section": ..., "key": ..., "data": ...} and is
+    flushed as soon as it is written, so a crash keeps everything
+    produced so far and memory does not grow with assembly size.
+    """
+
+    def __init__(self, path, mode="w", fsync=False):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._f = open(self.path, mode, encoding="utf-8")
+        self._fsync = fsync
+        self.count = 0
+
+    def write(self, section, data, key=None):
+        line = {"section": section, "data": data}
+        if key is not None:
+            line["key"] = key
+        self._f.write(json.dumps(line, separators=(",", ":")) + "\n")
+        self._f.flush()
+        if self._fsync:
+            os.fsync(self._f.fileno())
+        self.count += 1
+
+    __call__ = write
+
+    def checkpoint(self, key, data=None):
+        """Mark `key` as finished; everything written before it is kept on resume."""
+        self.write(CHECKPOINT, data, key)
+
+    def finish(self):
+        """Mark the run complete (a later resume starts over) and close."""
+        self.checkpoint(COMPLETE)
+        self.close()
+
+    def close(self):
+        if not self._f.closed:
+            self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def read_jsonl(path, section=None):
+    """
+    Yield journal records, optionally only one section.
+
+    A truncated final line (crash mid-write) is skipped.
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue
+            if section is None or rec.get("section") == section:
+                yield rec
+
+# =====================================================
+# STREAMING INPUT
+# =====================================================
+_WS = " \t\r\n"
+
+def iter_json_array(path, chunk_size=1 << 20):
+    """
+    Yield the elements of a top-level JSON array one at a time.
+
+    The file is read in `chunk_size` pieces and decoded incrementally,
+    so memory holds one element plus one chunk, not the whole document.
+    """
+    decoder = json.JSONDecoder()
+
+    with open(path, "r", encoding="utf-8-sig") as f:
+        buf, pos, eof = "", 0, False
+
+        def more():
+            nonlocal buf, pos, eof
+            data = f.read(chunk_size)
+            eof = not data
+            buf, pos = buf[pos:] + data, 0
+            return not eof
+
+        def next_char():
+            nonlocal pos
+            while True:
+                while pos < len(buf) and buf[pos] in _WS:
+                    pos += 1
+                if pos < len(buf):
+                    return buf[pos]
+                if not more():
+                    raise ValueError(f"{path}: unexpected end of JSON array")
+
+        if next_char() != "[":
+            raise ValueError(f"{path}: top-level value is not an array")
+        pos += 1
+
+        first = True
+        while True:
+            ch = next_char()
+            if ch == "]":
+                return
+            if not first:
+                if ch != ",":
+                    raise ValueError(f"{path}: expected ',' at offset {pos}")
+                pos += 1
+                next_char()
+            first = False
+
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    if not more():
+                        raise
+                    continue
+                # a value cut by the chunk boundary can still decode (a
+                # number's prefix); a complete element is always followed
+                # by a separator
+                if not eof and (end == len(buf) or buf[end] not in _WS + ",]"):
+                    if more():
+                        continue
+                break
+
+            pos = end
+            yield value
+
+def iter_records(path):
+    """
+    Records of a JSON Lines file (one value per line) or of a file
+    holding one top-level JSON array, streamed either way.
+    """
+    if Path(path).suffix.lower() == ".jsonl":
+        with open(path, "r", encoding="utf-8-sig") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+    else:
+        yield from iter_json_array(path)
+
+# =====================================================
+# RESUME AFTER A CRASH
+# =====================================================
+def open_journal(path, source, resume=True, fsync=False):
+    """
+    Start a journal, or with `resume` reopen the one of an interrupted run.
+
+    Lines after the last checkpoint belong to unfinished work and are
+    cut off. Returns (writer, done) where `done` maps checkpoint key →
+    data. A journal from another `source` or from a run that completed
+    is discarded and a fresh one started.
+    """
+    path = Path(path)
+    done = {}
+    keep = 0
+
+    if resume and path.exists():
+        with open(path, "rb") as f:
+            pos = 0
+            for line in f:
+                pos += len(line)
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    break
+                if rec.get("section") == CHECKPOINT:
+                    done[rec.get("key")] = rec.get("data")
+                    keep = pos
+
+    if done.get(SOURCE) != source or COMPLETE in done:
+        done, keep = {}, 0
+
+    if keep:
+        with open(path, "r+b") as f:
+            f.truncate(keep)
+        return JsonlWriter(path, "a", fsync), done
+
+    writer = JsonlWriter(path, "w", fsync)
+    writer.checkpoint(SOURCE, source)
+    return writer, {SOURCE: source}
+
+# =====================================================
+# STREAMED JSON OUTPUT
+# =====================================================
+def _dump(value, indent, pad):
+    if indent is None:
+        return json.dumps(value)
+    return json.dumps(value, indent=indent).replace("\n", "\n" + pad)
+
+def _write_items(f, items, open_ch, close_ch, indent, level, keyed):
+    # indent=None: single line, like json.dump(obj, f) (C encoder, much faster)
+    compact = indent is None
+    pad = "" if compact else "\n" + " " * (indent * (level + 1))
+    first = True
+
+    for item in items:
+        f.write(open_ch if first else ", " if compact else ",")
+        f.write(pad)
+        if keyed:
+            key, item = item
+            f.write(json.dumps(key) + ": ")
+        f.write(_dump(item, indent, pad[1:]))
+        first = False
+
+    if first:
+        f.write(open_ch + close_ch)
+    elif compact:
+        f.write(close_ch)
+    else:
+        f.write("\n" + " " * (indent * level) + close_ch)
+
+def write_json(out_path, fields, indent=4):
+    """
+    Write a JSON object whose large members come from iterables.
+
+    `fields` is an ordered list of (field, kind, value) where kind is
+    "value" (dumped as is), "list" (iterable of items) or "dict"
+    (iterable of (key, item) pairs). Items are written as they are
+    produced, so memory holds one at a time. The result is
+    byte-identical to json.dump(obj, f, indent=indent), indent=None
+    included.
+    """
+    compact = indent is None
+    pad = "" if compact else " " * indent
+    tmp = Path(str(out_path) + ".tmp")
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write("{")
+        for i, (field, kind, value) in enumerate(fields):
+            if compact:
+                f.write((", " if i else "") + json.dumps(field) + ": ")
+            else:
+                f.write(("," if i else "") + "\n" + pad + json.dumps(field) + ": ")
+
+            if kind == "value":
+                f.write(_dump(value, indent, pad))
+            elif kind == "list":
+                _write_items(f, value, "[", "]", indent, 1, False)
+            elif kind == "dict":
+                _write_items(f, value, "{", "}", indent, 1, True)
+            else:
+                raise ValueError(f"Unknown layout kind: {kind}")
+
+        f.write("\n}" if fields and not compact else "}")
+
+    os.replace(tmp, out_path)
+
+def write_json_list(out_path, items, indent=4):
+    """Top-level JSON array from any iterable, written as produced."""
+    tmp = Path(str(out_path) + ".tmp")
+
+    with open(tmp, "w", encoding="utf-8") as f:
+        _write_items(f, items, "[", "]", indent, 0, False)
+
+    os.replace(tmp, out_path)
+
+# =====================================================
+# JOURNAL → FINAL JSON (STREAMED)
+# =====================================================
+def _section(jsonl_path, section, keyed):
+    for rec in read_jsonl(jsonl_path, section):
+        yield (rec["key"], rec["data"]) if keyed else rec["data"]
+
+def compile_json(jsonl_path, out_path, layout, header=None, indent=4):
+    """
+    Write the final JSON document from a journal, one section at a time.
+
+    `layout` is an ordered list of (field, kind) where kind is "value"
+    (taken from `header`), "list" or "dict" (records with a key).
+    The result is byte-identical to json.dump(obj, f, indent=indent).
+    """
+    header = header or {}
+    fields = [
+        (field, kind, header[field] if kind == "value" else _section(jsonl_path, field, kind == "dict"))
+        for field, kind in layout
+    ]
+    write_json(out_path, fields, indent)
+
+def compile_json_list(jsonl_path, out_path, section, indent=4):
+    """Top-level JSON array from one journal section (streamed)."""
+    write_json_list(out_path, _section(jsonl_path, section, False), indent)
+
+def journal_path(out_path):
+    """Journal file that sits next to a final JSON output."""
+    return Path(out_path).with_suffix(".jsonl")
@@ -0,0 +1,572 @@
+import argparse
+import base64
+import hashlib
+import json
+import math
+import random
+from collections import Counter
+from pathlib import Path
+
+import rule_miner
+from stream_writer import write_json, write_json_list
+
+# =====================================================
+# CONFIG
+# =====================================================
+OUT_DIR     = Path(r"E:\Phase 1\synthetic")
+OCCURRENCES = 10_000
+SEED        = 0
+INDENT      = None   # None = one line per file (fastest); 2 / 4 to read by eye
+
+# Windows folder the synthetic parts claim to live in (file_name,
+# owner_document), like the paths in real exports
+SOURCE_DIR = r"E:\Phase 1\Synthetic"
+
+# a joint is a stack of plates held together by a grid of rivets
+STACK_SIZES  = (2, 2, 3, 3, 4)                              # plates per joint (repeats = weight)
+HOLE_GRIDS   = ((1, 4), (2, 4), (2, 8), (4, 10), (10, 10))  # rivet rows x cols
+THICKNESS_MM = (1.0, 1.6, 2.0, 3.0)                         # plate thickness per layer
+PITCH_MM     = 20.0
+EDGE_MM      = 15.0
+JOINT_GAP_MM = 100.0
+JOINTS_PER_ROW = 100
+
+# rivet part number → (description, diameter mm, length mm); a grid
+# always uses the same rivet so plate hole sizes match it
+RIVETS = {
+    "SYN-RIVET-32": ("BLIND RIVET 3.2 AL", 3.2, 8.0),
+    "SYN-RIVET-40": ("BLIND RIVET 4.0 AL", 4.0, 10.0),
+    "SYN-RIVET-48": ("BLIND RIVET 4.8 ST", 4.8, 12.0),
+}
+HOLE_CLEARANCE_MM = 0.1
+
+SECOND_PLATE_INSERT = 0.3    # share of rivets also Insert-constrained to the second plate
+BOM_SHORTFALL       = 0.02   # share of each rivet type left out of the BOM
+
+kFaceObject = "67119520"
+
+# =====================================================
+# PART DEFINITIONS
+# =====================================================
+def rivet_for_grid(g):
+    return list(RIVETS)[g % len(RIVETS)]
+
+def plate_pn(g, layer):
+    rows, cols = HOLE_GRIDS[g]
+    return f"SYN-PL-{rows}X{cols}-{layer + 1}"
+
+def part_path(pn):
+    return f"{SOURCE_DIR}\\{pn}.ipt"
+
+# plate faces: 1 bottom, 2 top, 3.. one cylinder per hole (row-major);
+# rivet faces: 1 shank cylinder, 2 head underside
+PLATE_BOTTOM, PLATE_TOP, PLATE_FIRST_HOLE = 1, 2, 3
+RIVET_SHANK, RIVET_HEAD = 1, 2
+
+def hole_face(g, r, c):
+    return PLATE_FIRST_HOLE + r * HOLE_GRIDS[g][1] + c
+
+def hole_xy_mm(r, c):
+    return EDGE_MM + c * PITCH_MM, EDGE_MM + r * PITCH_MM
+
+def _xyz(v):
+    return {"x": v[0], "y": v[1], "z": v[2]}
+
+def _face(face_id, face_type, area, normal, center):
+    return {
+        "face_id": str(face_id),
+        "face_type": face_type,
+        "area_mm2": round(area, 6),
+        "normal": _xyz(normal),
+        "center_mm": _xyz(center)
+    }
+
+def plate_part(g, layer):
+    """Part export (jsons schema) of one plate: a hole, patterned over the grid."""
+    rows, cols = HOLE_GRIDS[g]
+    pn = plate_pn(g, layer)
+    t = THICKNESS_MM[layer]
+    dia = RIVETS[rivet_for_grid(g)][1] + HOLE_CLEARANCE_MM
+    w = 2 * EDGE_MM + (cols - 1) * PITCH_MM
+    h = 2 * EDGE_MM + (rows - 1) * PITCH_MM
+
+    faces = [
+        _face(PLATE_BOTTOM, "Planar", w * h, (0, 0, -1), (w / 2, h / 2, 0.0)),
+        _face(PLATE_TOP, "Planar", w * h, (0, 0, 1), (w / 2, h / 2, t)),
+    ]
+    holes = []
+
+    for r in range(rows):
+        for c in range(cols):
+            x, y = hole_xy_mm(r, c)
+            faces.append(_face(hole_face(g, r, c), "Cylindrical", math.pi * dia * t, (1, 0, 0), (x + dia / 2, y, t / 2)))
+
+            index = r * cols + c + 1
+            holes.append({
+                "id": f"{pn}-H{index}",
+                "feature_name": "Hole1" if index == 1 else f"Rectangular Pattern1:{index}",
+                "feature_type": "Hole",
+                "hole_properties": {
+                    "hole_type": "Simple",
+                    "diameter_mm": dia,
+                    "minor_diameter_mm": None,
+                    "thread_pitch_mm": None,
+                    "is_threaded": False,
+                    "is_through": True,
+                    "depth_mm": None,
+                    "countersink_angle_deg": None
+                },
+                "geometry": {
+                    "center_mm": _xyz((x, y, t)),
+                    "axis": _xyz((0, 0, -1)),
+                    "entry_face_normal": _xyz((0, 0, 1))
+                },
+                "supporting_faces": {"entry_face_id": str(PLATE_TOP), "exit_face_id": str(PLATE_BOTTOM)},
+                "thickness_along_axis_mm": t,
+                "pattern_info": {
+                    "is_patterned": index > 1,
+                    "pattern_type": "Rectangular" if index > 1 else "None",
+                    "pattern_parent": "Hole1",
+                    "pattern_index": index
+                },
+                "confidence": 1.0
+            })
+
+    features = [
+        {"feature_name": "Extrusion1", "feature_type": "Extrude", "parent_features": [], "child_features": ["Hole1"]},
+        {"feature_name": "Hole1", "feature_type": "Hole", "parent_features": ["Extrusion1"], "child_features": ["Rectangular Pattern1"]},
+        {"feature_name": "Rectangular Pattern1", "feature_type": "Pattern", "parent_features": ["Hole1"], "child_features": []},
+    ]
+
+    return pn, _part_doc(pn, f"PLATE {rows}X{cols} {t}MM", (0, 0, 0), (w, h, t), holes, faces, features, 7.85e-6 * w * h * t)
+
+def rivet_part(pn):
+    desc, dia, length = RIVETS[pn]
+    faces = [
+        _face(RIVET_SHANK, "Cylindrical", math.pi * dia * length, (1, 0, 0), (dia / 2, 0, length / 2)),
+        _face(RIVET_HEAD, "Planar", math.pi * dia * dia / 2, (0, 0, -1), (0, 0, 0)),
+    ]
+    features = [{"feature_name": "Revolution1", "feature_type": "Revolve", "parent_features": [], "child_features": []}]
+    r = dia
+    return pn, _part_doc(pn, desc, (-r, -r, -1.0), (r, r, length), [], faces, features, 2.7e-6 * math.pi * dia * dia / 4 * length)
+
+def _part_doc(pn, description, lo, hi, connection_points, faces, features, mass_kg):
+    return {
+        "part_metadata": {
+            "file_name": pn,
+            "full_path": part_path(pn),
+            "part_number": pn,
+            "description": description,
+            "material": "Synthetic",
+            "units": "mm",
+            "mass_kg": round(mass_kg, 6)
+        },
+        "coordinate_system": {
+            "origin_mm": _xyz((0, 0, 0)),
+            "x_axis": _xyz((1, 0, 0)),
+            "y_axis": _xyz((0, 1, 0)),
+            "z_axis": _xyz((0, 0, 1))
+        },
+        "bounding_box_mm": {"min": _xyz(lo), "max": _xyz(hi)},
+        "connection_points": connection_points,
+        "faces": faces,
+        "feature_graph": {"features": features}
+    }
+
+def part_descriptions():
+    desc = {pn: d for pn, (d, _, _) in RIVETS.items()}
+    for g, (rows, cols) in enumerate(HOLE_GRIDS):
+        for layer, t in enumerate(THICKNESS_MM):
+            desc[plate_pn(g, layer)] = f"PLATE {rows}X{cols} {t}MM"
+    return desc
+
+# =====================================================
+# ASSEMBLY TOPOLOGY (DETERMINISTIC STREAM)
+# =====================================================
+def _rotation_z(deg):
+    a = math.radians(deg)
+    c, s = round(math.cos(a), 12), round(math.sin(a), 12)
+    return [[c, -s, 0.0], [s, c, 0.0], [0.0, 0.0, 1.0]]
+
+def _apply(R, p):
+    return [R[i][0] * p[0] + R[i][1] * p[1] + R[i][2] * p[2] for i in range(3)]
+
+def iter_joints(n_occurrences, seed=SEED):
+    """
+    Joints until at least `n_occurrences` occurrences exist.
+
+    Each joint is a dict with its plates (bottom to top), rivets and
+    constraints. The stream is fully determined by (n, seed), so every
+    writer can walk it again instead of holding the assembly in memory.
+    """
+    rng = random.Random(seed)
+    names = Counter()
+    constraint_ids = Counter()
+
+    def occ_name(pn):
+        names[pn] += 1
+        return f"{pn}:{names[pn]}"
+
+    def constraint(ctype, occ1, pn1, face1, occ2, pn2, face2):
+        constraint_ids[ctype] += 1
+        return {
+            "name": f"{ctype}:{constraint_ids[ctype]}",
+            "type": ctype,
+            "one": (occ1, pn1, face1),
+            "two": (occ2, pn2, face2)
+        }
+
+    total = 0
+    j = 0
+
+    while total < n_occurrences:
+        g = rng.randrange(len(HOLE_GRIDS))
+        rows, cols = HOLE_GRIDS[g]
+        k = rng.choice(STACK_SIZES)
+        R = _rotation_z(rng.choice((0, 90, 180, 270)))
+        origin = [(j % JOINTS_PER_ROW) * JOINT_GAP_MM * 5, (j // JOINTS_PER_ROW) * JOINT_GAP_MM * 5, 0.0]
+
+        plates = []
+        z = 0.0
+        for layer in range(k):
+            pn = plate_pn(g, layer)
+            plates.append({
+                "name": occ_name(pn),
+                "pn": pn,
+                "rotation": R,
+                "translation_mm": [origin[0], origin[1], z]
+            })
+            z += THICKNESS_MM[layer]
+
+        constraints = []
+        for lower, upper in zip(plates, plates[1:]):
+            constraints.append(constraint("Mate", lower["name"], lower["pn"], PLATE_TOP,
+                                          upper["name"], upper["pn"], PLATE_BOTTOM))
+            constraints.append(constraint("Insert", lower["name"], lower["pn"], hole_face(g, 0, 0),
+                                          upper["name"], upper["pn"], hole_face(g, 0, 0)))
+
+        rivet_pn = rivet_for_grid(g)
+        rivets = []
+        for r in range(rows):
+            for c in range(cols):
+                x, y = hole_xy_mm(r, c)
+                p = _apply(R, (x, y, 0.0))
+                rivet = {
+                    "name": occ_name(rivet_pn),
+                    "pn": rivet_pn,
+                    "rotation": R,
+                    "translation_mm": [origin[0] + p[0], origin[1] + p[1], 0.0],
+                    "hole": (r, c),
+                    "stack": [pl["name"] for pl in plates]
+                }
+                rivets.append(rivet)
+
+                face = hole_face(g, r, c)
+                bottom = plates[0]
+                constraints.append(constraint("Insert", rivet["name"], rivet_pn, RIVET_SHANK,
+                                              bottom["name"], bottom["pn"], face))
+                if k > 1 and rng.random() < SECOND_PLATE_INSERT:
+                    second = plates[1]
+                    constraints.append(constraint("Insert", rivet["name"], rivet_pn, RIVET_SHANK,
+                                                  second["name"], second["pn"], face))
+
+        yield {
+            "index": j,
+            "grid": g,
+            "plates": plates,
+            "rivets": rivets,
+            "constraints": constraints
+        }
+
+        total += len(plates) + len(rivets)
+        j += 1
+
+def count(n_occurrences, seed=SEED):
+    """Occurrence / constraint / hole totals of the stream (one cheap pass)."""
+    totals = Counter()
+    for joint in iter_joints(n_occurrences, seed):
+        totals["joints"] += 1
+        totals["occurrences"] += len(joint["plates"]) + len(joint["rivets"])
+        totals["constraints"] += len(joint["constraints"])
+        totals["holes"] += len(joint["rivets"]) * len(joint["plates"])
+        totals["rivets"] += len(joint["rivets"])
+    return dict(totals)
+
+# =====================================================
+# REFERENCE KEYS
+# =====================================================
+def reference_key(pn, face_id):
+    """Stable per (part, face): constraints on the same face share it."""
+    digest = hashlib.sha1(f"{pn}#{face_id}".encode()).digest()
+    return base64.b64encode(b"\x01\x04" + digest + bytes(4)).decode("ascii")
+
+def context_key(constraint_name, side):
+    digest = hashlib.sha1(f"{constraint_name}/{side}".encode()).digest()
+    return base64.b64encode(b"\x9e\xc2" + digest * 2).decode("ascii")
+
+# =====================================================
+# RECORDS PER OUTPUT SCHEMA
+# =====================================================
+def _occurrences(joint):
+    yield from joint["plates"]
+    yield from joint["rivets"]
+
+def raw_components(n, seed):
+    first = True
+    for joint in iter_joints(n, seed):
+        for occ in _occurrences(joint):
+            yield {
+                "occurrence_name": occ["name"],
+                "occurrence_path": occ["name"],
+                "file_name": part_path(occ["pn"]),
+                "component_type": "kPartDocumentObject",
+                "grounded": first,
+                "suppressed": False,
+                "visible": True,
+                "transform": {
+                    "rotation_matrix": occ["rotation"],
+                    "translation_cm": [v / 10.0 for v in occ["translation_mm"]]
+                }
+            }
+            first = False
+
+def _raw_entity(end, constraint_name, side):
+    occ, pn, face = end
+    return {
+        "entity_type": kFaceObject,
+        "proxy_context_occurrence": occ,
+        "owner_document": part_path(pn),
+        "reference_key_string": reference_key(pn, face),
+        "context_key_string": context_key(constraint_name, side),
+        "work_feature_name": None
+    }
+
+def raw_constraints(n, seed):
+    for joint in iter_joints(n, seed):
+        for c in joint["constraints"]:
+            yield {
+                "constraint_name": c["name"],
+                "constraint_type": f"k{c['type']}Constraint",
+                "suppressed": False,
+                "occurrence_one": c["one"][0],
+                "occurrence_two": c["two"][0],
+                "offset_cm": 0.0,
+                "angle_rad": None,
+                "entity_one": _raw_entity(c["one"], c["name"], "one"),
+                "entity_two": _raw_entity(c["two"], c["name"], "two")
+            }
+
+def extraction_occurrences(n, seed):
+    desc = part_descriptions()
+    for joint in iter_joints(n, seed):
+        n_holes = len(joint["rivets"])
+        for occ in _occurrences(joint):
+            yield {
+                "name": occ["name"],
+                "definition": f"{occ['pn']}.ipt",
+                "description": desc[occ["pn"]],
+                "document_type": "Part",
+                "hole_count": 0 if occ["pn"] in RIVETS else n_holes
+            }
+
+def extraction_constraints(n, seed):
+    for joint in iter_joints(n, seed):
+        for c in joint["constraints"]:
+            yield {
+                "name": c["name"],
+                "constraint_type": c["type"],
+                "occurrence_1": c["one"][0],
+                "occurrence_2": c["two"][0],
+                "entity_1_type": kFaceObject,
+                "entity_2_type": kFaceObject
+            }
+
+def fastener_axes(n, seed):
+    for joint in iter_joints(n, seed):
+        for rv in joint["rivets"]:
+            yield {
+                "occurrence": rv["name"],
+                "part_number": rv["pn"],
+                "origin": [v / 10.0 for v in rv["translation_mm"]],
+                "direction": [row[2] for row in rv["rotation"]],
+                "source": "OccurrenceTransform",
+                "confidence": 0.95
+            }
+
+def inferred_holes(n, seed):
+    for joint in iter_joints(n, seed):
+        dia = RIVETS[rivet_for_grid(joint["grid"])][1] + HOLE_CLEARANCE_MM
+        for rv in joint["rivets"]:
+            yield {
+                "fastener": rv["name"],
+                "hole_stack": rv["stack"],
+                "center_mm": rv["translation_mm"],
+                "axis": [row[2] for row in rv["rotation"]],
+                "diameter_mm": dia
+            }
+
+def ain1_occurrences(n, seed):
+    """(name, record) pairs of ain1.py's "occurrences": translation in cm."""
+    for joint in iter_joints(n, seed):
+        for occ in _occurrences(joint):
+            yield occ["name"], {
+                "definition": f"{occ['pn']}.ipt",
+                "transform": {
+                    "translation": [v / 10.0 for v in occ["translation_mm"]],
+                    "rotation": occ["rotation"]
+                }
+            }
+
+def ain1_holes(n, seed):
+    """
+    ain1.py's "holes": every plate hole and rivet shank, in cm and in
+    the frame of the part definition (like axis.RootPoint), fanned out
+    per occurrence. ain1_occurrences places them in the assembly.
+    """
+    for joint in iter_joints(n, seed):
+        g = joint["grid"]
+        rivet_pn = rivet_for_grid(g)
+        _, rivet_dia, length = RIVETS[rivet_pn]
+        hole_dia = rivet_dia + HOLE_CLEARANCE_MM
+
+        for layer, plate in enumerate(joint["plates"]):
+            t = THICKNESS_MM[layer]
+            for rv in joint["rivets"]:
+                x, y = hole_xy_mm(*rv["hole"])
+                yield {
+                    "part": f"{plate['pn']}.ipt",
+                    "occurrence": plate["name"],
+                    "center": [x / 10.0, y / 10.0, t / 20.0],
+                    "direction": [0.0, 0.0, 1.0],
+                    "diameter_mm": hole_dia
+                }
+
+        for rv in joint["rivets"]:
+            yield {
+                "part": f"{rivet_pn}.ipt",
+                "occurrence": rv["name"],
+                "center": [0.0, 0.0, length / 20.0],
+                "direction": [0.0, 0.0, 1.0],
+                "diameter_mm": rivet_dia
+            }
+
+def rule_counts(n, seed):
+    """
+    rule_miner's rule counts, mined joint by joint: occurrences of two
+    joints are never constrained to each other, so per-joint
+    normalization and counting add up to the whole-assembly result.
+    """
+    totals = Counter()
+    occurrences = extraction_occurrences(n, seed)
+    constraints = extraction_constraints(n, seed)
+
+    for joint in iter_joints(n, seed):
+        occs = [next(occurrences) for _ in range(len(joint["plates"]) + len(joint["rivets"]))]
+        cons = [next(constraints) for _ in range(len(joint["constraints"]))]
+        totals.update(rule_miner.count_rules(
+            rule_miner.normalize_constraints(cons),
+            rule_miner.classify_parts(occs)
+        ))
+
+    return totals
+
+def bom_counts(n, seed):
+    used = Counter()
+    for joint in iter_joints(n, seed):
+        for rv in joint["rivets"]:
+            used[rv["pn"]] += 1
+    return {pn: k - int(k * BOM_SHORTFALL) for pn, k in sorted(used.items())}
+
+# =====================================================
+# GENERATE
+# =====================================================
+def generate(out_dir=OUT_DIR, n=OCCURRENCES, seed=SEED, name=None, indent=INDENT):
+    """
+    Write a synthetic assembly of at least `n` occurrences in every
+    schema the offline pipeline reads. Returns {output: path} plus the
+    totals. Records are streamed, so memory does not grow with `n`.
+
+        assemblies_raw_export/<name>.json    raw export (reassemble2, rule_miner)
+        jsons/<part>.json                    part exports
+        extractions/assembly_extraction.json rivet_stack / rule_miner input
+        extractions/geometry_fastener_axes.json
+        extractions/final_phase1_to_5.json   ain1 output: "occurrences", "holes"
+                                             (hole_match / rivet_stack input)
+        extractions/inferred_holes.json      gr_hole / hole_pipeline input
+        extractions/bom.json, rules.json     validate input
+    """
+    out_dir = Path(out_dir)
+    name = name or f"synth_{n}_s{seed}"
+    raw_dir = out_dir / "assemblies_raw_export"
+    part_dir = out_dir / "jsons"
+    ext_dir = out_dir / "extractions"
+    for d in (raw_dir, part_dir, ext_dir):
+        d.mkdir(parents=True, exist_ok=True)
+
+    totals = count(n, seed)
+    paths = {}
+
+    # ---------- part exports ----------
+    parts = [rivet_part(pn) for pn in RIVETS]
+    parts += [plate_part(g, layer) for g in range(len(HOLE_GRIDS)) for layer in range(len(THICKNESS_MM))]
+    for pn, doc in parts:
+        (part_dir / f"{pn}.json").write_text(json.dumps(doc, indent=indent), encoding="utf-8")
+    paths["parts"] = str(part_dir)
+
+    # ---------- raw export ----------
+    paths["raw_export"] = str(raw_dir / f"{name}.json")
+    write_json(paths["raw_export"], [
+        ("assembly_metadata", "value", {
+            "assembly_name": f"{name}.iam",
+            "full_file_name": f"{SOURCE_DIR}\\{name}.iam",
+            "internal_name": "{" + hashlib.md5(name.encode()).hexdigest().upper() + "}",
+            "total_occurrences": totals["occurrences"],
+            "total_constraints": totals["constraints"]
+        }),
+        ("components", "list", raw_components(n, seed)),
+        ("constraints", "list", raw_constraints(n, seed)),
+    ], indent)
+
+    # ---------- offline pipeline inputs ----------
+    paths["assembly_extraction"] = str(ext_dir / "assembly_extraction.json")
+    write_json(paths["assembly_extraction"], [
+        ("occurrences", "list", extraction_occurrences(n, seed)),
+        ("constraints", "list", extraction_constraints(n, seed)),
+    ], indent)
+
+    paths["fastener_axes"] = str(ext_dir / "geometry_fastener_axes.json")
+    write_json_list(paths["fastener_axes"], fastener_axes(n, seed), indent)
+
+    paths["ain1"] = str(ext_dir / "final_phase1_to_5.json")
+    write_json(paths["ain1"], [
+        ("occurrences", "dict", ain1_occurrences(n, seed)),
+        ("holes", "list", ain1_holes(n, seed)),
+    ], indent)
+
+    paths["inferred_holes"] = str(ext_dir / "inferred_holes.json")
+    write_json_list(paths["inferred_holes"], inferred_holes(n, seed), indent)
+
+    paths["bom"] = str(ext_dir / "bom.json")
+    Path(paths["bom"]).write_text(json.dumps(bom_counts(n, seed), indent=indent), encoding="utf-8")
+
+    paths["rules"] = str(ext_dir / "rules.json")
+    rules = rule_miner.build_rules(rule_counts(n, seed))
+    Path(paths["rules"]).write_text(json.dumps(rules, indent=indent), encoding="utf-8")
+
+    return {"name": name, "totals": totals, "paths": paths}
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Generate a synthetic riveted assembly in every export schema")
+    ap.add_argument("-n", "--occurrences", type=int, default=OCCURRENCES)
+    ap.add_argument("-o", "--out-dir", default=str(OUT_DIR))
+    ap.add_argument("--seed", type=int, default=SEED)
+    ap.add_argument("--name", default=None, help="assembly name (default synth_<n>_s<seed>)")
+    ap.add_argument("--indent", type=int, default=INDENT, help="pretty-print with this indent")
+    args = ap.parse_args()
+
+    result = generate(args.out_dir, args.occurrences, args.seed, args.name, args.indent)
+
+    print(f"✅ Synthetic assembly {result['name']}")
+    for k, v in result["totals"].items():
+        print(f"   {k}: {v}")
+    print(f"   → {args.out_dir}")
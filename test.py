@@ -1,15 +1,28 @@
 import win32com.client
 import pythoncom
-import json
 from pathlib import Path
 import time
 
+from phe import face_id, group_coaxial_faces
+from stream_writer import JsonlWriter, compile_json, journal_path
+
 # ================================
 # CONFIG
 # ================================
 PART_PATH = r"E:\Phase 1\Assembly 1\1093144795-A.ipt"
 OUT_JSON  = Path(r"E:\Phase 1\extractions\part_debug_dump.json")
 
+# field order of OUT_JSON, compiled from the streamed journal
+LAYOUT = [
+    ("part", "value"),
+    ("hole_features", "list"),
+    ("sketches", "list"),
+    ("work_axes", "list"),
+    ("work_points", "list"),
+    ("cylindrical_faces", "list"),
+    ("coaxial_holes", "list"),
+]
+
 # ================================
 # CONNECT INVENTOR
 # ================================
@@ -32,14 +45,8 @@ def run():
     doc = inv.Documents.Open(PART_PATH, True)
     comp = doc.ComponentDefinition
 
-    dump = {
-        "part": Path(PART_PATH).name,
-        "hole_features": [],
-        "sketches": [],
-        "work_axes": [],
-        "work_points": [],
-        "cylindrical_faces": []
-    }
+    journal = journal_path(OUT_JSON)
+    dump = JsonlWriter(journal)
 
     # ----------------------------
     # HOLE FEATURES (RAW)
@@ -61,7 +68,7 @@ def run():
                 except:
                     pass
 
-        dump["hole_features"].append(hole_data)
+        dump("hole_features", hole_data)
 
     # ----------------------------
     # SKETCH GEOMETRY
@@ -83,7 +90,7 @@ def run():
                 "radius": c.Radius
             })
 
-        dump["sketches"].append(sk_data)
+        dump("sketches", sk_data)
 
     # ----------------------------
     # WORK FEATURES
@@ -91,7 +98,7 @@ def run():
     for ax in comp.WorkAxes:
         try:
             geo = ax.Line
-            dump["work_axes"].append({
+            dump("work_axes", {
                 "name": ax.Name,
                 "origin": [geo.RootPoint.X, geo.RootPoint.Y, geo.RootPoint.Z],
                 "direction": [geo.Direction.X, geo.Direction.Y, geo.Direction.Z]
@@ -102,7 +109,7 @@ def run():
     for wp in comp.WorkPoints:
         try:
             p = wp.Point
-            dump["work_points"].append({
+            dump("work_points", {
                 "name": wp.Name,
                 "point": [p.X, p.Y, p.Z]
             })
@@ -112,12 +119,15 @@ def run():
     # ----------------------------
     # CYLINDRICAL FACES (IMPORTANT)
     # ----------------------------
+    faces = []
+
     for body in comp.SurfaceBodies:
         for face in body.Faces:
             try:
-                if face.SurfaceType == 16:  # Cylinder
+                if face.SurfaceType == 5891:  # kCylinderSurface
                     cyl = face.Geometry
-                    dump["cylindrical_faces"].append({
+                    rec = {
+                        "face_id": face_id(face, len(faces) + 1),
                         "radius": cyl.Radius,
                         "axis_origin": [
                             cyl.Axis.RootPoint.X,
@@ -129,15 +139,23 @@ def run():
                             cyl.Axis.Direction.Y,
                             cyl.Axis.Direction.Z
                         ]
-                    })
+                    }
+                    dump("cylindrical_faces", rec)
+                    faces.append((rec["face_id"], rec["radius"], rec["axis_origin"], rec["axis_direction"]))
             except:
                 pass
 
+    # ----------------------------
+    # COAXIAL FACES → HOLES
+    # ----------------------------
+    for hole in group_coaxial_faces(faces):
+        dump("coaxial_holes", hole)
+
     # ----------------------------
     # SAVE
     # ----------------------------
-    with open(OUT_JSON, "w", encoding="utf-8") as f:
-        json.dump(dump, f, indent=4)
+    dump.close()
+    compile_json(journal, OUT_JSON, LAYOUT, {"part": Path(PART_PATH).name})
 
     doc.Close(True)
     print(f"✅ Debug dump created → {OUT_JSON}")
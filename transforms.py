@@ -0,0 +1,163 @@
+import numpy as np
+
+import geometry
+
+# =====================================================
+# TRANSFORM READER
+# =====================================================
+class TransformReader:
+    """
+    Reads Inventor Matrix objects in one COM call and caches them.
+
+    `Matrix.GetMatrixData` returns all 16 values at once. Its element
+    order is checked once against `Cell()` on the first asymmetric
+    matrix; if the call is unavailable (e.g. late-bound dispatch without
+    out-param support) the reader falls back to 16 `Cell()` reads.
+    """
+
+    def __init__(self):
+        self._cache = {}
+        self._bulk = None          # None = GetMatrixData not tried yet
+        self._transposed = None    # None = element order not settled yet
+        self.com_reads = 0
+
+    # -------------------------------------------------
+    # raw matrix reads
+    # -------------------------------------------------
+    def _cells(self, m):
+        self.com_reads += 16
+        return geometry.as_matrix([
+            [m.Cell(r, c) for c in range(1, 5)] for r in range(1, 5)
+        ])
+
+    def _matrix_data(self, m):
+        self.com_reads += 1
+        data = m.GetMatrixData([0.0] * 16)
+        if data is None or len(data) != 16:
+            raise ValueError("GetMatrixData returned no data")
+        return geometry.as_matrix(data)
+
+    def _settle_order(self, m, bulk):
+        """Compare one asymmetric bulk read with Cell() to fix the element order."""
+        cells = self._cells(m)
+        if np.allclose(bulk, cells):
+            self._transposed = False
+        elif np.allclose(bulk.T, cells):
+            self._transposed = True
+        else:
+            self._bulk = False
+        return cells
+
+    def read(self, m):
+        """(4, 4) float64 array for an Inventor Matrix. Not cached."""
+        if self._bulk is False:
+            return self._cells(m)
+
+        try:
+            bulk = self._matrix_data(m)
+        except Exception:
+            if self._bulk:
+                raise
+            self._bulk = False
+            return self._cells(m)
+        self._bulk = True
+
+        if self._transposed is None:
+            # a symmetric matrix reads the same in either order
+            if np.array_equal(bulk, bulk.T):
+                return bulk
+            return self._settle_order(m, bulk)
+
+        return bulk.T.copy() if self._transposed else bulk
+
+    # -------------------------------------------------
+    # cached occurrence transforms
+    # -------------------------------------------------
+    def occurrence(self, occ, key=None):
+        """
+        Transformation of an occurrence, fetched once per run.
+
+        Pass `key` (usually the occurrence name the caller already read)
+        to avoid an extra `occ.Name` round trip.
+        """
+        if key is None:
+            key = occ.Name
+        M = self._cache.get(key)
+        if M is None:
+            M = self._cache[key] = self.read(occ.Transformation)
+        return M
+
+    def clear(self):
+        self._cache.clear()
+
+# =====================================================
+# MATRIX WRITER
+# =====================================================
+class MatrixWriter:
+    """
+    Builds Inventor Matrix objects from arrays in one `PutMatrixData`
+    call instead of 12-16 `SetCell` calls.
+
+    The element order `PutMatrixData` expects is checked once with
+    `Cell()` on the first asymmetric matrix; without the call the
+    writer falls back to `SetCell`.
+    """
+
+    def __init__(self):
+        self._bulk = None          # None = PutMatrixData not tried yet
+        self._transposed = None    # None = element order not settled yet
+        self.com_writes = 0
+
+    def _set_cells(self, m, M):
+        for r in range(4):
+            for c in range(4):
+                m.SetCell(r + 1, c + 1, float(M[r, c]))
+        self.com_writes += 16
+        return m
+
+    def _put(self, m, M):
+        self.com_writes += 1
+        m.PutMatrixData([float(v) for v in M.ravel()])
+
+    def create(self, tg, M):
+        """New Matrix (via TransientGeometry `tg`) holding the 4x4 array `M`."""
+        M = geometry.as_matrix(M)
+        m = tg.CreateMatrix()
+
+        if self._bulk is False:
+            return self._set_cells(m, M)
+
+        try:
+            self._put(m, M.T if self._transposed else M)
+        except Exception:
+            if self._bulk:
+                raise
+            self._bulk = False
+            return self._set_cells(m, M)
+        self._bulk = True
+
+        if self._transposed is None and not np.array_equal(M, M.T):
+            cells = geometry.as_matrix([
+                [m.Cell(r, c) for c in range(1, 5)] for r in range(1, 5)
+            ])
+            if np.allclose(cells, M):
+                self._transposed = False
+            elif np.allclose(cells, M.T):
+                self._transposed = True
+                self._put(m, M.T)
+            else:
+                self._bulk = False
+                return self._set_cells(m, M)
+
+        return m
+
+# one reader / writer per process / run
+TRANSFORMS = TransformReader()
+MATRICES   = MatrixWriter()
+
+def occurrence_matrix(occ, key=None):
+    return TRANSFORMS.occurrence(occ, key)
+
+def matrix_rows(m):
+    """Uncached Matrix read as nested lists (JSON-ready)."""
+    return TRANSFORMS.read(m).tolist()
@@ -13,62 +13,79 @@ OUTPUT_JSON        = Path(r"E:\Phase 1\extractions\validation.json")
 # =====================================================
 # LOAD DATA
 # =====================================================
-with open(GROUPED_HOLES_JSON, "r", encoding="utf-8") as f:
-    grouped_holes = json.load(f)
-
-with open(RULES_JSON, "r", encoding="utf-8") as f:
-    rules = json.load(f)
-
-bom = {}
-if BOM_JSON.exists():
-    with open(BOM_JSON, "r", encoding="utf-8") as f:
-        bom = json.load(f)
+def load_bom(path):
+    """Fastener part number → count present; empty when there is no BOM."""
+    if not path.exists():
+        return {}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
 
 # =====================================================
 # BUILD RULE LOOKUP
 # =====================================================
-rule_confidence = {}
+def build_rule_lookup(rules):
+    rule_confidence = {}
+
+    for r in rules:
+        if r["constraint_type"] == "Insert" and r["mandatory"]:
+            key = (r["source_part_type"], r["target_part_type"])
+            rule_confidence[key] = r["confidence"]
 
-for r in rules:
-    if r["constraint_type"] == "Insert" and r["mandatory"]:
-        key = (r["source_part_type"], r["target_part_type"])
-        rule_confidence[key] = r["confidence"]
+    return rule_confidence
 
 # =====================================================
 # PHASE-4 VALIDATION / COMPLETION
 # =====================================================
-results = []
+def validate_groups(grouped_holes, bom):
+    """Yield one validation record per grouped-hole entry."""
+    for entry in grouped_holes:
+        plate = entry["plate"]
+        fastener = entry["fastener_type"]
+        expected = entry["hole_count"]
+        present = expected
 
-for entry in grouped_holes:
-    plate = entry["plate"]
-    fastener = entry["fastener_type"]
-    expected = entry["hole_count"]
-    present = expected
+        # If BOM exists, validate against BOM
+        if fastener in bom:
+            present = bom[fastener]
 
-    # If BOM exists, validate against BOM
-    if fastener in bom:
-        present = bom[fastener]
+        missing = max(0, expected - present)
 
-    missing = max(0, expected - present)
+        confidence = entry["confidence"]
+        status = "OK" if missing == 0 else "INCOMPLETE"
 
-    confidence = entry["confidence"]
-    status = "OK" if missing == 0 else "INCOMPLETE"
-
-    results.append({
-        "plate": plate,
-        "fastener_type": fastener,
-        "expected_count": expected,
-        "present_count": present,
-        "missing": missing,
-        "confidence": confidence,
-        "status": status
-    })
+        yield {
+            "plate": plate,
+            "fastener_type": fastener,
+            "expected_count": expected,
+            "present_count": present,
+            "missing": missing,
+            "confidence": confidence,
+            "status": status
+        }
 
 # =====================================================
-# SAVE OUTPUT
+# MAIN
 # =====================================================
-with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
-    json.dump(results, f, indent=4)
+def run():
+    with open(GROUPED_HOLES_JSON, "r", encoding="utf-8") as f:
+        grouped_holes = json.load(f)
+
+    with open(RULES_JSON, "r", encoding="utf-8") as f:
+        rules = json.load(f)
+
+    rule_confidence = build_rule_lookup(rules)
+    bom = load_bom(BOM_JSON)
+
+    results = list(validate_groups(grouped_holes, bom))
+
+    # =================================================
+    # SAVE OUTPUT
+    # =================================================
+    with open(OUTPUT_JSON, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=4)
+
+    print("✅ Phase-4 complete")
+    print(f"   Output → {OUTPUT_JSON}")
 
-print("✅ Phase-4 complete")
-print(f"   Output → {OUTPUT_JSON}")
\ No newline at end of file
+if __name__ == "__main__":
+    run()